@@ -0,0 +1,274 @@
+"""
+历史资讯补录模块 - 修改公众号或微信群文本的格式后，按新格式重新生成历史资讯
+
+从 Filled 工作表或 GISource 数据库表分块流式读取全部资讯（不一次性载入全表），
+用批量格式化函数（convert_to_wechat_formats、generate_wechat_group_texts）重新生成
+公众号（Docs）文本和微信群文本，逐行写入 JSONL 文件；GISource 中的资讯还可按发布日期归入各期，
+通过 sort_jobs / build_sorted_content 重建整期内容，写入本地文件或替换Google文档中的对应周期。
+每处理完一块输出进度和吞吐量（行/秒）。
+
+Filled 工作表没有 Event_ID 和发布日期，只生成公众号文本（微信群文本为空，不能重建整期）。
+
+用法:
+    python backfill.py --source gisource --out cache/backfill/events.jsonl
+    python backfill.py --source gisource --since 2025-11-30 --periods-out cache/backfill/periods.txt
+    python backfill.py --source gisource --since 2026-01-11 --until 2026-01-24 --apply-docs
+    python backfill.py --source filled --chunk-size 2000
+
+重建整期时，--since/--until 会扩展为所涉及各期的完整发布窗口（周期最后一天发布的资讯归入下一期），
+避免边缘的周期只含部分资讯；--apply-docs 先列出将被替换的周期及新旧职位条数，确认后才写入文档。
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+from functools import lru_cache
+
+import pandas as pd
+
+from config import BACKFILL_CHUNK_ROWS, BACKFILL_OUTPUT_DIR, DOCUMENT_ID, REQUIRED_COLUMNS
+from utils import add_deadline_columns, calculate_week_range, format_period_title
+from data_processor import (
+    classify_roles,
+    convert_to_wechat_formats,
+    generate_wechat_group_texts,
+    rows_from_sql_tables
+)
+
+
+def iter_filled_chunks(chunk_size):
+    """分块读取 Filled 工作表（每块一个 DataFrame）"""
+    from google_sheets import iter_sheet_rows
+    for headers, rows in iter_sheet_rows('Filled', chunk_size):
+        yield pd.DataFrame(rows, columns=headers)
+
+
+def iter_gisource_chunks(cursor, chunk_size, since=None, until=None):
+    """分块读取 GISource 表中的资讯，并还原为表格格式的数据行"""
+    from database import iter_gisource_events
+    for columns, rows in iter_gisource_events(cursor, chunk_size, since, until):
+        yield rows_from_sql_tables(pd.DataFrame(rows, columns=columns))
+
+
+@lru_cache(maxsize=None)
+def period_range(publish_date):
+    """
+    资讯所属的周期（与发布时 calculate_week_range 的规则相同）
+    Args:
+        publish_date: 发布日期（date、datetime 或 YYYY-MM-DD）
+    Returns:
+        tuple: (周期起始日期, 周期结束日期)，格式为 'YYYY-MM-DD'
+    """
+    return calculate_week_range(pd.Timestamp(publish_date).date())
+
+
+def period_publish_window(since=None, until=None):
+    """
+    将发布日期范围扩展为所涉及各期的完整发布窗口
+    一期（起始日期至结束日期）包含起始日期前一天到结束日期前一天发布的资讯
+    Args:
+        since: 起始发布日期（YYYY-MM-DD，可为空）
+        until: 结束发布日期（YYYY-MM-DD，可为空）
+    Returns:
+        tuple: (扩展后的起始发布日期, 扩展后的结束发布日期)
+    """
+    if since:
+        week_start, _week_end = period_range(since)
+        since = (date.fromisoformat(week_start) - timedelta(days=1)).isoformat()
+    if until:
+        _week_start, week_end = period_range(until)
+        until = (date.fromisoformat(week_end) - timedelta(days=1)).isoformat()
+    return since, until
+
+
+def regenerate_chunk(rows):
+    """
+    按当前格式重新生成一块资讯的文本
+    Args:
+        rows: 表格格式的数据行（DataFrame，可含 Event_ID 和 Date 列）
+    Returns:
+        tuple: (结果 DataFrame, 因必填字段缺失跳过的行数)
+    """
+    values = rows[REQUIRED_COLUMNS].astype(object)
+    complete = (values.notna() & (values != '')).all(axis=1)
+    rows = add_deadline_columns(rows[complete].reset_index(drop=True))
+    roles = classify_roles(rows)
+
+    results = pd.DataFrame({
+        'Event_ID': rows['Event_ID'] if 'Event_ID' in rows.columns else None,
+        'Date': rows['Date'].astype(str) if 'Date' in rows.columns else None,
+        'University_EN': rows['University_EN'],
+        'Source': rows['Source'],
+        'Abbreviation': roles['Abbreviation'],
+        'Category': roles['Category'],
+        'Docs_Text': convert_to_wechat_formats(rows, roles['Abbreviation'])
+    }, index=rows.index)
+    if 'Event_ID' in rows.columns:
+        results['Group_Text'] = generate_wechat_group_texts(rows, rows['Event_ID'], roles['Abbreviation'])
+    else:
+        results['Group_Text'] = None
+    if 'Date' in rows.columns:
+        results['Period'] = [format_period_title(*period_range(value)) for value in rows['Date']]
+    else:
+        results['Period'] = None
+    return results, int((~complete).sum())
+
+
+def build_period_contents(period_jobs):
+    """
+    用 sort_jobs / build_sorted_content 重建各期内容
+    Args:
+        period_jobs: {(周期起始日期, 周期结束日期): [parse_job_from_text 解析的职位, ...]}
+    Returns:
+        list: [(周期标题, 整期内容, 职位条数), ...]，按周期先后排序
+    """
+    from google_docs import sort_jobs, build_sorted_content
+    contents = []
+    for (week_start, week_end), jobs in sorted(period_jobs.items()):
+        subtitle = format_period_title(week_start, week_end)
+        contents.append((subtitle, build_sorted_content(sort_jobs(jobs), subtitle), len(jobs)))
+    return contents
+
+
+def apply_periods_to_doc(period_contents, assume_yes=False):
+    """
+    用重建的内容替换Google文档中的对应周期（文档中不存在的周期跳过）
+    先列出将被替换的周期及文档中现有/重建后的职位条数，确认后才写入
+    Args:
+        period_contents: build_period_contents 的返回值
+        assume_yes: 不询问直接替换
+    Returns:
+        int: 替换的周期数
+    """
+    from google_docs import (
+        build_docs_service, retrieve_document_content, replace_period_content, parse_jobs_in_period
+    )
+    service = build_docs_service()
+    doc_content = retrieve_document_content(service, DOCUMENT_ID)
+
+    planned = []
+    for subtitle, content, job_count in period_contents:
+        if subtitle not in doc_content:
+            print(f"⚠ 文档中没有周期 {subtitle}，跳过")
+            continue
+        existing_count = len(parse_jobs_in_period(doc_content, subtitle))
+        print(f"  {subtitle}: 文档中 {existing_count} 条 -> 重建后 {job_count} 条")
+        planned.append((subtitle, content))
+    if not planned:
+        return 0
+
+    if not assume_yes:
+        if not sys.stdin.isatty():
+            print("⚠ 非交互环境，未修改文档（确认无误后加 --yes 执行替换）")
+            return 0
+        answer = input(f"确认替换文档中的以上 {len(planned)} 个周期？输入 y 继续: ")
+        if answer.strip().lower() != 'y':
+            print("已取消，未修改文档")
+            return 0
+
+    replaced = 0
+    for subtitle, content in planned:
+        new_content = content[len(f"\n\n{subtitle}\n\n"):].strip() + "\n"
+        replace_period_content(service, DOCUMENT_ID, subtitle, new_content)
+        print(f"✓ 已替换周期: {subtitle}")
+        replaced += 1
+    return replaced
+
+
+def run_backfill(chunks, out_path, collect_periods=False):
+    """
+    流式处理各块数据：重新生成文本、逐行写入 JSONL，并输出进度和吞吐量
+    Args:
+        chunks: 表格格式数据行的 DataFrame 迭代器
+        out_path: JSONL 输出路径
+        collect_periods: 是否按周期收集职位（用于重建整期内容）
+    Returns:
+        tuple: (统计信息 dict, {周期: [职位, ...]})
+    """
+    from google_docs import parse_job_from_text
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    stats = {'rows': 0, 'written': 0, 'skipped': 0, 'seconds': 0.0}
+    period_jobs = {}
+    started = time.monotonic()
+
+    with open(out_path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            results, skipped = regenerate_chunk(chunk)
+            for record in results.astype(object).where(results.notna(), None).to_dict('records'):
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+            if collect_periods:
+                for publish_date, docs_text in zip(results['Date'], results['Docs_Text']):
+                    period_jobs.setdefault(period_range(publish_date), []).append(parse_job_from_text(docs_text))
+
+            stats['rows'] += len(chunk)
+            stats['written'] += len(results)
+            stats['skipped'] += skipped
+            stats['seconds'] = time.monotonic() - started
+            print(f"  已处理 {stats['rows']} 行（写入 {stats['written']}，跳过 {stats['skipped']}），"
+                  f"{stats['rows'] / max(stats['seconds'], 1e-9):.0f} 行/秒")
+    return stats, period_jobs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='按当前格式重新生成历史资讯的公众号和微信群文本')
+    parser.add_argument('--source', choices=['gisource', 'filled'], default='gisource',
+                        help='数据来源：GISource 数据库表（默认）或 Filled 工作表')
+    parser.add_argument('--chunk-size', type=int, default=BACKFILL_CHUNK_ROWS,
+                        help=f'每块读取的行数（默认{BACKFILL_CHUNK_ROWS}）')
+    parser.add_argument('--since', metavar='YYYY-MM-DD', help='GISource：起始发布日期（含）')
+    parser.add_argument('--until', metavar='YYYY-MM-DD', help='GISource：结束发布日期（含）')
+    parser.add_argument('--out', default=os.path.join(BACKFILL_OUTPUT_DIR, 'events.jsonl'),
+                        help='逐条结果的 JSONL 输出路径')
+    parser.add_argument('--periods-out', metavar='PATH', help='GISource：将重建的整期内容写入该文件')
+    parser.add_argument('--apply-docs', action='store_true',
+                        help='GISource：用重建的整期内容替换Google文档中已有的对应周期（替换前需确认）')
+    parser.add_argument('--yes', action='store_true', help='与 --apply-docs 一起使用：不询问直接替换')
+    args = parser.parse_args(argv)
+
+    rebuild_periods = bool(args.periods_out or args.apply_docs)
+    if args.source == 'filled' and (rebuild_periods or args.since or args.until):
+        parser.error('Filled 工作表没有发布日期，--since/--until/--periods-out/--apply-docs 只能用于 GISource')
+    if rebuild_periods and (args.since or args.until):
+        since, until = period_publish_window(args.since, args.until)
+        if (since, until) != (args.since, args.until):
+            print(f"ℹ 发布日期范围扩展为 {since or '最早'} 至 {until or '最新'}（完整覆盖所涉及的周期）")
+        args.since, args.until = since, until
+
+    conn = cursor = None
+    if args.source == 'gisource':
+        from database import get_database_connection
+        conn, cursor = get_database_connection()
+        if not conn:
+            print("⚠ 无法连接数据库")
+            return 1
+        chunks = iter_gisource_chunks(cursor, args.chunk_size, args.since, args.until)
+    else:
+        chunks = iter_filled_chunks(args.chunk_size)
+
+    print(f"开始补录（来源: {args.source}，每块 {args.chunk_size} 行）...")
+    try:
+        stats, period_jobs = run_backfill(chunks, args.out, collect_periods=rebuild_periods)
+    finally:
+        if conn:
+            cursor.close()
+            conn.close()
+    print(f"✓ 已写入 {stats['written']} 条: {args.out}（跳过 {stats['skipped']} 条必填字段缺失的资讯，"
+          f"{stats['seconds']:.1f} 秒，{stats['rows'] / max(stats['seconds'], 1e-9):.0f} 行/秒）")
+
+    if rebuild_periods:
+        period_contents = build_period_contents(period_jobs)
+        if args.periods_out:
+            os.makedirs(os.path.dirname(os.path.abspath(args.periods_out)), exist_ok=True)
+            with open(args.periods_out, 'w', encoding='utf-8') as f:
+                f.write(''.join(content for _subtitle, content, _job_count in period_contents))
+            print(f"✓ 已重建 {len(period_contents)} 期内容: {args.periods_out}")
+        if args.apply_docs:
+            replaced = apply_periods_to_doc(period_contents, assume_yes=args.yes)
+            print(f"✓ 已替换文档中的 {replaced} 个周期")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
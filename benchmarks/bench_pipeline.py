@@ -0,0 +1,365 @@
+"""
+流程基准测试 - 用合成数据对主流程中的本地计算环节计时，结果可保存为JSON用于跨版本对比
+
+测试场景:
+    load_and_clean_data     步骤1：镜像同步、过期/重复行检查及删除（Google API由进程内替身处理）
+    update_university_info  步骤2：按GISource快照补全中文校名并写回（数据库为内存替身）
+    create_sql_table        步骤6：逐行生成SQL表格数据
+    create_sql_tables       批量生成SQL表格数据（全部有中文校名的Unfilled行，一次调用）
+    classify_roles          整表职位分类：位掩码解码后查表得到缩写、中英文职位和类别
+    sort_documents          解析周期内的 ### 职位、sort_jobs 排序并 build_sorted_content 重建内容
+    docs_index_mapping      find_period_content_indices：纯文本位置到Docs索引的映射
+
+用法:
+    python benchmarks/bench_pipeline.py                                  # 默认 1000、10000 行
+    python benchmarks/bench_pipeline.py --rows 1000 100000 1000000 --repeat 1
+    python benchmarks/bench_pipeline.py --json results/today.json --compare results/last_week.json
+
+Google API请求的限流在基准测试中关闭（只测本地开销），需要网络的接口全部由替身响应。
+"""
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import BASE_DIR, DOCUMENT_ID  # noqa: E402
+from benchmarks.fake_google import FakeGoogle, FakeDocument  # noqa: E402
+from benchmarks.synthetic_data import generate_tabs, generate_period_document  # noqa: E402
+
+SCENARIOS = ['load_and_clean_data', 'update_university_info', 'create_sql_table',
+             'create_sql_tables', 'classify_roles', 'sort_documents', 'docs_index_mapping']
+# 与行数相关的场景（每个 --rows 各测一次），其余场景只测一次
+ROW_SCENARIOS = {'load_and_clean_data', 'update_university_info', 'create_sql_tables', 'classify_roles'}
+
+
+class BenchCursor:
+    """数据库游标替身：SELECT GISource 返回大学列表，其余语句为空操作"""
+    def __init__(self, universities):
+        self._universities = universities
+        self._rows = []
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        self._rows = [tuple(row) for row in self._universities] if 'FROM TEST.GISource' in query else []
+        self.rowcount = len(self._rows)
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def close(self):
+        pass
+
+
+class BenchConnection:
+    def __init__(self, universities):
+        self._universities = universities
+
+    def cursor(self, *args, **kwargs):
+        return BenchCursor(self._universities)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    def is_connected(self):
+        return True
+
+
+@contextlib.contextmanager
+def offline_google(tabs):
+    """安装Google替身、使用临时表格镜像并关闭限流"""
+    import google_client
+    import sheets_mirror
+
+    fake = FakeGoogle()
+    fake.add_spreadsheet(copy.deepcopy(tabs))
+    original_mirror = sheets_mirror.SHEETS_MIRROR_FILE
+    original_buckets = google_client._buckets
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sheets_mirror.SHEETS_MIRROR_FILE = os.path.join(tmp_dir, 'sheets_mirror.sqlite')
+        google_client._buckets = {}
+        fake.install()
+        try:
+            yield fake
+        finally:
+            fake.uninstall()
+            google_client._buckets = original_buckets
+            sheets_mirror.SHEETS_MIRROR_FILE = original_mirror
+
+
+def time_call(setup, run, repeat):
+    """
+    重复计时，setup 不计入耗时
+    Args:
+        setup: 返回上下文管理器的函数，其 __enter__ 的返回值传给 run
+        run: 被计时的函数
+    Returns:
+        list: 每次的耗时（秒）
+    """
+    from logger import reset_session
+
+    timings = []
+    for _ in range(repeat):
+        reset_session()
+        with setup() as context:
+            # 被测函数的终端输出不计入结果（行数多时输出量很大）
+            with contextlib.redirect_stdout(io.StringIO()):
+                started = time.perf_counter()
+                run(context)
+                timings.append(time.perf_counter() - started)
+    return timings
+
+
+def bench_load_and_clean_data(tabs, repeat):
+    import main
+    return time_call(lambda: offline_google(tabs), lambda _fake: main.load_and_clean_data(), repeat)
+
+
+def bench_update_university_info(tabs, repeat):
+    import main
+    import database
+
+    universities = tabs['Universities'][1:]
+    headers, rows = tabs['Unfilled'][0], tabs['Unfilled'][1:]
+
+    @contextlib.contextmanager
+    def setup():
+        unfilled = pd.DataFrame(copy.deepcopy(rows), columns=headers)
+        # 表格中缺少中文校名的单元格在 DataFrame 中为空值
+        for column in ('University_CN', 'Country_CN'):
+            unfilled[column] = unfilled[column].replace('', None)
+        database._gisource_snapshot['rows'] = None
+        connection = BenchConnection(universities)
+        database.use_connection_override(lambda timeout=60: (connection, connection.cursor()))
+        try:
+            with offline_google(tabs):
+                yield unfilled
+        finally:
+            database.use_connection_override(None)
+
+    return time_call(setup, main.update_university_info, repeat)
+
+
+def bench_create_sql_table(tabs, repeat, count):
+    from data_processor import create_sql_table
+
+    headers = tabs['Unfilled'][0]
+    rows = [row for row in tabs['Unfilled'][1:] if row[headers.index('University_CN')]][:count]
+    selected_rows = [pd.DataFrame([row], columns=headers) for row in rows]
+
+    def run(_context):
+        for event_id, selected_row in enumerate(selected_rows, start=1):
+            create_sql_table(selected_row, event_id)
+
+    return time_call(contextlib.nullcontext, run, repeat), len(selected_rows)
+
+
+def bench_create_sql_tables(tabs, repeat):
+    from data_processor import create_sql_tables
+
+    headers = tabs['Unfilled'][0]
+    rows = [row for row in tabs['Unfilled'][1:] if row[headers.index('University_CN')]]
+    selected_rows = pd.DataFrame(rows, columns=headers)
+    event_ids = range(1, len(rows) + 1)
+
+    def run(_context):
+        create_sql_tables(selected_rows, event_ids)
+
+    return time_call(contextlib.nullcontext, run, repeat), len(rows)
+
+
+def bench_classify_roles(tabs, repeat):
+    from data_processor import classify_roles
+
+    unfilled = pd.DataFrame(tabs['Unfilled'][1:], columns=tabs['Unfilled'][0])
+
+    def run(_context):
+        classify_roles(unfilled)
+
+    return time_call(contextlib.nullcontext, run, repeat)
+
+
+def bench_sort_documents(document_text, subtitle, repeat):
+    from google_docs import parse_jobs_in_period, sort_jobs, build_sorted_content
+
+    def run(_context):
+        jobs = parse_jobs_in_period(document_text, subtitle)
+        build_sorted_content(sort_jobs(jobs), subtitle)
+
+    return time_call(contextlib.nullcontext, run, repeat)
+
+
+def bench_docs_index_mapping(document_text, subtitle, repeat):
+    from google_docs import find_period_content_indices
+
+    document = FakeDocument(document_text).to_json(DOCUMENT_ID)
+
+    def run(_context):
+        start_index, end_index = find_period_content_indices(document, document_text, subtitle)
+        if start_index is None:
+            raise RuntimeError('未找到当前周期的内容索引')
+
+    return time_call(contextlib.nullcontext, run, repeat)
+
+
+def git_revision():
+    """当前代码版本（非git仓库时返回 None）"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def summarize(scenario, size, timings, items):
+    return {
+        'scenario': scenario,
+        'size': size,
+        'items': items,
+        'repeat': len(timings),
+        'min_seconds': round(min(timings), 6),
+        'median_seconds': round(statistics.median(timings), 6),
+        'per_item_ms': round(min(timings) * 1000 / items, 6) if items else None
+    }
+
+
+def run_scenario(name, action):
+    """运行单个场景，失败时记录错误而不中断整个测试"""
+    print(f"   {name} ...", end=' ', flush=True)
+    try:
+        result = action()
+    except Exception as e:
+        print(f"✗ {type(e).__name__}: {e}")
+        return {'scenario': name, 'error': f"{type(e).__name__}: {e}"}
+    print(f"{result['min_seconds']:.3f} s")
+    return result
+
+
+def print_results(results, baseline=None):
+    """打印结果表格（提供基准结果时显示耗时比例）"""
+    previous = {}
+    for item in (baseline or {}).get('results', []):
+        if 'error' not in item:
+            previous[(item['scenario'], item['size'])] = item['min_seconds']
+
+    print("-" * 78)
+    print(f"{'场景':<24}{'规模':>10}{'最短(s)':>12}{'中位数(s)':>12}{'单条(ms)':>10}{'对比':>10}")
+    for item in results:
+        if 'error' in item:
+            print(f"{item['scenario']:<24}{'':>10}  失败: {item['error']}")
+            continue
+        ratio = ''
+        old = previous.get((item['scenario'], item['size']))
+        if old:
+            ratio = f"{item['min_seconds'] / old:.2f}x"
+        per_item = f"{item['per_item_ms']:.3f}" if item['per_item_ms'] is not None else ''
+        print(f"{item['scenario']:<24}{item['size']:>10}{item['min_seconds']:>12.4f}"
+              f"{item['median_seconds']:>12.4f}{per_item:>10}{ratio:>10}")
+    print("-" * 78)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='流程基准测试')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000],
+                        help='Unfilled/Filled 行数，可指定多个（默认 1000 10000）')
+    parser.add_argument('--universities', type=int, default=2000, help='大学数量（默认2000）')
+    parser.add_argument('--listings', type=int, default=300, help='文档每个周期的职位条数（默认300）')
+    parser.add_argument('--periods', type=int, default=6, help='文档周期数（默认6）')
+    parser.add_argument('--sql-rows', type=int, default=200, help='create_sql_table 的调用次数（默认200）')
+    parser.add_argument('--repeat', type=int, default=3, help='每个场景的重复次数，取最短耗时（默认3）')
+    parser.add_argument('--scenario', nargs='+', choices=SCENARIOS, help='只运行指定场景')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--json', metavar='PATH', help='将结果写入JSON文件')
+    parser.add_argument('--compare', metavar='PATH', help='与之前保存的JSON结果对比')
+    args = parser.parse_args()
+
+    scenarios = args.scenario or SCENARIOS
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = []
+    for rows in sorted(set(args.rows)):
+        if not ROW_SCENARIOS & set(scenarios) and rows != min(args.rows):
+            continue
+        print(f"生成合成数据: {rows} 行...")
+        tabs = generate_tabs(rows, university_count=args.universities, seed=args.seed)
+        if 'load_and_clean_data' in scenarios:
+            results.append(run_scenario('load_and_clean_data', lambda: summarize(
+                'load_and_clean_data', rows, bench_load_and_clean_data(tabs, args.repeat), rows)))
+        if 'update_university_info' in scenarios:
+            results.append(run_scenario('update_university_info', lambda: summarize(
+                'update_university_info', rows, bench_update_university_info(tabs, args.repeat), rows)))
+        if 'create_sql_tables' in scenarios:
+            def sql_batch_action():
+                timings, count = bench_create_sql_tables(tabs, args.repeat)
+                return summarize('create_sql_tables', rows, timings, count)
+            results.append(run_scenario('create_sql_tables', sql_batch_action))
+        if 'classify_roles' in scenarios:
+            results.append(run_scenario('classify_roles', lambda: summarize(
+                'classify_roles', rows, bench_classify_roles(tabs, args.repeat), rows)))
+        # 与行数无关的场景只用最小的数据集运行一次
+        if rows == min(args.rows) and 'create_sql_table' in scenarios:
+            def sql_action():
+                timings, count = bench_create_sql_table(tabs, args.repeat, args.sql_rows)
+                return summarize('create_sql_table', count, timings, count)
+            results.append(run_scenario('create_sql_table', sql_action))
+
+    if {'sort_documents', 'docs_index_mapping'} & set(scenarios):
+        listings = args.listings * args.periods
+        print(f"生成周期文档: {args.periods} 个周期 × {args.listings} 条职位...")
+        document_text, subtitle = generate_period_document(args.listings, args.periods, seed=args.seed)
+        if 'sort_documents' in scenarios:
+            results.append(run_scenario('sort_documents', lambda: summarize(
+                'sort_documents', args.listings,
+                bench_sort_documents(document_text, subtitle, args.repeat), args.listings)))
+        if 'docs_index_mapping' in scenarios:
+            results.append(run_scenario('docs_index_mapping', lambda: summarize(
+                'docs_index_mapping', listings,
+                bench_docs_index_mapping(document_text, subtitle, args.repeat), listings)))
+
+    print_results(results, baseline)
+
+    if args.json:
+        output = {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'options': vars(args),
+            'results': results
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+        print(f"✓ 结果已保存: {args.json}")
+
+    return 1 if any('error' in item for item in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,367 @@
+"""
+Google Sheets/Docs 本地替身 - 在进程内模拟本项目用到的Google API子集，用于离线基准测试
+
+以httplib2传输的形式注入（google_client.use_transport），请求仍经过discovery构建、
+限流、重试和统计等全部真实代码路径，只是不访问网络。
+
+已实现的接口：
+- Sheets: values.get / values.batchGet / values.append / values.update，
+  spreadsheets.batchUpdate（deleteDimension）
+- Drive: files.get（modifiedTime）
+- Docs: documents.get，documents.batchUpdate（insertText / deleteContentRange /
+  updateTextStyle / updateParagraphStyle）
+
+注意：Docs的索引按Python字符串长度计算（真实API按UTF-16码元计算，二者仅在BMP以外的字符上不同）。
+
+用法:
+    from benchmarks.fake_google import FakeGoogle
+    fake = FakeGoogle()
+    fake.add_spreadsheet({'Unfilled': [...], 'Filled': [...]})
+    fake.add_document("标题\\n")
+    fake.install()
+"""
+import copy
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit, parse_qs, unquote
+
+import httplib2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import SPREADSHEET_ID, DOCUMENT_ID, UNFILLED_SHEET_ID  # noqa: E402
+
+
+class FakeApiError(Exception):
+    """替身返回的API错误（转换为对应HTTP状态码的响应）"""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def column_letter_to_index(letters):
+    """列字母转换为0基列索引（A -> 0, AA -> 26）"""
+    index = 0
+    for letter in letters:
+        index = index * 26 + (ord(letter) - 64)
+    return index - 1
+
+
+def parse_a1_range(range_name):
+    """
+    解析A1表示法
+
+    Returns:
+        tuple: (工作表名, 起始行, 起始列, 结束行, 结束列)，均为0基且包含端点；结束为 None 表示不限
+    """
+    tab, _, ref = range_name.partition('!')
+    tab = tab.strip("'")
+    if not ref:
+        return tab, 0, 0, None, None
+
+    start, _, end = ref.partition(':')
+    start_match = re.fullmatch(r'([A-Z]*)(\d*)', start)
+    if not start_match:
+        raise FakeApiError(400, f"无法解析范围: {range_name}")
+    start_col = column_letter_to_index(start_match.group(1)) if start_match.group(1) else 0
+    start_row = int(start_match.group(2)) - 1 if start_match.group(2) else 0
+
+    if not end:
+        # 单个单元格（如 F5）或整列/整行
+        end_col = start_col if start_match.group(1) else None
+        end_row = start_row if start_match.group(2) else None
+        return tab, start_row, start_col, end_row, end_col
+
+    end_match = re.fullmatch(r'([A-Z]*)(\d*)', end)
+    if not end_match:
+        raise FakeApiError(400, f"无法解析范围: {range_name}")
+    end_col = column_letter_to_index(end_match.group(1)) if end_match.group(1) else None
+    end_row = int(end_match.group(2)) - 1 if end_match.group(2) else None
+    return tab, start_row, start_col, end_row, end_col
+
+
+def _trim(values):
+    """去掉每行末尾的空单元格及末尾的空行（与Sheets API的返回一致）"""
+    trimmed = []
+    for row in values:
+        row = list(row)
+        while row and row[-1] == '':
+            row.pop()
+        trimmed.append(row)
+    while trimmed and not trimmed[-1]:
+        trimmed.pop()
+    return trimmed
+
+
+class FakeSpreadsheet:
+    """表格替身：每个工作表保存为字符串二维列表"""
+    def __init__(self, tabs, sheet_ids=None):
+        self.tabs = {name: [[str(value) for value in row] for row in rows] for name, rows in tabs.items()}
+        sheet_ids = dict(sheet_ids or {})
+        for offset, name in enumerate(self.tabs):
+            sheet_ids.setdefault(name, UNFILLED_SHEET_ID if name == 'Unfilled' else 1000 + offset)
+        self.sheet_ids = sheet_ids
+        self.version = 0
+
+    def modified_time(self):
+        moment = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=self.version)
+        return moment.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+    def _rows(self, tab):
+        if tab not in self.tabs:
+            raise FakeApiError(400, f"Unable to parse range: {tab}")
+        return self.tabs[tab]
+
+    def _grid(self, range_name):
+        """取出范围内的单元格（补齐为矩形）"""
+        tab, start_row, start_col, end_row, end_col = parse_a1_range(range_name)
+        rows = self._rows(tab)
+        last_row = len(rows) - 1 if end_row is None else min(end_row, len(rows) - 1)
+        width = max((len(row) for row in rows), default=0)
+        last_col = width - 1 if end_col is None else end_col
+        return [
+            [row[col] if col < len(row) else '' for col in range(start_col, last_col + 1)]
+            for row in rows[start_row:last_row + 1]
+        ]
+
+    def get_values(self, range_name, major_dimension='ROWS'):
+        grid = self._grid(range_name)
+        if major_dimension == 'COLUMNS':
+            grid = [list(column) for column in zip(*grid)] if grid else []
+        result = {'range': range_name, 'majorDimension': major_dimension}
+        values = _trim(grid)
+        if values:
+            result['values'] = values
+        return result
+
+    def append_values(self, range_name, values):
+        tab = parse_a1_range(range_name)[0]
+        rows = self._rows(tab)
+        while rows and not any(cell != '' for cell in rows[-1]):
+            rows.pop()
+        first_row = len(rows) + 1
+        rows.extend([[str(value) for value in row] for row in values])
+        self.version += 1
+        return {'updates': {
+            'updatedRange': f"{tab}!A{first_row}",
+            'updatedRows': len(values)
+        }}
+
+    def update_values(self, range_name, values):
+        tab, start_row, start_col, _, _ = parse_a1_range(range_name)
+        rows = self._rows(tab)
+        for row_offset, row_values in enumerate(values):
+            row_index = start_row + row_offset
+            while len(rows) <= row_index:
+                rows.append([])
+            row = rows[row_index]
+            for col_offset, value in enumerate(row_values):
+                col_index = start_col + col_offset
+                while len(row) <= col_index:
+                    row.append('')
+                row[col_index] = str(value)
+        self.version += 1
+        return {'updatedRange': range_name, 'updatedRows': len(values)}
+
+    def batch_update(self, requests):
+        tabs_by_id = {sheet_id: name for name, sheet_id in self.sheet_ids.items()}
+        staged = copy.deepcopy(self.tabs)
+        for request in requests:
+            if 'deleteDimension' not in request:
+                raise FakeApiError(400, f"替身未实现的请求: {list(request)}")
+            target = request['deleteDimension']['range']
+            if target.get('dimension') != 'ROWS' or target['sheetId'] not in tabs_by_id:
+                raise FakeApiError(400, f"无效的deleteDimension: {target}")
+            del staged[tabs_by_id[target['sheetId']]][target['startIndex']:target['endIndex']]
+        self.tabs = staged
+        self.version += 1
+        return {'replies': [{} for _ in requests]}
+
+
+class FakeDocument:
+    """文档替身：正文保存为纯文本（始终以换行结尾），样式请求只做范围校验并记录"""
+    def __init__(self, text='\n', title='Fake Document'):
+        self.text = text if text.endswith('\n') else text + '\n'
+        self.title = title
+        self.styles = []
+        self.revision = 0
+
+    def to_json(self, document_id):
+        content = [{'endIndex': 1, 'sectionBreak': {'sectionStyle': {}}}]
+        index = 1
+        for line in self.text.splitlines(keepends=True):
+            end = index + len(line)
+            content.append({
+                'startIndex': index,
+                'endIndex': end,
+                'paragraph': {
+                    'elements': [{
+                        'startIndex': index,
+                        'endIndex': end,
+                        'textRun': {'content': line, 'textStyle': {}}
+                    }],
+                    'paragraphStyle': {'namedStyleType': 'NORMAL_TEXT'}
+                }
+            })
+            index = end
+        return {
+            'documentId': document_id,
+            'title': self.title,
+            'revisionId': str(self.revision),
+            'body': {'content': content}
+        }
+
+    @staticmethod
+    def _check_range(text, target):
+        start, end = target['startIndex'], target['endIndex']
+        if not 1 <= start < end <= len(text) + 1:
+            raise FakeApiError(400, f"Invalid range: {start}-{end}")
+        return start, end
+
+    def batch_update(self, requests):
+        text = self.text
+        styles = []
+        for request in requests:
+            if 'insertText' in request:
+                body = request['insertText']
+                if 'endOfSegmentLocation' in body:
+                    index = len(text)
+                else:
+                    index = body['location']['index']
+                # 只能插入在最后一个换行符之前
+                if not 1 <= index <= len(text):
+                    raise FakeApiError(400, f"Index {index} must be less than the end index of the segment")
+                text = text[:index - 1] + body['text'] + text[index - 1:]
+            elif 'deleteContentRange' in request:
+                start, end = self._check_range(text, request['deleteContentRange']['range'])
+                # 不能删除正文最后的换行符
+                if end > len(text):
+                    raise FakeApiError(400, "The range cannot include the newline at the end of the segment")
+                text = text[:start - 1] + text[end - 1:]
+            elif 'updateTextStyle' in request or 'updateParagraphStyle' in request:
+                kind = 'updateTextStyle' if 'updateTextStyle' in request else 'updateParagraphStyle'
+                self._check_range(text, request[kind]['range'])
+                styles.append(request)
+            else:
+                raise FakeApiError(400, f"替身未实现的请求: {list(request)}")
+        self.text = text
+        self.styles.extend(styles)
+        self.revision += 1
+        return {'replies': [{} for _ in requests]}
+
+
+class FakeGoogle:
+    """
+    Google API替身传输（线程安全）
+
+    Args:
+        latency_seconds: 每个请求模拟的网络延迟（秒），默认0
+    """
+    def __init__(self, latency_seconds=0.0):
+        self.latency_seconds = latency_seconds
+        self.spreadsheets = {}
+        self.documents = {}
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def add_spreadsheet(self, tabs, spreadsheet_id=SPREADSHEET_ID, sheet_ids=None):
+        """添加表格：tabs 为 工作表名 -> 行列表（第一行为表头）"""
+        self.spreadsheets[spreadsheet_id] = FakeSpreadsheet(tabs, sheet_ids)
+        return self.spreadsheets[spreadsheet_id]
+
+    def add_document(self, text='\n', document_id=DOCUMENT_ID):
+        """添加文档"""
+        self.documents[document_id] = FakeDocument(text)
+        return self.documents[document_id]
+
+    def install(self):
+        """注入到 google_client，之后所有Google API请求都由本替身处理"""
+        from google_client import use_transport
+        use_transport(self)
+        return self
+
+    @staticmethod
+    def uninstall():
+        """恢复真实的Google API传输"""
+        from google_client import use_transport
+        use_transport(None)
+
+    # ---- httplib2.Http 接口 ----
+
+    def request(self, uri, method='GET', body=None, headers=None, redirections=5, connection_type=None):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        parts = urlsplit(uri)
+        query = parse_qs(parts.query)
+        payload = json.loads(body) if body else {}
+        try:
+            with self._lock:
+                route, result = self._dispatch(method, parts.path, query, payload)
+                self.calls[route] += 1
+            status = 200
+        except FakeApiError as e:
+            status = e.status
+            result = {'error': {'code': e.status, 'message': str(e), 'status': 'INVALID_ARGUMENT'}}
+        response = httplib2.Response({'status': str(status), 'content-type': 'application/json; charset=UTF-8'})
+        return response, json.dumps(result, ensure_ascii=False).encode('utf-8')
+
+    def _spreadsheet(self, spreadsheet_id):
+        if spreadsheet_id not in self.spreadsheets:
+            raise FakeApiError(404, f"Requested entity was not found: {spreadsheet_id}")
+        return self.spreadsheets[spreadsheet_id]
+
+    def _document(self, document_id):
+        if document_id not in self.documents:
+            raise FakeApiError(404, f"Requested entity was not found: {document_id}")
+        return self.documents[document_id]
+
+    def _dispatch(self, method, path, query, payload):
+        """按URL路由请求，返回 (路由名, 响应内容)"""
+        match = re.fullmatch(r'/v4/spreadsheets/([^/:]+)/values:batchGet', path)
+        if match and method == 'GET':
+            sheet = self._spreadsheet(unquote(match.group(1)))
+            major_dimension = query.get('majorDimension', ['ROWS'])[0]
+            value_ranges = [sheet.get_values(name, major_dimension) for name in query.get('ranges', [])]
+            return 'sheets.values.batchGet', {'spreadsheetId': match.group(1), 'valueRanges': value_ranges}
+
+        match = re.fullmatch(r'/v4/spreadsheets/([^/:]+)/values/(.+):append', path)
+        if match and method == 'POST':
+            sheet = self._spreadsheet(unquote(match.group(1)))
+            return 'sheets.values.append', sheet.append_values(unquote(match.group(2)), payload.get('values', []))
+
+        match = re.fullmatch(r'/v4/spreadsheets/([^/:]+)/values/([^/]+)', path)
+        if match and method in ('GET', 'PUT'):
+            sheet = self._spreadsheet(unquote(match.group(1)))
+            range_name = unquote(match.group(2))
+            if method == 'GET':
+                major_dimension = query.get('majorDimension', ['ROWS'])[0]
+                return 'sheets.values.get', sheet.get_values(range_name, major_dimension)
+            return 'sheets.values.update', sheet.update_values(range_name, payload.get('values', []))
+
+        match = re.fullmatch(r'/v4/spreadsheets/([^/:]+):batchUpdate', path)
+        if match and method == 'POST':
+            sheet = self._spreadsheet(unquote(match.group(1)))
+            return 'sheets.batchUpdate', sheet.batch_update(payload.get('requests', []))
+
+        match = re.fullmatch(r'/drive/v3/files/([^/]+)', path)
+        if match and method == 'GET':
+            sheet = self._spreadsheet(unquote(match.group(1)))
+            return 'drive.files.get', {'modifiedTime': sheet.modified_time()}
+
+        match = re.fullmatch(r'/v1/documents/([^/:]+)', path)
+        if match and method == 'GET':
+            document_id = unquote(match.group(1))
+            return 'docs.documents.get', self._document(document_id).to_json(document_id)
+
+        match = re.fullmatch(r'/v1/documents/([^/:]+):batchUpdate', path)
+        if match and method == 'POST':
+            document_id = unquote(match.group(1))
+            result = self._document(document_id).batch_update(payload.get('requests', []))
+            return 'docs.documents.batchUpdate', dict(result, documentId=document_id)
+
+        raise FakeApiError(404, f"替身未实现的接口: {method} {path}")
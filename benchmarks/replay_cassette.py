@@ -0,0 +1,132 @@
+"""
+录制回放基准 - 按录制文件确定性地重新运行完整流程，测量本地CPU开销并检查请求数量是否发生变化
+
+用法:
+    python run.py --record cassettes/run.json                       # 先录制一次真实运行
+    python benchmarks/replay_cassette.py cassettes/run.json          # 按录制耗时回放
+    python benchmarks/replay_cassette.py cassettes/run.json --latency-scale 0 --json result.json
+
+回放时时间（datetime.now() 和 date.today()）固定为录制时刻（按实际流逝推进），组员名单、邮箱凭据使用占位值，
+无需网络、数据库和任何密钥。存在多出的请求（missing）或少了的请求（unused）时以状态码1退出。
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _FrozenClock(type):
+    """替身类的元类：isinstance 检查按真实的 datetime/date 进行（如 pd.Timestamp 仍是 datetime）"""
+    def __instancecheck__(cls, instance):
+        return isinstance(instance, cls.__mro__[1])
+
+
+def freeze_time(recorded_at):
+    """
+    将主流程各模块中的 datetime.now() 和 date.today() 固定为录制时刻（按实际流逝推进）
+    date.today() 取录制时刻所在时区（CHINA_TZ）的日期，与回放机器的时区无关，
+    周期标题、Docs请求序列和入库的 Date 与录制时一致
+    """
+    import main
+    import utils
+    import google_docs
+    import data_processor
+
+    origin = datetime.fromisoformat(recorded_at)
+    started = time.monotonic()
+
+    class ReplayDatetime(datetime, metaclass=_FrozenClock):
+        @classmethod
+        def now(cls, tz=None):
+            moment = datetime.fromtimestamp(origin.timestamp() + time.monotonic() - started, tz=origin.tzinfo)
+            if tz is not None:
+                moment = moment.astimezone(tz)
+            else:
+                moment = moment.astimezone().replace(tzinfo=None)
+            return cls(moment.year, moment.month, moment.day, moment.hour, moment.minute,
+                       moment.second, moment.microsecond, tzinfo=moment.tzinfo)
+
+    class ReplayDate(date, metaclass=_FrozenClock):
+        @classmethod
+        def today(cls):
+            moment = ReplayDatetime.now(origin.tzinfo)
+            return cls(moment.year, moment.month, moment.day)
+
+    for module in (main, utils, google_docs):
+        module.datetime = ReplayDatetime
+    for module in (utils, data_processor):
+        module.date = ReplayDate
+
+
+def stub_local_secrets(member_names):
+    """用占位值代替需要读取密钥文件的函数"""
+    import main
+    import email_sender
+
+    members = {name: f'member{index}@example.invalid' for index, name in enumerate(member_names)}
+    main.read_group_members = lambda _path: dict(members)
+    email_sender.read_email_credentials = lambda: ('replay@example.invalid', 'replay')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按录制文件回放完整流程')
+    parser.add_argument('cassette', help='录制文件路径')
+    parser.add_argument('--latency-scale', type=float, default=1.0,
+                        help='录制耗时的倍数（0 表示不等待，只测本地CPU开销，默认1）')
+    parser.add_argument('--json', metavar='PATH', help='将结果写入JSON文件')
+    args = parser.parse_args()
+
+    from cassette import Cassette, replaying
+    meta = Cassette.load(args.cassette).meta
+    if not meta.get('operator'):
+        print("✗ 录制文件中没有操作员信息（录制时程序未完成初始化）")
+        return 1
+
+    import main as main_module
+    freeze_time(meta['recorded_at'])
+    stub_local_secrets(meta.get('group_members') or [meta['operator']])
+
+    wall_started = time.perf_counter()
+    cpu_started = time.process_time()
+    with replaying(args.cassette, latency_scale=args.latency_scale) as session:
+        success = main_module.main(operator=meta['operator'])
+    wall_seconds = time.perf_counter() - wall_started
+    cpu_seconds = time.process_time() - cpu_started
+
+    report = session.report()
+    result = {
+        'cassette': os.path.abspath(args.cassette),
+        'recorded_at': meta['recorded_at'],
+        'latency_scale': args.latency_scale,
+        'success': bool(success),
+        'wall_seconds': round(wall_seconds, 3),
+        'cpu_seconds': round(cpu_seconds, 3),
+        **report
+    }
+
+    print("=" * 60)
+    print(f"回放结果: {'成功' if success else '失败'}")
+    print(f"耗时: {result['wall_seconds']} 秒（CPU {result['cpu_seconds']} 秒）")
+    print(f"已回放交互: {report['played']}")
+    if report['missing']:
+        print(f"⚠ 录制中没有的交互（多出的请求）{len(report['missing'])} 次:")
+        for item in report['missing']:
+            print(f"   {item}")
+    if report['unused']:
+        print(f"⚠ 未被使用的录制交互（少了的请求）: {report['unused']}")
+    if report['body_mismatches']:
+        print(f"⚠ 请求内容与录制不一致 {len(report['body_mismatches'])} 次")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    return 1 if report['missing'] or report['unused'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+合成数据生成器 - 为基准测试生成逼真的 Unfilled/Filled/Universities 工作表和周期文档
+
+生成的数据覆盖 create_job_title、generate_abbreviation 及标签列用到的全部表头，
+包含过期行、"Soon"行、与Filled重复的行以及缺少中文校名的行，比例均可调。
+同一随机种子生成的数据完全相同，便于不同版本之间对比。
+
+用法:
+    python benchmarks/synthetic_data.py --rows 10000 --out cache/synthetic_10k.json
+    python benchmarks/synthetic_data.py --listings 300 --doc-out cache/period_doc.txt
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import COUNTRY_DICTIONARY, LABEL_COLUMNS  # noqa: E402
+from utils import format_period_title, calculate_week_range  # noqa: E402
+from data_processor import generate_abbreviation, convert_to_wechat_format  # noqa: E402
+
+JOB_COLUMNS = ['Master Student', 'Doctoral Student', 'PostDoc', 'Research Assistant',
+               'Competition', 'Summer School', 'Conference', 'Workshop']
+
+# 共25列（A-Z以内，与 update_university_info 写回的 A:Z 范围一致）
+SHEET_HEADERS = [
+    'Verifier', 'Error', 'Source', 'Deadline', 'University_EN', 'University_CN', 'Country_CN',
+    'Direction', 'Number_Places', 'Contact_Name', 'Contact_Email'
+] + JOB_COLUMNS + LABEL_COLUMNS
+
+UNIVERSITY_HEADERS = ['University_EN', 'University_CN', 'Country_CN']
+
+DIRECTIONS = [
+    'GIS', 'Remote Sensing', 'Urban Planning', 'Human Geography', 'Physical Geography',
+    'Geomatics', 'Spatial Data Science', 'Hydrology', 'Climate Change', 'Transport Geography',
+    'Environmental Science', 'Cartography', 'GeoAI', 'Land Use', 'Glaciology'
+]
+# 学科方向对应的标签列（生成的标签与方向大致一致）
+DIRECTION_LABELS = {
+    'GIS': ['GIS'], 'Remote Sensing': ['RS'], 'Urban Planning': ['Urban'],
+    'Human Geography': ['Human_Geo'], 'Physical Geography': ['Physical_Geo'],
+    'Geomatics': ['GNSS', 'GIS'], 'Spatial Data Science': ['GIS'], 'Hydrology': ['Physical_Geo'],
+    'Climate Change': ['Physical_Geo'], 'Transport Geography': ['Human_Geo', 'Urban'],
+    'Environmental Science': ['Physical_Geo', 'RS'], 'Cartography': ['GIS'], 'GeoAI': ['GIS', 'RS'],
+    'Land Use': ['Human_Geo', 'RS'], 'Glaciology': ['Physical_Geo', 'RS']
+}
+# 职位类型的出现权重（博士、硕士最常见）
+JOB_WEIGHTS = [25, 40, 15, 8, 3, 4, 3, 2]
+
+CN_SYLLABLES = '华清复旦浙江南京武汉中山同济厦门山东吉林四川兰州东南西北湖滨海理工师范农林医科技大'
+EN_WORDS = ['North', 'South', 'East', 'West', 'Central', 'Royal', 'Technical', 'State', 'Lake',
+            'River', 'Mountain', 'Coastal', 'Capital', 'Metropolitan', 'National', 'Pacific']
+FIRST_NAMES = ['Alice', 'Bob', 'Carol', 'David', 'Emma', 'Frank', 'Grace', 'Henry', 'Ivy', 'Jack',
+               'Karen', 'Leo', 'Mia', 'Noah', 'Olivia', 'Paul', 'Quinn', 'Rosa', 'Sam', 'Tina']
+LAST_NAMES = ['Smith', 'Mueller', 'Tanaka', 'Garcia', 'Rossi', 'Kim', 'Dubois', 'Novak', 'Silva',
+              'Johansson', 'Wang', 'Li', 'Brown', 'Jones', 'Nguyen', 'Kowalski']
+SOON_VALUES = ['Soon', 'Soon', 'Soon', '尽快申请']
+
+
+def generate_universities(count, seed=0):
+    """
+    生成大学列表
+    Returns:
+        list: [University_EN, University_CN, Country_CN] 列表（英文名唯一）
+    """
+    rng = random.Random(seed)
+    countries = sorted(COUNTRY_DICTIONARY)
+    universities = []
+    for index in range(count):
+        country_cn = rng.choice(countries)
+        country_en = COUNTRY_DICTIONARY[country_cn]
+        word = rng.choice(EN_WORDS)
+        name_en = f"{word} University of {country_en} {index}"
+        name_cn = ''.join(rng.choice(CN_SYLLABLES) for _ in range(rng.randint(2, 4))) + f"大学{index}"
+        universities.append([name_en, name_cn, country_cn])
+    return universities
+
+
+def _random_deadline(rng, today, expired_ratio, soon_ratio):
+    roll = rng.random()
+    if roll < soon_ratio:
+        return rng.choice(SOON_VALUES)
+    if roll < soon_ratio + expired_ratio:
+        return (today - timedelta(days=rng.randint(1, 365))).strftime('%Y-%m-%d')
+    return (today + timedelta(days=rng.randint(0, 400))).strftime('%Y-%m-%d')
+
+
+def generate_row(rng, universities, today, expired_ratio=0.05, soon_ratio=0.15,
+                 missing_cn_ratio=0.0, verifiers=('Alice', 'Bob', 'Carol')):
+    """生成一行表格数据（值均为字符串，与Sheets API返回的格式一致）"""
+    university_en, university_cn, country_cn = rng.choice(universities)
+    if rng.random() < missing_cn_ratio:
+        university_cn, country_cn = '', ''
+    direction = rng.choice(DIRECTIONS)
+    contact = rng.random() < 0.8
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+    jobs = set(rng.choices(JOB_COLUMNS, weights=JOB_WEIGHTS, k=rng.choice([1, 1, 1, 2])))
+    labels = set(DIRECTION_LABELS[direction][:rng.randint(1, 2)])
+    verifier = rng.choices([rng.choice(verifiers), 'LLM', ''], weights=[80, 10, 10])[0]
+
+    row = {
+        'Verifier': verifier,
+        'Error': 'N' if rng.random() < 0.95 else '1',
+        'Source': f"https://example.org/positions/{rng.getrandbits(40):010x}",
+        'Deadline': _random_deadline(rng, today, expired_ratio, soon_ratio),
+        'University_EN': university_en,
+        'University_CN': university_cn,
+        'Country_CN': country_cn,
+        'Direction': direction,
+        'Number_Places': rng.choice(['', '1', '1', '2', '3', '5']),
+        'Contact_Name': f"{first} {last}" if contact else '-',
+        'Contact_Email': f"{first.lower()}.{last.lower()}@example.edu" if contact else '-'
+    }
+    for column in JOB_COLUMNS:
+        row[column] = '1' if column in jobs else '0'
+    for column in LABEL_COLUMNS:
+        row[column] = '1' if column in labels else '0'
+    return [row[column] for column in SHEET_HEADERS]
+
+
+def generate_tabs(rows, filled_rows=None, university_count=2000, seed=0,
+                  expired_ratio=0.05, soon_ratio=0.15, duplicate_ratio=0.02, missing_cn_ratio=0.01):
+    """
+    生成 Unfilled/Filled/Universities 三个工作表（第一行为表头）
+
+    Args:
+        rows: Unfilled 行数
+        filled_rows: Filled 行数（默认与 rows 相同）
+        university_count: 大学数量
+        seed: 随机种子
+        expired_ratio: 已过期行的比例
+        soon_ratio: Deadline 为 Soon 的比例
+        duplicate_ratio: Unfilled 中与 Filled 重复（Deadline/Direction/University_EN/Contact_Email相同）的比例
+        missing_cn_ratio: 缺少中文校名和国家的比例（由 update_university_info 补全）
+    Returns:
+        dict: 工作表名称 -> 行列表
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    universities = generate_universities(university_count, seed)
+    filled_rows = rows if filled_rows is None else filled_rows
+
+    filled = [generate_row(rng, universities, today, expired_ratio=0.5, soon_ratio=0.05)
+              for _ in range(filled_rows)]
+    unfilled = []
+    for _ in range(rows):
+        if filled and rng.random() < duplicate_ratio:
+            unfilled.append(list(rng.choice(filled)))
+        else:
+            unfilled.append(generate_row(rng, universities, today, expired_ratio, soon_ratio, missing_cn_ratio))
+
+    return {
+        'Unfilled': [list(SHEET_HEADERS)] + unfilled,
+        'Filled': [list(SHEET_HEADERS)] + filled,
+        'Universities': [list(UNIVERSITY_HEADERS)] + universities
+    }
+
+
+def generate_listing(rng, universities, today):
+    """生成一条周期文档中的 ### 职位内容（使用真实的公众号格式转换）"""
+    values = generate_row(rng, universities, today, expired_ratio=0.0, soon_ratio=0.2)
+    row = dict(zip(SHEET_HEADERS, values))
+    abbreviation = generate_abbreviation(row) or 'PhD'
+    return convert_to_wechat_format(row, abbreviation)
+
+
+def generate_period_document(listings, periods=4, university_count=500, seed=0):
+    """
+    生成包含多个周期的文档文本，最后一个周期为当前周期
+
+    Args:
+        listings: 每个周期中的 ### 职位条数
+        periods: 周期数量
+    Returns:
+        tuple: (文档文本, 当前周期标题)
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    universities = generate_universities(university_count, seed)
+    week_start, _week_end = calculate_week_range()
+    current_start = date.fromisoformat(week_start)
+
+    text = "GISphere 海外资讯\n"
+    subtitle = ''
+    for offset in range(periods - 1, -1, -1):
+        start = current_start - timedelta(days=14 * offset)
+        end = start + timedelta(days=13)
+        subtitle = format_period_title(start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+        text += f"\n\n{subtitle}\n\n"
+        text += '\n'.join(generate_listing(rng, universities, today) for _ in range(listings))
+    return text, subtitle
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成基准测试用的合成数据')
+    parser.add_argument('--rows', type=int, default=1000, help='Unfilled/Filled 行数（默认1000）')
+    parser.add_argument('--universities', type=int, default=2000, help='大学数量（默认2000）')
+    parser.add_argument('--listings', type=int, default=300, help='文档每个周期的职位条数（默认300）')
+    parser.add_argument('--periods', type=int, default=4, help='文档周期数（默认4）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--out', help='工作表数据输出路径（JSON）')
+    parser.add_argument('--doc-out', help='周期文档输出路径（纯文本）')
+    args = parser.parse_args()
+
+    if not args.out and not args.doc_out:
+        parser.error('请至少指定 --out 或 --doc-out')
+
+    if args.out:
+        tabs = generate_tabs(args.rows, university_count=args.universities, seed=args.seed)
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(tabs, f, ensure_ascii=False)
+        print(f"✓ 已生成工作表数据: {args.out}（" +
+              '，'.join(f"{tab} {len(values) - 1} 行" for tab, values in tabs.items()) + "）")
+
+    if args.doc_out:
+        text, subtitle = generate_period_document(args.listings, args.periods, seed=args.seed)
+        os.makedirs(os.path.dirname(os.path.abspath(args.doc_out)), exist_ok=True)
+        with open(args.doc_out, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"✓ 已生成周期文档: {args.doc_out}（{args.periods} 个周期，当前周期 {subtitle}）")
+
+
+if __name__ == '__main__':
+    main()
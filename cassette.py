@@ -0,0 +1,633 @@
+"""
+录制/回放模块 - 录制一次运行中所有对外交互（Google Sheets/Docs/Drive、MySQL、SMTP、OpenAI），
+并可在没有网络和密钥的情况下按录制结果确定性地回放，用于性能回归测试
+
+- 录制：python run.py --record cassettes/run.json
+- 回放：python benchmarks/replay_cassette.py cassettes/run.json
+
+录制文件中不保存任何密钥：Authorization请求头、SMTP登录信息、OpenAI密钥均不录制，
+URL中的 key/access_token 参数替换为占位符。Google请求和响应内容、SQL参数和结果、LLM回复、
+邮件主题及SMTP错误信息中的邮箱地址替换为等长的占位地址（同一地址始终对应同一占位地址），
+回放时去重比较和Docs索引计算与录制时一致。
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+
+from config import CHINA_TZ, GOOGLE_HTTP_TIMEOUT_SECONDS
+
+CASSETTE_VERSION = 2
+REDACTED = '<redacted>'
+SECRET_QUERY_KEYS = {'key', 'access_token', 'token'}
+EMAIL_PATTERN = re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+')
+
+
+class CassetteMiss(Exception):
+    """回放时遇到录制文件中没有的交互（通常意味着多出了请求）"""
+
+
+def redact_uri(uri):
+    """去掉URL中的主机部分和密钥参数，返回用于匹配的 路径?查询参数"""
+    parts = urlsplit(uri)
+    query = [(k, REDACTED if k in SECRET_QUERY_KEYS else v) for k, v in parse_qsl(parts.query, keep_blank_values=True)]
+    return parts.path + ('?' + urlencode(query) if query else '')
+
+
+class EmailRedactor:
+    """
+    将邮箱地址替换为等长的占位地址（除 @ 和 . 外的字符换成 x 及序号）
+
+    同一地址在一次录制中始终对应同一占位地址，不同地址对应不同占位地址，
+    因此回放时重复行检查的结果不变；长度不变，Docs响应中的索引仍与文本一致。
+    """
+    def __init__(self):
+        self._placeholders = {}
+        self._used = set()
+        self._lock = threading.Lock()
+
+    def _placeholder(self, email):
+        slots = [index for index, char in enumerate(email) if char not in '@.']
+        sequence = len(self._placeholders) + 1
+        while True:
+            tag = ''
+            number = sequence
+            while number:
+                number, digit = divmod(number, 36)
+                tag = '0123456789abcdefghijklmnopqrstuvwxyz'[digit] + tag
+            chars = list(email)
+            for index, char in zip(slots, tag[-len(slots):].rjust(len(slots), 'x')):
+                chars[index] = char
+            placeholder = ''.join(chars)
+            if placeholder not in self._used:
+                return placeholder
+            sequence += 1
+
+    def _replace(self, match):
+        email = match.group(0)
+        with self._lock:
+            if email not in self._placeholders:
+                placeholder = self._placeholder(email)
+                self._placeholders[email] = placeholder
+                self._used.add(placeholder)
+            return self._placeholders[email]
+
+    def redact(self, value):
+        """替换字符串、列表和字典（递归）中的邮箱地址"""
+        if isinstance(value, str):
+            return EMAIL_PATTERN.sub(self._replace, value)
+        if isinstance(value, list):
+            return [self.redact(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self.redact(item) for key, item in value.items()}
+        return value
+
+    def redact_json_text(self, text):
+        """替换JSON文本中的邮箱地址（解析后逐个字符串替换，避免破坏 \\uXXXX 转义）"""
+        return canonical_json_text(text, self.redact)
+
+
+def canonical_json_text(text, transform=None):
+    """
+    将JSON文本解析后按 json.dumps 默认格式重新生成（非JSON文本原样返回），
+    录制时的脱敏结果与回放时的请求内容按同一格式比较
+    """
+    if not isinstance(text, str):
+        return text
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return transform(text) if transform else text
+    return json.dumps(transform(value) if transform else value)
+
+
+def to_jsonable(value):
+    """将数据库结果等转换为可写入JSON的值"""
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if hasattr(value, 'item'):  # numpy 标量
+        return value.item()
+    return str(value)
+
+
+def normalize_query(query):
+    """规范化SQL语句的空白，用作回放时的匹配键"""
+    return ' '.join(query.split())
+
+
+class Cassette:
+    """录制文件：按发生顺序保存的交互列表（线程安全）"""
+    def __init__(self, interactions=None, meta=None):
+        self.interactions = interactions or []
+        self.meta = meta or {}
+        self.redactor = EmailRedactor()
+        self._lock = threading.Lock()
+
+    def add(self, kind, **fields):
+        with self._lock:
+            self.interactions.append(dict(fields, kind=kind))
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CASSETTE_VERSION, 'meta': self.meta, 'interactions': self.interactions},
+                      f, ensure_ascii=False, indent=1)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != CASSETTE_VERSION:
+            raise ValueError(f"不支持的录制文件版本: {data.get('version')}")
+        return cls(data['interactions'], data.get('meta', {}))
+
+    def summary(self):
+        """各类交互的数量"""
+        return dict(Counter(item['kind'] for item in self.interactions))
+
+
+@contextmanager
+def _isolated_mirror():
+    """录制和回放都从空的表格镜像开始，使Sheets请求序列不受本地缓存状态影响"""
+    import sheets_mirror
+    original = sheets_mirror.SHEETS_MIRROR_FILE
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sheets_mirror.SHEETS_MIRROR_FILE = os.path.join(tmp_dir, 'sheets_mirror.sqlite')
+        try:
+            yield
+        finally:
+            sheets_mirror.SHEETS_MIRROR_FILE = original
+
+
+@contextmanager
+def _installed(transport, connection_factory, smtp_factory, llm_factory):
+    """安装各个外部交互的替身，退出时恢复"""
+    from google_client import use_transport
+    from database import use_connection_override
+    from email_sender import use_smtp_factory
+    from google_docs import use_llm_client_factory
+
+    use_transport(transport)
+    use_connection_override(connection_factory)
+    use_smtp_factory(smtp_factory)
+    use_llm_client_factory(llm_factory)
+    try:
+        yield
+    finally:
+        use_transport(None)
+        use_connection_override(None)
+        use_smtp_factory(None)
+        use_llm_client_factory(None)
+
+
+# ==================== 录制 ====================
+
+class RecordingTransport:
+    """录制Google API请求的httplib2传输（每个线程使用各自的已授权传输）"""
+    def __init__(self, cassette):
+        self.cassette = cassette
+        self._local = threading.local()
+
+    def _http(self):
+        from google_client import get_credentials
+        creds = get_credentials()
+        http = getattr(self._local, 'http', None)
+        if http is None or http.credentials is not creds:
+            http = AuthorizedHttp(creds, http=httplib2.Http(timeout=GOOGLE_HTTP_TIMEOUT_SECONDS))
+            self._local.http = http
+        return http
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        started = time.perf_counter()
+        response, content = self._http().request(uri, method, body=body, headers=headers, **kwargs)
+        self.cassette.add(
+            'google',
+            method=method,
+            uri=redact_uri(uri),
+            body=self.cassette.redactor.redact_json_text(body.decode('utf-8') if isinstance(body, bytes) else body),
+            status=response.status,
+            content_type=response.get('content-type', 'application/json'),
+            response=self.cassette.redactor.redact_json_text(content.decode('utf-8')),
+            latency=round(time.perf_counter() - started, 6)
+        )
+        return response, content
+
+
+class RecordingCursor:
+    """录制SQL语句及其结果的游标（执行后立即取出全部结果，以便随语句一起录制）"""
+    def __init__(self, cursor, cassette):
+        self._cursor = cursor
+        self._cassette = cassette
+        self._rows = []
+
+    def execute(self, query, params=None):
+        started = time.perf_counter()
+        result = self._cursor.execute(query, params)
+        self._rows = self._cursor.fetchall() if getattr(self._cursor, 'with_rows', False) else []
+        self._cassette.add(
+            'mysql',
+            query=normalize_query(query),
+            params=self._cassette.redactor.redact(to_jsonable(params)),
+            rows=self._cassette.redactor.redact(to_jsonable(self._rows)),
+            rowcount=self._cursor.rowcount,
+            latency=round(time.perf_counter() - started, 6)
+        )
+        return result
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class RecordingConnection:
+    """录制提交操作的数据库连接"""
+    def __init__(self, conn, cassette):
+        self._conn = conn
+        self._cassette = cassette
+
+    def cursor(self, *args, **kwargs):
+        return RecordingCursor(self._conn.cursor(*args, **kwargs), self._cassette)
+
+    def commit(self):
+        started = time.perf_counter()
+        self._conn.commit()
+        self._cassette.add('mysql', query='COMMIT', params=None, rows=[], rowcount=0,
+                           latency=round(time.perf_counter() - started, 6))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def _message_subject(message):
+    """取出邮件主题（message 为 email.message.Message、字符串或字节）"""
+    if isinstance(message, (str, bytes)):
+        from email import message_from_bytes, message_from_string
+        message = message_from_bytes(message) if isinstance(message, bytes) else message_from_string(message)
+    subject = message['Subject']
+    return None if subject is None else str(subject)
+
+
+class RecordingSMTP:
+    """
+    录制SMTP会话（只记录主题、结果和耗时，不记录登录信息与收件地址）
+
+    每次发送在调用时立即录制；连接、STARTTLS、登录或发送失败时录制出错的阶段和错误，
+    即使会话没有调用 quit() 也不会丢失。
+    """
+    def __init__(self, cassette, host, port, timeout=None):
+        import smtplib
+        self._cassette = cassette
+        self._last = time.perf_counter()
+        self._smtp = self._call('connect', smtplib.SMTP, host, port, timeout=timeout)
+
+    def _record(self, stage, subject=None, error=None):
+        """录制一次SMTP交互，耗时从上一次录制（或建立会话）算起"""
+        now = time.perf_counter()
+        latency, self._last = now - self._last, now
+        self._cassette.add('smtp', stage=stage, subject=self._cassette.redactor.redact(subject),
+                           error=self._cassette.redactor.redact(error), latency=round(latency, 6))
+
+    def _call(self, stage, func, *args, subject=None, **kwargs):
+        """执行SMTP操作：发送总是录制，其他阶段只在失败时录制"""
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._record(stage, subject, f"{type(e).__name__}: {e}")
+            raise
+        if stage == 'send':
+            self._record(stage, subject)
+        return result
+
+    def starttls(self, *args, **kwargs):
+        return self._call('starttls', self._smtp.starttls, *args, **kwargs)
+
+    def login(self, *args, **kwargs):
+        return self._call('login', self._smtp.login, *args, **kwargs)
+
+    def send_message(self, message, *args, **kwargs):
+        return self._call('send', self._smtp.send_message, message, *args,
+                          subject=_message_subject(message), **kwargs)
+
+    def sendmail(self, from_addr, to_addrs, message, *args, **kwargs):
+        return self._call('send', self._smtp.sendmail, from_addr, to_addrs, message, *args,
+                          subject=_message_subject(message), **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._smtp, name)
+
+
+class RecordingLLMClient:
+    """录制 chat.completions.create 调用的OpenAI客户端"""
+    def __init__(self, client, cassette):
+        self._client = client
+        self._cassette = cassette
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        started = time.perf_counter()
+        response = self._client.chat.completions.create(**kwargs)
+        prompt = json.dumps(kwargs.get('messages', []), ensure_ascii=False)
+        usage = getattr(response, 'usage', None)
+        self._cassette.add(
+            'openai',
+            model=kwargs.get('model'),
+            prompt_sha1=hashlib.sha1(prompt.encode('utf-8')).hexdigest(),
+            response=self._cassette.redactor.redact(response.choices[0].message.content),
+            usage={
+                'prompt_tokens': getattr(usage, 'prompt_tokens', None),
+                'completion_tokens': getattr(usage, 'completion_tokens', None)
+            },
+            latency=round(time.perf_counter() - started, 6)
+        )
+        return response
+
+
+@contextmanager
+def recording(path):
+    """
+    录制上下文：期间所有对外交互写入录制文件
+
+    Args:
+        path: 录制文件路径
+    """
+    from database import open_database_connection
+    from google_docs import open_llm_client
+
+    from config import GROUP_MEMBERS_FILE
+    from utils import read_group_members
+
+    # 回放时需要相同的组员名单（决定提醒邮件的数量），只保存姓名
+    cassette = Cassette(meta={
+        'recorded_at': datetime.now(CHINA_TZ).isoformat(),
+        'group_members': list(read_group_members(GROUP_MEMBERS_FILE))
+    })
+
+    def connection_factory(timeout):
+        started = time.perf_counter()
+        conn, cursor = open_database_connection(timeout)
+        cassette.add('mysql', query='CONNECT', params=None, rows=[], rowcount=0, failed=conn is None,
+                     latency=round(time.perf_counter() - started, 6))
+        if conn is None:
+            return None, None
+        return RecordingConnection(conn, cassette), RecordingCursor(cursor, cassette)
+
+    def llm_factory():
+        client = open_llm_client()
+        # 记录是否拿到了客户端，回放时无密钥的分支保持一致
+        cassette.add('llm_client', available=client is not None, latency=0)
+        return RecordingLLMClient(client, cassette) if client is not None else None
+
+    print(f"录制模式：对外交互将写入 {path}")
+    with _isolated_mirror(), _installed(
+        RecordingTransport(cassette),
+        connection_factory,
+        lambda host, port, timeout=None: RecordingSMTP(cassette, host, port, timeout),
+        llm_factory
+    ):
+        try:
+            yield cassette
+        finally:
+            import logger
+            for entry in logger._session_log_buffer:
+                if entry['step'] == 'INIT':
+                    cassette.meta['operator'] = entry['data'].get('operator')
+            cassette.save(path)
+            print(f"✓ 已录制 {len(cassette.interactions)} 次交互: {cassette.summary()}")
+
+
+# ==================== 回放 ====================
+
+class ReplaySession:
+    """
+    回放会话：按录制结果响应请求，并按录制的耗时乘以 latency_scale 模拟等待
+
+    Google请求按 (方法, 路径及参数) 匹配，SQL按语句匹配，同一键的多次交互按录制顺序依次使用；
+    SMTP按发送顺序使用（录制时连接、登录失败的，回放时在同一阶段抛出错误），OpenAI按顺序使用。无法匹配的交互计入 missing，未被使用的录制计入 unused。
+    """
+    def __init__(self, cassette, latency_scale=1.0):
+        self.cassette = cassette
+        self.latency_scale = latency_scale
+        self.queues = defaultdict(deque)
+        for item in cassette.interactions:
+            self.queues[self._key(item)].append(item)
+        self.played = Counter()
+        self.missing = []
+        self.body_mismatches = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(item):
+        if item['kind'] == 'google':
+            return ('google', item['method'], item['uri'])
+        if item['kind'] == 'mysql':
+            return ('mysql', item['query'])
+        return (item['kind'],)
+
+    def take(self, key):
+        """取出下一条匹配的录制交互并模拟其耗时"""
+        with self._lock:
+            queue = self.queues.get(key)
+            if not queue:
+                self.missing.append(' '.join(str(part) for part in key))
+                raise CassetteMiss(f"录制文件中没有匹配的交互: {key}")
+            item = queue.popleft()
+            self.played[key[0]] += 1
+        if self.latency_scale:
+            time.sleep(item.get('latency', 0) * self.latency_scale)
+        return item
+
+    def unused(self):
+        """未被使用的录制交互数量（按类型）"""
+        counts = Counter()
+        for key, queue in self.queues.items():
+            counts[key[0]] += len(queue)
+        return {kind: count for kind, count in counts.items() if count}
+
+    def report(self):
+        return {
+            'played': dict(self.played),
+            'missing': list(self.missing),
+            'unused': self.unused(),
+            'body_mismatches': list(self.body_mismatches)
+        }
+
+    # ---- Google ----
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        key = ('google', method, redact_uri(uri))
+        try:
+            item = self.take(key)
+        except CassetteMiss as e:
+            error = json.dumps({'error': {'code': 404, 'message': str(e), 'status': 'NOT_FOUND'}})
+            return httplib2.Response({'status': '404', 'content-type': 'application/json'}), error.encode('utf-8')
+        body_text = canonical_json_text(body.decode('utf-8') if isinstance(body, bytes) else body)
+        if body_text != item.get('body'):
+            with self._lock:
+                self.body_mismatches.append(f"{method} {key[2]}")
+        response = httplib2.Response({'status': str(item['status']), 'content-type': item['content_type']})
+        return response, item['response'].encode('utf-8')
+
+    # ---- MySQL ----
+
+    def connect(self, timeout=60):
+        item = self.take(('mysql', 'CONNECT'))
+        if item.get('failed'):
+            return None, None
+        conn = ReplayConnection(self)
+        return conn, conn.cursor()
+
+    # ---- SMTP / OpenAI ----
+
+    def smtp(self, host, port, timeout=None):
+        smtp = ReplaySMTP(self)
+        smtp.replay_stage('connect')
+        return smtp
+
+    def take_smtp(self, stage, subject=None):
+        """
+        取出下一条SMTP录制：发送阶段总是取出（主题与录制不同时计入 body_mismatches）；
+        其他阶段只在录制了该阶段的失败时取出
+        Returns:
+            dict: 录制的交互；该阶段未录制（录制时成功）时返回 None
+        """
+        if stage != 'send':
+            with self._lock:
+                queue = self.queues.get(('smtp',))
+                if not queue or queue[0].get('stage') != stage:
+                    return None
+        item = self.take(('smtp',))
+        if stage == 'send' and (item.get('stage') != 'send' or item.get('subject') != subject):
+            with self._lock:
+                self.body_mismatches.append(f"SMTP send {subject}")
+        return item
+
+    def llm_client(self):
+        item = self.take(('llm_client',))
+        return ReplayLLMClient(self) if item['available'] else None
+
+
+class ReplayCursor:
+    def __init__(self, session):
+        self._session = session
+        self._rows = []
+        self.rowcount = -1
+
+    def execute(self, query, params=None):
+        item = self._session.take(('mysql', normalize_query(query)))
+        self._rows = [list(row) for row in item['rows']]
+        self.rowcount = item['rowcount']
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def close(self):
+        pass
+
+
+class ReplayConnection:
+    def __init__(self, session):
+        self._session = session
+
+    def cursor(self, *args, **kwargs):
+        return ReplayCursor(self._session)
+
+    def commit(self):
+        self._session.take(('mysql', 'COMMIT'))
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    def is_connected(self):
+        return True
+
+
+class ReplaySMTP:
+    """SMTP替身：按录制结果依次模拟各阶段的耗时和失败，发送时比较邮件主题"""
+    def __init__(self, session):
+        self._session = session
+
+    def replay_stage(self, stage, subject=None):
+        """回放一个阶段：录制时失败则抛出同样的错误信息"""
+        import smtplib
+        item = self._session.take_smtp(stage, subject)
+        if item and item.get('error'):
+            raise smtplib.SMTPException(item['error'])
+
+    def starttls(self, *args, **kwargs):
+        self.replay_stage('starttls')
+
+    def login(self, *args, **kwargs):
+        self.replay_stage('login')
+
+    def send_message(self, message, *args, **kwargs):
+        self.replay_stage('send', _message_subject(message))
+        return {}
+
+    def sendmail(self, from_addr, to_addrs, message, *args, **kwargs):
+        self.replay_stage('send', _message_subject(message))
+        return {}
+
+    def quit(self):
+        pass
+
+
+class ReplayLLMClient:
+    """OpenAI客户端替身：按顺序返回录制的回复"""
+    def __init__(self, session):
+        self._session = session
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        item = self._session.take(('openai',))
+        message = SimpleNamespace(content=item['response'])
+        usage = SimpleNamespace(**(item.get('usage') or {}))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+@contextmanager
+def replaying(path, latency_scale=1.0):
+    """
+    回放上下文：期间所有对外交互由录制文件响应
+
+    Args:
+        path: 录制文件路径
+        latency_scale: 耗时倍数（1 按录制耗时等待，0 不等待，只测本地CPU开销）
+    """
+    session = ReplaySession(Cassette.load(path), latency_scale)
+    with _isolated_mirror(), _installed(session, session.connect, session.smtp, session.llm_client):
+        yield session
@@ -12,12 +12,33 @@ SYSTEM_PLATFORM = platform.system()  # 'Windows', 'Darwin' (macOS), 'Linux'
 # Google Sheets API 配置
 SCOPES_SHEETS = ['https://www.googleapis.com/auth/spreadsheets']
 SCOPES_DOCS = ['https://www.googleapis.com/auth/documents']
+SCOPES_DRIVE_METADATA = ['https://www.googleapis.com/auth/drive.metadata.readonly']  # 读取表格修改时间
+GOOGLE_SCOPES = SCOPES_SHEETS + SCOPES_DOCS + SCOPES_DRIVE_METADATA  # 统一令牌一次申请全部权限
+GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS = 300  # 令牌过期前N秒由后台线程提前刷新
 SPREADSHEET_ID = '1LcfxcTCuj9ZJXXMxyFQwt-xnbAviNP8j9oDr6OG5-Go'
 DOCUMENT_ID = '1PhNqalVi-5BWEiqANN4NAw26V3c-JcJpjrtQJVgenvY'
 
 # 工作表ID
 UNFILLED_SHEET_ID = 0
 
+# 单次batchUpdate最多包含的请求数（批量删除行时分批提交）
+SHEETS_BATCH_MAX_REQUESTS = 100
+
+# Google API 限流与重试（每分钟请求数，按每用户配额设置）
+GOOGLE_API_RATE_LIMITS = {
+    'sheets_read': 60,
+    'sheets_write': 60,
+    'docs_read': 300,
+    'docs_write': 60,
+    'drive_read': 600
+}
+GOOGLE_API_MAX_RETRIES = 5
+GOOGLE_API_BACKOFF_BASE_SECONDS = 1
+GOOGLE_API_BACKOFF_MAX_SECONDS = 32
+GOOGLE_HTTP_TIMEOUT_SECONDS = 60  # 单个请求的网络超时
+# 替换Google API服务地址（如指向本地的替身服务进行离线测试），为空时使用官方地址
+GOOGLE_API_ENDPOINT = os.getenv('GISOURCE_GOOGLE_API_ENDPOINT', '')
+
 # 时区设置
 CHINA_TZ = pytz.timezone('Asia/Shanghai')
 
@@ -25,12 +46,33 @@ CHINA_TZ = pytz.timezone('Asia/Shanghai')
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 KEYS_DIR = os.path.join(BASE_DIR, 'keys')
 CREDENTIALS_FILE = os.path.join(KEYS_DIR, 'credentials.json')
-TOKEN_PICKLE_FILE = os.path.join(KEYS_DIR, 'token.pickle')
 TOKEN_JSON_FILE = os.path.join(KEYS_DIR, 'token.json')
 EMAIL_CREDENTIALS_FILE = os.path.join(KEYS_DIR, 'email_credentials.txt')
 GROUP_MEMBERS_FILE = os.path.join(KEYS_DIR, 'group_members.txt')
 SQL_CREDENTIALS_FILE = os.path.join(KEYS_DIR, 'sql_credentials.txt')
 
+# 本地缓存目录（表格镜像等）
+CACHE_DIR = os.path.join(BASE_DIR, 'cache')
+SHEETS_MIRROR_FILE = os.path.join(CACHE_DIR, 'sheets_mirror.sqlite')
+DISCOVERY_CACHE_DIR = os.path.join(CACHE_DIR, 'discovery')  # 固定版本的Google API discovery文档
+MIRROR_FULL_SYNC_HOURS = 24  # 仅追加的工作表最长每隔N小时做一次全量同步（捕获人工修改）
+
+# 历史资讯补录（backfill.py）
+BACKFILL_CHUNK_ROWS = 500  # 每次从Filled工作表或GISource表读取的行数
+BACKFILL_OUTPUT_DIR = os.path.join(CACHE_DIR, 'backfill')  # 默认输出目录
+
+# Filled表只需用到的列（重复检查及新大学检查），按列投影拉取
+FILLED_COLUMNS = ['Deadline', 'Direction', 'University_EN', 'Contact_Email', 'University_CN', 'Country_CN']
+
+# 流水线并发配置（相互独立的步骤并发执行的最大线程数）
+PIPELINE_MAX_WORKERS = 4
+
+# 数据库连接池大小（常驻模式使用）
+DB_POOL_SIZE = 4
+
+# GISource 大学信息快照有效期（秒），常驻模式下在有效期内跨运行复用
+GISOURCE_SNAPSHOT_TTL_SECONDS = 30 * 60
+
 # SMTP配置
 SMTP_SERVER = "smtp.gmail.com"
 SMTP_PORT = 587
@@ -262,12 +304,20 @@ SUBJECT_DICTIONARY = {
     "GNSS": "测绘学"
 }
 
+# utils 中文本格式化函数（拼音、英文数字、中文日期）的缓存条数上限
+TEXT_HELPER_CACHE_SIZE = 4096
+
 # 标签列
 LABEL_COLUMNS = ["Physical_Geo", "Human_Geo", "Urban", "GIS", "RS", "GNSS"]
 
 # 必填列
 REQUIRED_COLUMNS = ["Source", "Deadline", "Country_CN", "University_CN", "University_EN", "Direction"]
 
+# 表示"尽快申请"的Deadline取值
+DEADLINE_SOON_VALUES = ["Soon", "soon", "SOON", "尽快申请"]
+# 标准化后的截止日期列（由 utils.add_deadline_columns 添加，不写回表格）
+DEADLINE_COLUMNS = ["Deadline_Date", "Deadline_Is_Soon", "Deadline_Is_Invalid"]
+
 # LLM 配置
 OPENAI_MODEL = "gpt-5-chat-latest"
 OPENAI_BASE_URL = "https://oneapi.gisphere.info/v1"
@@ -275,3 +325,27 @@ OPENAI_BASE_URL = "https://oneapi.gisphere.info/v1"
 # 日志文件夹路径
 LLM_LOGS_DIR = os.path.join(BASE_DIR, 'llm_logs')
 LOGS_DIR = os.path.join(BASE_DIR, 'logs')
+RUNS_LOG_MAX_BYTES = 10 * 1024 * 1024  # logs/runs.jsonl 超过该大小时轮转
+RUNS_LOG_BACKUPS = 5  # 保留的轮转文件数量（runs.jsonl.1 ~ runs.jsonl.N）
+LOG_FLUSH_INTERVAL_SECONDS = 1.0  # 终端输出日志最长每隔N秒写入磁盘
+LOG_FLUSH_BUFFER_BYTES = 64 * 1024  # 缓冲超过该大小时立即写入磁盘
+# 日志保留策略（logs/run_*.txt 与 llm_logs/llm_*.txt，每次运行开始时执行）
+LOG_COMPRESS_AFTER_DAYS = 1  # 超过N天未修改的日志压缩为 .gz
+LOG_RETENTION_DAYS = 90  # 超过N天的日志删除
+LOG_DIR_MAX_MB = 500  # 每个日志目录的大小上限，超出时从最旧的开始删除
+# LLM对话按天追加到同一个文件（llm_YYYYMMDD.txt），而不是每次对话一个文件
+LLM_LOG_DAILY_SEGMENT = os.getenv('GISOURCE_LLM_LOG_DAILY', 'false').lower() == 'true'
+LLM_LOG_DRAIN_TIMEOUT_SECONDS = 10  # 运行结束或退出时等待LLM对话写入日志的最长时间
+
+# 运行指标（Prometheus文本格式），每次运行结束时写入，供 node-exporter 的 textfile collector 采集
+# 设置环境变量 GISOURCE_METRICS_TEXTFILE 为空字符串可关闭写入
+METRICS_TEXTFILE = os.getenv('GISOURCE_METRICS_TEXTFILE', os.path.join(LOGS_DIR, 'gisource.prom'))
+METRICS_STATE_FILE = os.path.join(LOGS_DIR, 'metrics_state.json')  # 计数器累计值（跨运行保持单调递增）
+
+# 常驻（daemon）模式配置
+# 操作员姓名从环境变量 GISOURCE_OPERATOR 读取，代替交互式输入，必须在组员名单中
+DAEMON_OPERATOR = os.getenv('GISOURCE_OPERATOR', '')
+DAEMON_INTERVAL_MINUTES = int(os.getenv('GISOURCE_DAEMON_INTERVAL', '30'))  # 每隔N分钟运行一次
+DAEMON_POSTING_HOURS = (9, 22)  # 发布时段（中国时间，[开始小时, 结束小时)）
+DAEMON_HEALTH_PORT = int(os.getenv('GISOURCE_HEALTH_PORT', '8765'))  # 健康检查端口，0 表示不启用
+DAEMON_STATUS_FILE = os.path.join(LOGS_DIR, 'daemon_status.json')
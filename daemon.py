@@ -0,0 +1,265 @@
+"""
+常驻（daemon）模式 - 保持进程常驻，按计划周期性运行发布流程
+进程常驻期间复用已授权的Google服务、数据库连接池和GISource大学信息快照，
+避免每次运行都重新启动解释器、加载pandas、解析discovery文档和OAuth授权
+"""
+import json
+import os
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import (
+    CHINA_TZ,
+    DAEMON_OPERATOR,
+    DAEMON_INTERVAL_MINUTES,
+    DAEMON_POSTING_HOURS,
+    DAEMON_HEALTH_PORT,
+    DAEMON_STATUS_FILE,
+    GISOURCE_SNAPSHOT_TTL_SECONDS
+)
+
+
+class PublishDaemon:
+    """
+    发布流程调度器
+
+    在发布时段内每隔 interval_minutes 分钟运行一次 main.main()，
+    并记录健康状态与最近一次运行结果（写入状态文件，并可通过HTTP查询）
+    """
+    def __init__(self, operator=DAEMON_OPERATOR, interval_minutes=DAEMON_INTERVAL_MINUTES,
+                 posting_hours=DAEMON_POSTING_HOURS, health_port=DAEMON_HEALTH_PORT):
+        self.operator = operator
+        self.interval = timedelta(minutes=interval_minutes)
+        self.posting_hours = posting_hours
+        self.health_port = health_port
+        self._stop_event = threading.Event()
+        self._status_lock = threading.Lock()
+        self._http_server = None
+        self.status = {
+            'pid': os.getpid(),
+            'state': 'starting',
+            'started_at': self._now().isoformat(),
+            'operator': operator,
+            'interval_minutes': interval_minutes,
+            'posting_hours': list(posting_hours),
+            'runs_total': 0,
+            'runs_failed': 0,
+            'last_run': None,
+            'next_run_at': None,
+            'last_heartbeat': None
+        }
+
+    @staticmethod
+    def _now():
+        return datetime.now(CHINA_TZ)
+
+    def in_posting_hours(self, now=None):
+        """判断当前时间是否在发布时段内"""
+        now = now or self._now()
+        start_hour, end_hour = self.posting_hours
+        return start_hour <= now.hour < end_hour
+
+    def next_run_time(self, now=None):
+        """计算下一次运行时间（跳过发布时段以外的时间）"""
+        candidate = (now or self._now()) + self.interval
+        if not self.in_posting_hours(candidate):
+            start_hour = self.posting_hours[0]
+            next_start = candidate.replace(hour=start_hour, minute=0, second=0, microsecond=0)
+            if next_start <= candidate:
+                next_start += timedelta(days=1)
+            candidate = next_start
+        return candidate
+
+    def _update_status(self, **fields):
+        """更新状态并写入状态文件"""
+        with self._status_lock:
+            self.status.update(fields)
+            self.status['last_heartbeat'] = self._now().isoformat()
+            snapshot = dict(self.status)
+        try:
+            os.makedirs(os.path.dirname(DAEMON_STATUS_FILE), exist_ok=True)
+            tmp_file = DAEMON_STATUS_FILE + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, DAEMON_STATUS_FILE)
+        except Exception as e:
+            print(f"⚠ 写入常驻状态文件失败: {e}")
+
+    def get_status(self):
+        """返回当前状态的副本"""
+        with self._status_lock:
+            return dict(self.status)
+
+    def is_healthy(self):
+        """调度循环仍在按时运转（心跳不超过两个运行间隔）即视为健康"""
+        status = self.get_status()
+        if status['state'] == 'stopped':
+            return False
+        heartbeat = status.get('last_heartbeat')
+        if not heartbeat:
+            return True  # 仍在启动预热中
+        age = self._now() - datetime.fromisoformat(heartbeat)
+        return age <= self.interval * 2 + timedelta(minutes=1)
+
+    def warm_up(self):
+        """预热：授权Google服务、初始化数据库连接池并加载GISource快照"""
+        from google_sheets import get_sheets_service
+        from google_docs import build_docs_service
+        from database import init_connection_pool, get_database_connection, get_gisource_snapshot
+
+        print("常驻模式预热中...")
+        try:
+            get_sheets_service()
+            build_docs_service()
+            print("✓ Google Sheets/Docs 服务已就绪")
+        except Exception as e:
+            print(f"⚠ Google 服务预热失败（将在运行时重试）: {e}")
+
+        if init_connection_pool():
+            print("✓ 数据库连接池已初始化")
+            conn, cursor = get_database_connection()
+            if conn:
+                try:
+                    get_gisource_snapshot(cursor, GISOURCE_SNAPSHOT_TTL_SECONDS)
+                    print("✓ GISource 大学信息快照已加载")
+                finally:
+                    cursor.close()
+                    conn.close()
+        else:
+            print("⚠ 数据库连接池初始化失败，将在每次运行时单独建立连接")
+
+    def run_once(self):
+        """运行一次发布流程并记录结果"""
+        from main import main
+        import logger
+
+        started = self._now()
+        started_monotonic = time.monotonic()
+        self._update_status(state='running')
+
+        try:
+            success = bool(main(operator=self.operator))
+        except Exception as e:
+            success = False
+            print(f"⚠ 发布流程异常: {e}")
+
+        # 从本次运行的结构化日志中提取结束状态
+        error_message = None
+        for entry in reversed(logger._session_log_buffer):
+            if entry['step'] == 'END':
+                error_message = entry['data'].get('error')
+                break
+
+        last_run = {
+            'session_id': getattr(logger.log_program_run, '_session_id', None),
+            'started_at': started.isoformat(),
+            'duration_seconds': round(time.monotonic() - started_monotonic, 3),
+            'success': success,
+            'error': error_message
+        }
+        status = self.get_status()
+        self._update_status(
+            state='idle',
+            runs_total=status['runs_total'] + 1,
+            runs_failed=status['runs_failed'] + (0 if success else 1),
+            last_run=last_run
+        )
+        return success
+
+    def start_health_server(self):
+        """启动本地健康检查HTTP服务（GET /health、GET /status、GET /metrics）"""
+        if not self.health_port:
+            return
+        daemon = self
+
+        class HealthHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    import metrics
+                    self._send(200, metrics.render().encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8')
+                    return
+                if self.path == '/health':
+                    healthy = daemon.is_healthy()
+                    body = {'status': 'ok' if healthy else 'unhealthy'}
+                    code = 200 if healthy else 503
+                elif self.path == '/status':
+                    body = daemon.get_status()
+                    code = 200
+                else:
+                    body = {'error': 'not found'}
+                    code = 404
+                payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self._send(code, payload, 'application/json; charset=utf-8')
+
+            def _send(self, code, payload, content_type):
+                self.send_response(code)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass  # 不把健康检查请求写入运行日志
+
+        try:
+            self._http_server = ThreadingHTTPServer(('127.0.0.1', self.health_port), HealthHandler)
+        except OSError as e:
+            print(f"⚠ 健康检查服务启动失败（端口 {self.health_port}）: {e}")
+            return
+        thread = threading.Thread(target=self._http_server.serve_forever, name='health-server', daemon=True)
+        thread.start()
+        print(f"✓ 健康检查服务: http://127.0.0.1:{self.health_port}/health（指标: /metrics）")
+
+    def stop(self, *_):
+        """请求停止（当前运行结束后退出）"""
+        self._stop_event.set()
+
+    def run_forever(self):
+        """调度循环：在发布时段内按固定间隔运行发布流程"""
+        if not self.operator:
+            print("✗ 常驻模式需要配置操作员姓名（环境变量 GISOURCE_OPERATOR）")
+            return False
+
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        # 先导入主程序，使 FORCE_IPV4 补丁在预热建立连接之前生效
+        import main  # noqa: F401
+        from google_client import disable_interactive_auth
+
+        # 常驻模式无人值守，令牌需要重新授权时报错提示，不打开浏览器阻塞
+        disable_interactive_auth()
+
+        self.start_health_server()
+        self.warm_up()
+
+        next_run = self._now() if self.in_posting_hours() else self.next_run_time()
+        self._update_status(state='idle', next_run_at=next_run.isoformat())
+        print(f"常驻模式已启动，操作员: {self.operator}，间隔: {self.interval}，"
+              f"发布时段: {self.posting_hours[0]}:00-{self.posting_hours[1]}:00")
+
+        while not self._stop_event.is_set():
+            now = self._now()
+            if now >= next_run:
+                if self.in_posting_hours(now):
+                    self.run_once()
+                next_run = self.next_run_time(now)
+                self._update_status(next_run_at=next_run.isoformat())
+            else:
+                self._update_status()
+            wait_seconds = max(1.0, min(60.0, (next_run - self._now()).total_seconds()))
+            self._stop_event.wait(wait_seconds)
+
+        self._update_status(state='stopped')
+        if self._http_server:
+            self._http_server.shutdown()
+        print("常驻模式已停止")
+        return True
+
+
+def run_daemon():
+    """以常驻模式运行（供 run.py --daemon 调用）"""
+    return PublishDaemon().run_forever()
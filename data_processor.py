@@ -1,38 +1,115 @@
 """
 数据处理模块 - 处理数据转换和格式化逻辑
 """
+import re
+import numpy as np
 import pandas as pd
 from datetime import date
+from functools import lru_cache
 from config import (
     COUNTRY_DICTIONARY, 
     JOB_DICTIONARY, 
     SUBJECT_DICTIONARY,
     LABEL_COLUMNS,
-    REQUIRED_COLUMNS
+    REQUIRED_COLUMNS,
+    DEADLINE_SOON_VALUES
 )
 from utils import (
     number_to_english_words,
     number_to_chinese_words,
     safe_convert_to_int,
     convert_date_to_chinese,
-    get_pinyin_sort_key
+    get_pinyin_sort_key,
+    normalize_deadlines,
+    parse_deadline,
+    get_deadline,
+    add_deadline_columns
 )
 
 
+# 职位类型列，第 i 列对应职位位掩码的第 i 位
+ROLE_COLUMNS = ['Master Student', 'Doctoral Student', 'PostDoc', 'Research Assistant',
+                'Competition', 'Summer School', 'Conference', 'Workshop']
+ROLE_BITS = {column: 1 << index for index, column in enumerate(ROLE_COLUMNS)}
+# 硕士且标签只属于人文类（Human_Geo/Urban，没有理科标签）时为 MA，否则为 MSc
+MASTER_ARTS_BIT = 1 << len(ROLE_COLUMNS)
+SCIENCE_LABELS = ['Physical_Geo', 'GIS', 'RS', 'GNSS']
+ARTS_LABELS = ['Human_Geo', 'Urban']
+ROLE_MASK_SIZE = MASTER_ARTS_BIT << 1
+FLAG_VALUES = ['1', 1, 1.0]
+
+
+def _is_flag_set(value):
+    return value in FLAG_VALUES
+
+
+def role_mask(row):
+    """
+    将一行的职位类型列解码为整数位掩码（含 MA/MSc 位）
+    Args:
+        row: 数据行（Series 或 dict，缺少的列视为未勾选）
+    Returns:
+        int: 位掩码，用作 ABBREVIATION_TABLE 等查找表的下标
+    """
+    mask = 0
+    for column, bit in ROLE_BITS.items():
+        if _is_flag_set(row.get(column)):
+            mask |= bit
+    if (mask & ROLE_BITS['Master Student']
+            and not any(_is_flag_set(row.get(column)) for column in SCIENCE_LABELS)
+            and any(_is_flag_set(row.get(column)) for column in ARTS_LABELS)):
+        mask |= MASTER_ARTS_BIT
+    return mask
+
+
+def role_masks(rows):
+    """
+    向量化地将整张表的职位类型列解码为位掩码
+    Args:
+        rows: DataFrame（缺少的列视为未勾选）
+    Returns:
+        ndarray: 每行一个整数位掩码
+    """
+    flags = rows.reindex(columns=ROLE_COLUMNS + SCIENCE_LABELS + ARTS_LABELS).isin(FLAG_VALUES).to_numpy()
+    role_count = len(ROLE_COLUMNS)
+    masks = flags[:, :role_count].astype(np.int64) @ (1 << np.arange(role_count, dtype=np.int64))
+    science = flags[:, role_count:role_count + len(SCIENCE_LABELS)].any(axis=1)
+    arts = flags[:, role_count + len(SCIENCE_LABELS):].any(axis=1)
+    master_arts = flags[:, 0] & ~science & arts
+    return masks | np.where(master_arts, MASTER_ARTS_BIT, 0)
+
+
+def _job_title_for_mask(mask):
+    return ' or '.join(column for column in ROLE_COLUMNS if mask & ROLE_BITS[column])
+
+
+def _abbreviation_for_mask(mask):
+    abbreviations = []
+    if mask & ROLE_BITS['Master Student']:
+        abbreviations.append("MA" if mask & MASTER_ARTS_BIT else "MSc")
+    for column, abbreviation in [('Doctoral Student', 'PhD'), ('PostDoc', 'PostDoc'),
+                                 ('Research Assistant', 'RA'), ('Competition', 'Competition'),
+                                 ('Conference', 'Conference'), ('Summer School', 'Summer School'),
+                                 ('Workshop', 'Workshop')]:
+        if mask & ROLE_BITS[column]:
+            abbreviations.append(abbreviation)
+    return ", ".join(abbreviations)
+
+
+def _category_for_mask(mask):
+    # 按优先级检查职位类型
+    for column, category in [('Master Student', '硕士招生'), ('Doctoral Student', '博士招生'),
+                             ('PostDoc', '博后招聘'), ('Research Assistant', '研究助理招聘'),
+                             ('Summer School', '暑期学校'), ('Conference', '学术会议'),
+                             ('Workshop', '研讨会'), ('Competition', '竞赛')]:
+        if mask & ROLE_BITS[column]:
+            return category
+    return '其他'
+
+
 def create_job_title(row):
     """创建英文职位标题"""
-    job_titles = []
-    non_student_titles = {'PostDoc', 'Research Assistant', 'Competition', 'Summer School', 'Conference', 'Workshop'}
-    
-    for column in ['Master Student', 'Doctoral Student', 'PostDoc', 'Research Assistant', 
-                   'Competition', 'Summer School', 'Conference', 'Workshop']:
-        if row[column] in [1, '1', 1.0]:
-            if column not in non_student_titles:
-                job_titles.append(column.replace(" Student", " Student"))
-            else:
-                job_titles.append(column)
-    
-    return ' or '.join(job_titles)
+    return JOB_TITLE_TABLE[role_mask(row)]
 
 
 def map_job_titles(job_en):
@@ -53,6 +130,43 @@ def map_job_titles(job_en):
     return '或'.join(job_cn_list)
 
 
+# 按职位位掩码预先计算的查找表（导入时计算一次）
+JOB_TITLE_TABLE = [_job_title_for_mask(mask) for mask in range(ROLE_MASK_SIZE)]
+JOB_TITLE_CN_TABLE = [map_job_titles(title) for title in JOB_TITLE_TABLE]
+ABBREVIATION_TABLE = [_abbreviation_for_mask(mask) for mask in range(ROLE_MASK_SIZE)]
+JOB_CATEGORY_TABLE = [_category_for_mask(mask) for mask in range(ROLE_MASK_SIZE)]
+
+
+def classify_roles(rows):
+    """
+    整表分类：一次向量化解码位掩码后查表，得到每行的职位缩写、英文/中文职位和职位类别
+    Args:
+        rows: DataFrame
+    Returns:
+        DataFrame: 与输入索引相同，列 Role_Mask, Abbreviation, Job_EN, Job_CN, Category
+    """
+    masks = role_masks(rows)
+    return pd.DataFrame({
+        'Role_Mask': masks,
+        'Abbreviation': np.asarray(ABBREVIATION_TABLE, dtype=object)[masks],
+        'Job_EN': np.asarray(JOB_TITLE_TABLE, dtype=object)[masks],
+        'Job_CN': np.asarray(JOB_TITLE_CN_TABLE, dtype=object)[masks],
+        'Category': np.asarray(JOB_CATEGORY_TABLE, dtype=object)[masks]
+    }, index=rows.index)
+
+
+# 英文职位 -> 职位位掩码（从 Job_EN 还原职位类型列）
+JOB_TITLE_MASKS = {title: mask for mask, title in enumerate(JOB_TITLE_TABLE[:MASTER_ARTS_BIT])}
+# 中文数字 -> 数字字符串（从 Title_CN 还原职位数量）
+CHINESE_NUMBER_VALUES = {number_to_chinese_words(number): str(number) for number in range(1, 100)}
+# create_sql_tables 生成的 Description 格式
+DESCRIPTION_PATTERN = re.compile(
+    r'^<p>(?P<Direction>.*?); <br>Deadline: (?P<Deadline>.*?); '
+    r'<br>Contact: (?P<Contact_Name>.*?) \((?P<Contact_Email>.*)\); <br>URL: (?P<Source>.*)</p>$',
+    re.S
+)
+
+
 def create_english_title(university_en, country_en, number_places_en, job_en):
     """创建英文标题"""
     hosting_jobs = {'Competition', 'Summer School', 'Conference', 'Workshop'}
@@ -97,12 +211,11 @@ def create_chinese_title(country_cn, university_cn, number_places_cn, job_cn):
 
 
 def set_label_columns(selected_row, sql_table, label_columns):
-    """设置标签列"""
+    """设置标签列（空值记为0，支持多行）"""
+    values = selected_row[list(label_columns)].astype(object)
+    values = values.where(values.notna() & (values != ''), 0)
     for column in label_columns:
-        if pd.isna(selected_row.iloc[0][column]) or selected_row.iloc[0][column] in [None, '']:
-            sql_table[f"Label_{column}"] = [0]
-        else:
-            sql_table[f"Label_{column}"] = [selected_row.iloc[0][column]]
+        sql_table[f"Label_{column}"] = values[column].to_numpy()
     return sql_table
 
 
@@ -123,84 +236,112 @@ def create_sql_table(selected_row, new_event_id):
     Returns:
         DataFrame: 格式化的SQL表格数据
     """
-    # 格式化Deadline，只保留日期部分（YYYY-MM-DD）
-    deadline_value = selected_row["Deadline"].iloc[0]
-    if pd.notna(deadline_value) and deadline_value != 'Soon':
-        try:
-            # 如果是datetime对象，转换为日期字符串
-            if hasattr(deadline_value, 'strftime'):
-                formatted_deadline = deadline_value.strftime('%Y-%m-%d')
-            else:
-                # 如果是字符串，尝试解析后格式化
-                deadline_dt = pd.to_datetime(deadline_value, errors='coerce')
-                if pd.notna(deadline_dt):
-                    formatted_deadline = deadline_dt.strftime('%Y-%m-%d')
-                else:
-                    formatted_deadline = str(deadline_value)
-        except:
-            formatted_deadline = str(deadline_value)
+    return create_sql_tables(selected_row, [new_event_id])
+
+
+@lru_cache(maxsize=256)
+def _english_places_plural(number_places_en):
+    """英文人数是否需要复数（与 create_english_title 规则相同）"""
+    number = safe_convert_to_int(number_places_en.split()[0])
+    return bool(number and number != 1)
+
+
+def _format_deadlines(selected_rows):
+    """Deadline 格式化为 YYYY-MM-DD（Soon等无法解析的值保持原样）"""
+    if 'Deadline_Date' in selected_rows.columns:
+        # 单行转置得到的 DataFrame 中该列为 object 类型
+        dates = pd.to_datetime(selected_rows['Deadline_Date'])
     else:
-        formatted_deadline = str(deadline_value)
+        dates = normalize_deadlines(selected_rows['Deadline'])['Deadline_Date']
+    raw = selected_rows['Deadline'].astype(object).map(str)
+    return dates.dt.strftime('%Y-%m-%d').where(dates.notna(), raw)
+
+
+def create_sql_tables(selected_rows, event_ids):
+    """
+    批量创建SQL表格数据（各列整列计算，用于一次生成大量事件，如补录、迁移）
+    Args:
+        selected_rows: 数据行（DataFrame，每行一个事件）
+        event_ids: 与数据行一一对应的事件ID
+    Returns:
+        DataFrame: 格式化的SQL表格数据，每行一个事件
+    """
+    rows = selected_rows.reset_index(drop=True)
+    event_ids = list(event_ids)
+    if len(event_ids) != len(rows):
+        raise ValueError(f"事件ID数量（{len(event_ids)}）与数据行数（{len(rows)}）不一致")
+    
+    def text(column):
+        return rows[column].astype(object).map(str)
+    
+    # 国家、职位
+    country_en = rows['Country_CN'].map(COUNTRY_DICTIONARY)
+    roles = classify_roles(rows)
+    job_en, job_cn = roles['Job_EN'], roles['Job_CN']
+    
+    # 职位数量（取值种类很少，逐个转换并缓存）
+    number_places = [safe_convert_to_int(value) for value in rows['Number_Places']]
+    number_en = pd.Series([None if n is None else number_to_english_words(n) for n in number_places], dtype=object)
+    number_cn = pd.Series([None if n is None else number_to_chinese_words(n) for n in number_places], dtype=object)
+    has_number_en = number_en.notna() & (number_en != '')
+    has_number_cn = number_cn.notna() & (number_cn != '')
+    
+    # 英文标题
+    plural = number_en.map(lambda value: _english_places_plural(value) if value else False).astype(bool)
+    verb_en = pd.Series(' is recruiting ', index=rows.index).where(
+        ~job_en.isin(['Competition', 'Summer School', 'Conference', 'Workshop']), ' is hosting a ')
+    places_en = 'for ' + number_en.where(has_number_en, '') + ' ' + job_en + plural.map({True: 's', False: ''})
+    title_en = rows['University_EN'] + ' in ' + country_en + verb_en + places_en.where(has_number_en, job_en)
+    
+    # 中文标题（大学名称已包含国家名时不重复）
+    verb_cn = pd.Series('招生', index=rows.index)
+    verb_cn = verb_cn.where(~job_cn.isin(['博士后', '研究助理']), '招聘')
+    verb_cn = verb_cn.where(~job_cn.isin(['竞赛', '暑期学校', '学术会议', '研讨会']), '举办')
+    university_cn = rows['University_CN'].astype(object)
+    country_cn = rows['Country_CN'].astype(object)
+    prefix_cn = pd.Series([
+        university if isinstance(university, str) and isinstance(country, str) and university.startswith(country)
+        else (country + university if isinstance(university, str) and isinstance(country, str) else None)
+        for university, country in zip(university_cn, country_cn)
+    ], dtype=object)
+    places_cn = number_cn.where(has_number_cn, '') + '名' + job_cn
+    title_cn = prefix_cn + verb_cn + places_cn.where(has_number_cn, job_cn)
+    
+    description = (
+        "<p>" + text('Direction') +
+        "; <br>Deadline: " + _format_deadlines(rows) +
+        "; <br>Contact: " + text('Contact_Name') +
+        " (" + text('Contact_Email') +
+        "); <br>URL: " + text('Source') + "</p>"
+    )
     
-    # 创建基础表格
     sql_table = pd.DataFrame({
-        'Event_ID': [new_event_id],
-        'University_CN': selected_row["University_CN"],
-        'University_EN': selected_row["University_EN"],
-        'Country_CN': selected_row["Country_CN"],
-        'Country_EN': [None],
-        'Job_CN': [None],
-        'Job_EN': [None],
-        'Description': (
-            "<p>" + selected_row["Direction"].astype(str) + 
-            "; <br>Deadline: " + formatted_deadline + 
-            "; <br>Contact: " + selected_row["Contact_Name"].astype(str) + 
-            " (" + selected_row["Contact_Email"].astype(str) + 
-            "); <br>URL: " + selected_row["Source"].astype(str) + "</p>"
-        ),
-        'Title_CN': [None],
-        'Title_EN': [None],
-        'Label_Physical_Geo': [0],
-        'Label_Human_Geo': [0],
-        'Label_Urban': [0],
-        'Label_GIS': [0],
-        'Label_RS': [0],
-        'Label_GNSS': [0],
-        'Date': [date.today().strftime('%Y-%m-%d')],
-        'University_ID': [None],
-        'IS_Public': [1],
-        'IS_Deleted': [0],
-        'Event_CN': [None],
-        'EVENT_EN': [None]
-    })
-    
-    # 映射英文国家
-    sql_table["Country_EN"] = selected_row["Country_CN"].map(COUNTRY_DICTIONARY)
-    
-    # 创建英文职位
-    sql_table['Job_EN'] = create_job_title(selected_row.iloc[0])
-    
-    # 映射中文职位
-    sql_table["Job_CN"] = sql_table["Job_EN"].apply(map_job_titles)
-    
-    # 处理职位数量
-    number_places = selected_row["Number_Places"].item()
-    number_places_int = safe_convert_to_int(number_places)
-    number_places_en = None if number_places_int is None else number_to_english_words(number_places_int)
-    number_places_cn = None if number_places_int is None else number_to_chinese_words(number_places_int)
-    
-    # 创建标题
-    sql_table["Title_EN"] = sql_table.apply(
-        lambda x: create_english_title(x['University_EN'], x['Country_EN'], number_places_en, x['Job_EN']), 
-        axis=1
-    )
-    sql_table["Title_CN"] = sql_table.apply(
-        lambda x: create_chinese_title(x['Country_CN'], x['University_CN'], number_places_cn, x['Job_CN']), 
-        axis=1
-    )
+        'Event_ID': event_ids,
+        'University_CN': rows['University_CN'],
+        'University_EN': rows['University_EN'],
+        'Country_CN': rows['Country_CN'],
+        'Country_EN': country_en,
+        'Job_CN': job_cn,
+        'Job_EN': job_en,
+        'Description': description,
+        'Title_CN': title_cn,
+        'Title_EN': title_en,
+        'Label_Physical_Geo': 0,
+        'Label_Human_Geo': 0,
+        'Label_Urban': 0,
+        'Label_GIS': 0,
+        'Label_RS': 0,
+        'Label_GNSS': 0,
+        'Date': date.today().strftime('%Y-%m-%d'),
+        'University_ID': None,
+        'IS_Public': 1,
+        'IS_Deleted': 0,
+        'Event_CN': None,
+        'EVENT_EN': None
+    }, index=rows.index)
     
     # 设置标签
-    sql_table = set_label_columns(selected_row, sql_table, LABEL_COLUMNS)
+    sql_table = set_label_columns(rows, sql_table, LABEL_COLUMNS)
     
     # 将NaN替换为None
     sql_table = sql_table.where(pd.notnull(sql_table), None)
@@ -208,34 +349,36 @@ def create_sql_table(selected_row, new_event_id):
     return sql_table
 
 
+def rows_from_sql_tables(sql_tables):
+    """
+    由已入库的资讯还原表格格式的数据行（create_sql_tables 的逆过程，用于重新生成历史资讯）
+    Args:
+        sql_tables: GISource 表的数据（DataFrame，含 Job_EN、Title_CN、Description 和 Label_* 列）
+    Returns:
+        DataFrame: 列名与表格表头相同，另保留 Event_ID 和 Date（如有）；
+                   Description 无法解析时 Direction、Deadline、联系人和 Source 为空值
+    """
+    rows = sql_tables['Description'].astype(object).fillna('').str.extract(DESCRIPTION_PATTERN)
+    for column in ['Event_ID', 'Date', 'University_EN', 'University_CN', 'Country_CN']:
+        if column in sql_tables.columns:
+            rows[column] = sql_tables[column]
+    
+    # 职位数量只出现在标题中（如"招生三名博士研究生"）
+    numbers = sql_tables['Title_CN'].astype(object).fillna('').str.extract(
+        r'(?:招生|招聘|举办)([一二三四五六七八九十]+)名', expand=False)
+    rows['Number_Places'] = numbers.map(CHINESE_NUMBER_VALUES).fillna('')
+    
+    masks = sql_tables['Job_EN'].map(JOB_TITLE_MASKS).fillna(0).astype(np.int64).to_numpy()
+    for column, bit in ROLE_BITS.items():
+        rows[column] = np.where(masks & bit, '1', '0')
+    for column in LABEL_COLUMNS:
+        rows[column] = np.where(sql_tables[f"Label_{column}"].isin(FLAG_VALUES), '1', '0')
+    return rows
+
+
 def generate_abbreviation(row):
     """生成职位缩写"""
-    abbreviations = []
-    
-    if row['Master Student'] == '1':
-        if row['Physical_Geo'] == '1' or row['GIS'] == '1' or row['RS'] == '1' or row['GNSS'] == '1':
-            abbreviations.append("MSc")
-        elif row['Human_Geo'] == '1' or row['Urban'] == '1':
-            abbreviations.append("MA")
-        else:
-            abbreviations.append("MSc")
-    
-    if row['Doctoral Student'] == '1':
-        abbreviations.append("PhD")
-    if row['PostDoc'] == '1':
-        abbreviations.append("PostDoc")
-    if row['Research Assistant'] == '1':
-        abbreviations.append("RA")
-    if row['Competition'] == '1':
-        abbreviations.append("Competition")
-    if row['Conference'] == '1':
-        abbreviations.append("Conference")
-    if row['Summer School'] == '1':
-        abbreviations.append("Summer School")
-    if row['Workshop'] == '1':
-        abbreviations.append("Workshop")
-    
-    return ", ".join(abbreviations) if abbreviations else ""
+    return ABBREVIATION_TABLE[role_mask(row)]
 
 
 def create_combined_title(country_cn, university_cn):
@@ -279,7 +422,7 @@ def is_contact_info_valid(contact_name, contact_email):
 def generate_wechat_group_text(row, abbreviation, new_event_id):
     """生成微信群消息文本"""
     combined_title = create_combined_title(row['Country_CN'], row['University_CN'])
-    chinese_deadline = convert_date_to_chinese(row['Deadline'])
+    chinese_deadline = convert_date_to_chinese(get_deadline(row))
     
     abbreviations_list = abbreviation.split(", ")
     opportunity_str = "或".join(abbreviations_list)
@@ -361,7 +504,7 @@ def convert_to_wechat_format(row, abbreviation):
     else:
         template += f"{verb}类型：{job_cn}\n"
     
-    deadline = convert_date_to_chinese(row['Deadline'])
+    deadline = convert_date_to_chinese(get_deadline(row))
     if "申请截止" in deadline:
         deadline = deadline.replace("申请截止", "").strip()
     template += f"申请截止：{deadline}\n"
@@ -383,6 +526,48 @@ def convert_to_wechat_format(row, abbreviation):
     return template
 
 
+def _prepare_batch(rows, abbreviations):
+    """批量格式化前整列解析截止日期、计算职位缩写，并将行转为字典"""
+    if 'Deadline_Date' not in rows.columns:
+        rows = add_deadline_columns(rows.copy())
+    if abbreviations is None:
+        abbreviations = classify_roles(rows)['Abbreviation']
+    return rows.to_dict('records'), list(abbreviations)
+
+
+def convert_to_wechat_formats(rows, abbreviations=None):
+    """
+    批量转换为微信公众号格式（逐行使用 convert_to_wechat_format 的格式）
+    Args:
+        rows: 数据行（DataFrame）
+        abbreviations: 与数据行对应的职位缩写（默认由 classify_roles 计算）
+    Returns:
+        Series: 每行的公众号格式文本
+    """
+    records, abbreviations = _prepare_batch(rows, abbreviations)
+    return pd.Series([
+        convert_to_wechat_format(record, abbreviation)
+        for record, abbreviation in zip(records, abbreviations)
+    ], index=rows.index, dtype=object)
+
+
+def generate_wechat_group_texts(rows, event_ids, abbreviations=None):
+    """
+    批量生成微信群消息文本（逐行使用 generate_wechat_group_text 的格式）
+    Args:
+        rows: 数据行（DataFrame）
+        event_ids: 与数据行对应的事件ID
+        abbreviations: 与数据行对应的职位缩写（默认由 classify_roles 计算）
+    Returns:
+        Series: 每行的微信群消息文本
+    """
+    records, abbreviations = _prepare_batch(rows, abbreviations)
+    return pd.Series([
+        generate_wechat_group_text(record, abbreviation, event_id)
+        for record, abbreviation, event_id in zip(records, abbreviations, event_ids)
+    ], index=rows.index, dtype=object)
+
+
 def get_job_category(row):
     """
     获取职位类别
@@ -391,25 +576,7 @@ def get_job_category(row):
     Returns:
         str: 职位类别（硕士招生、博士招生、博后招聘等）
     """
-    # 按优先级检查职位类型
-    if row.get('Master Student') == '1':
-        return '硕士招生'
-    if row.get('Doctoral Student') == '1':
-        return '博士招生'
-    if row.get('PostDoc') == '1':
-        return '博后招聘'
-    if row.get('Research Assistant') == '1':
-        return '研究助理招聘'
-    if row.get('Summer School') == '1':
-        return '暑期学校'
-    if row.get('Conference') == '1':
-        return '学术会议'
-    if row.get('Workshop') == '1':
-        return '研讨会'
-    if row.get('Competition') == '1':
-        return '竞赛'
-    
-    return '其他'
+    return JOB_CATEGORY_TABLE[role_mask(row)]
 
 
 def get_time_category(deadline):
@@ -420,7 +587,7 @@ def get_time_category(deadline):
     Returns:
         str: 时间类别（尽快申请 或 本月及以后）
     """
-    if deadline in ['Soon', '尽快申请', 'soon', 'SOON']:
+    if deadline in DEADLINE_SOON_VALUES:
         return '尽快申请'
     return '本月及以后'
 
@@ -447,6 +614,18 @@ def get_sort_priority(category):
     return priority_map.get(category, 99)
 
 
+def deadline_sort_keys(deadlines):
+    """
+    批量解析截止日期用于排序（整列一次解析）
+    Args:
+        deadlines: 截止日期列表（字符串、日期或空值，支持"2025年12月15日申请截止"格式）
+    Returns:
+        list: 日期对象列表，Soon或无法解析时为一个很远的日期
+    """
+    dates = normalize_deadlines(deadlines)['Deadline_Date']
+    return [value.date() if pd.notna(value) else date(9999, 12, 31) for value in dates]
+
+
 def parse_deadline_for_sort(deadline_str):
     """
     解析截止日期用于排序
@@ -455,26 +634,6 @@ def parse_deadline_for_sort(deadline_str):
     Returns:
         date: 日期对象，如果无法解析则返回一个很远的日期
     """
-    if not deadline_str or deadline_str in ['Soon', '尽快申请', 'soon', 'SOON']:
-        return date(9999, 12, 31)  # 尽快申请排在最前，用最大日期
-    
-    try:
-        # 尝试解析日期
-        if isinstance(deadline_str, date):
-            return deadline_str
-        if isinstance(deadline_str, pd.Timestamp):
-            return deadline_str.date()
-        
-        # 尝试从中文格式解析
-        if '年' in str(deadline_str) and '月' in str(deadline_str) and '日' in str(deadline_str):
-            # 格式：2025年12月15日申请截止
-            deadline_str = str(deadline_str).replace('申请截止', '').strip()
-            parts = deadline_str.replace('年', '-').replace('月', '-').replace('日', '').split('-')
-            if len(parts) == 3:
-                return date(int(parts[0]), int(parts[1]), int(parts[2]))
-        
-        # 尝试标准日期格式
-        return pd.to_datetime(deadline_str).date()
-    except:
-        return date(9999, 12, 31)
+    deadline_date = parse_deadline(deadline_str)
+    return deadline_date.date() if pd.notna(deadline_date) else date(9999, 12, 31)
 
@@ -3,9 +3,21 @@
 """
 import configparser
 import threading
+import time
 import mysql.connector
-from mysql.connector import Error
-from config import SQL_CREDENTIALS_FILE
+from mysql.connector import Error, pooling
+from config import SQL_CREDENTIALS_FILE, DB_POOL_SIZE, LABEL_COLUMNS
+from logger import outbound_call
+
+# 连接池（仅在常驻进程中通过 init_connection_pool 初始化）
+_connection_pool = None
+
+# 数据库连接替身（录制/回放用），见 use_connection_override
+_connection_override = None
+
+# GISource 大学信息快照（常驻进程中跨运行复用）
+_gisource_snapshot = {'rows': None, 'loaded_at': 0.0}
+_gisource_snapshot_lock = threading.Lock()
 
 
 def connect_to_database(config, result):
@@ -19,13 +31,11 @@ def connect_to_database(config, result):
         result['error'] = err
 
 
-def get_database_connection(timeout=60):
+def load_mysql_config():
     """
-    获取数据库连接
-    Args:
-        timeout: 连接超时时间（秒）
+    从凭据文件读取MySQL连接配置
     Returns:
-        tuple: (connection, cursor) 或 (None, None)
+        dict: mysql.connector 连接参数，读取失败时返回 None
     """
     # 从文件中读取凭据，尝试多种编码
     config = configparser.ConfigParser()
@@ -43,10 +53,10 @@ def get_database_connection(timeout=60):
     
     if not config_loaded:
         print(f"⚠ 无法读取配置文件 {SQL_CREDENTIALS_FILE}，请检查文件编码")
-        return None, None
+        return None
     
     # MySQL配置
-    mysql_config = {
+    return {
         'host': config['MySQL']['host'],
         'port': config['MySQL'].getint('port', 3306),
         'user': config['MySQL']['user'],
@@ -54,6 +64,72 @@ def get_database_connection(timeout=60):
         'database': config['MySQL']['database'],
         'ssl_disabled': True  # 禁用SSL以避免版本不匹配错误
     }
+
+
+def init_connection_pool(pool_size=DB_POOL_SIZE):
+    """
+    初始化数据库连接池（常驻进程使用，之后 get_database_connection 从池中取连接）
+    Args:
+        pool_size: 连接池大小
+    Returns:
+        bool: 初始化是否成功
+    """
+    global _connection_pool
+    
+    mysql_config = load_mysql_config()
+    if mysql_config is None:
+        return False
+    
+    try:
+        _connection_pool = pooling.MySQLConnectionPool(
+            pool_name='gisource',
+            pool_size=pool_size,
+            pool_reset_session=True,
+            **mysql_config
+        )
+        return True
+    except mysql.connector.Error as err:
+        print(f"Error creating connection pool: {err}")
+        _connection_pool = None
+        return False
+
+
+def use_connection_override(factory):
+    """
+    替换数据库连接的获取方式（录制/回放用，传入 None 恢复）
+
+    Args:
+        factory: 函数 factory(timeout) -> (connection, cursor)
+    """
+    global _connection_override
+    _connection_override = factory
+
+
+def get_database_connection(timeout=60):
+    """
+    获取数据库连接（已初始化连接池时从池中获取，conn.close() 会将连接归还连接池）
+    Args:
+        timeout: 连接超时时间（秒）
+    Returns:
+        tuple: (connection, cursor) 或 (None, None)
+    """
+    if _connection_override is not None:
+        return _connection_override(timeout)
+    return open_database_connection(timeout)
+
+
+def open_database_connection(timeout=60):
+    """建立真实的数据库连接（见 get_database_connection）"""
+    if _connection_pool is not None:
+        try:
+            conn = _connection_pool.get_connection()
+            return conn, conn.cursor()
+        except mysql.connector.Error as err:
+            print(f"⚠ 从连接池获取连接失败，改用新连接: {err}")
+    
+    mysql_config = load_mysql_config()
+    if mysql_config is None:
+        return None, None
     
     # 使用字典存储连接结果
     result = {}
@@ -75,16 +151,42 @@ def get_database_connection(timeout=60):
 
 def clean_university_names(cursor, conn):
     """清除University_Name_EN列中末尾的多余空格"""
-    cursor.execute("UPDATE TEST.new_Universities SET University_Name_EN = RTRIM(University_Name_EN)")
+    with outbound_call('mysql'):
+        cursor.execute("UPDATE TEST.new_Universities SET University_Name_EN = RTRIM(University_Name_EN)")
     conn.commit()
 
 
 def get_gisource_data(cursor):
     """从数据库中获取GISource表的数据"""
-    cursor.execute("SELECT University_EN, University_CN, Country_CN FROM TEST.GISource")
+    with outbound_call('mysql'):
+        cursor.execute("SELECT University_EN, University_CN, Country_CN FROM TEST.GISource")
     return cursor.fetchall()
 
 
+def get_gisource_snapshot(cursor, max_age_seconds):
+    """
+    获取GISource大学信息快照，快照未过期时直接复用，避免每次运行都全表查询
+    Args:
+        cursor: 数据库游标
+        max_age_seconds: 快照最长有效期（秒），0 表示总是重新加载
+    Returns:
+        list: (University_EN, University_CN, Country_CN) 元组列表
+    """
+    with _gisource_snapshot_lock:
+        age = time.monotonic() - _gisource_snapshot['loaded_at']
+        if _gisource_snapshot['rows'] is None or age > max_age_seconds:
+            _gisource_snapshot['rows'] = get_gisource_data(cursor)
+            _gisource_snapshot['loaded_at'] = time.monotonic()
+        return _gisource_snapshot['rows']
+
+
+def invalidate_gisource_snapshot():
+    """丢弃GISource大学信息快照（插入新资讯后调用，下一次运行重新查询，包含刚发布的大学）"""
+    with _gisource_snapshot_lock:
+        _gisource_snapshot['rows'] = None
+        _gisource_snapshot['loaded_at'] = 0.0
+
+
 def check_universities_exist(cursor, university_list):
     """检查哪些大学已存在于数据库中"""
     if not university_list:
@@ -92,7 +194,8 @@ def check_universities_exist(cursor, university_list):
     
     query = "SELECT University_Name_EN FROM TEST.new_Universities WHERE University_Name_EN IN (%s)"
     format_strings = ','.join(['%s'] * len(university_list))
-    cursor.execute(query % format_strings, tuple(university_list))
+    with outbound_call('mysql'):
+        cursor.execute(query % format_strings, tuple(university_list))
     existing_universities = cursor.fetchall()
     
     return set([row[0] for row in existing_universities])
@@ -100,14 +203,52 @@ def check_universities_exist(cursor, university_list):
 
 def get_max_event_id(cursor):
     """获取最近日期的最后一个Event_ID"""
-    cursor.execute("""
-        SELECT MAX(Event_ID) FROM GISource
-        WHERE Date = (SELECT MAX(Date) FROM GISource);
-    """)
+    with outbound_call('mysql'):
+        cursor.execute("""
+            SELECT MAX(Event_ID) FROM GISource
+            WHERE Date = (SELECT MAX(Date) FROM GISource);
+        """)
     result = cursor.fetchone()
     return result[0] if result and result[0] is not None else 0
 
 
+def iter_gisource_events(cursor, chunk_size, since=None, until=None):
+    """
+    按Event_ID顺序分块读取已发布的资讯（键集分页，每块一次查询，不一次性载入全表）
+    Args:
+        cursor: 数据库游标
+        chunk_size: 每块行数
+        since: 起始发布日期（含，YYYY-MM-DD）
+        until: 结束发布日期（含，YYYY-MM-DD）
+    Yields:
+        tuple: (列名列表, 行元组列表)
+    """
+    columns = ['Event_ID', 'Date', 'University_EN', 'University_CN', 'Country_CN', 'Job_EN',
+               'Title_CN', 'Description'] + [f"Label_{column}" for column in LABEL_COLUMNS]
+    conditions = ["Event_ID > %s", "IS_Deleted = 0"]
+    params = []
+    if since:
+        conditions.append("Date >= %s")
+        params.append(since)
+    if until:
+        conditions.append("Date <= %s")
+        params.append(until)
+    query = (f"SELECT {', '.join(columns)} FROM GISource WHERE {' AND '.join(conditions)} "
+             f"ORDER BY Event_ID LIMIT %s")
+    
+    last_event_id = 0
+    while True:
+        with outbound_call('mysql'):
+            cursor.execute(query, tuple([last_event_id] + params + [chunk_size]))
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        yield columns, rows
+        if len(rows) < chunk_size:
+            return
+        last_event_id = rows[-1][0]
+
+
 def insert_event_to_database(cursor, conn, sql_table, table_name='GISource'):
     """
     将事件数据插入到数据库
@@ -122,7 +263,8 @@ def insert_event_to_database(cursor, conn, sql_table, table_name='GISource'):
     try:
         for i, row in sql_table.iterrows():
             sql_query = f"INSERT INTO {table_name} ({', '.join(row.index)}) VALUES ({', '.join(['%s']*len(row))})"
-            cursor.execute(sql_query, tuple(row))
+            with outbound_call('mysql'):
+                cursor.execute(sql_query, tuple(row))
         
         conn.commit()
         print("Data inserted successfully.")
@@ -6,12 +6,23 @@ import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from config import EMAIL_CREDENTIALS_FILE, SMTP_SERVER, SMTP_PORT
+from logger import outbound_call, current_step, log_program_run
 
 # 重试配置
 MAX_RETRY_ATTEMPTS = 2  # 最大尝试次数（包括首次）
 RETRY_DELAY_SECONDS = 3  # 重试前等待秒数
 
 
+# 创建SMTP连接的函数（录制/回放时替换为替身），见 use_smtp_factory
+_smtp_factory = smtplib.SMTP
+
+
+def use_smtp_factory(factory):
+    """替换SMTP连接的创建方式（录制/回放用，传入 None 恢复 smtplib.SMTP）"""
+    global _smtp_factory
+    _smtp_factory = factory or smtplib.SMTP
+
+
 def read_email_credentials():
     """从文件读取邮箱凭据"""
     # 尝试多种编码方式
@@ -59,11 +70,12 @@ def send_email(receiver_email, receiver_name, subject, custom_body):
             message.attach(MIMEText(custom_body, "plain", "utf-8"))
             
             # 发送邮件
-            server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30)
-            server.starttls()
-            server.login(username, app_password)
-            server.send_message(message)
-            server.quit()
+            with outbound_call('smtp'):
+                server = _smtp_factory(SMTP_SERVER, SMTP_PORT, timeout=30)
+                server.starttls()
+                server.login(username, app_password)
+                server.send_message(message)
+                server.quit()
             
             if attempt > 1:
                 print(f"Email sent successfully to {receiver_name} ({receiver_email}) [重试第{attempt-1}次成功]")
@@ -76,6 +88,11 @@ def send_email(receiver_email, receiver_name, subject, custom_body):
             if attempt < MAX_RETRY_ATTEMPTS:
                 print(f"Failed to send email to {receiver_name} (attempt {attempt}/{MAX_RETRY_ATTEMPTS}): {e}")
                 print(f"Retrying in {RETRY_DELAY_SECONDS} seconds...")
+                log_program_run(current_step(), f'邮件发送失败，准备重试: {receiver_name}', 'warning', {
+                    'recipient': receiver_name,
+                    'email_retry': attempt,
+                    'error': str(e)
+                })
                 time.sleep(RETRY_DELAY_SECONDS)
             else:
                 print(f"Failed to send email to {receiver_name} after {MAX_RETRY_ATTEMPTS} attempts: {last_error}")
@@ -0,0 +1,445 @@
+"""
+Google API 客户端模块 - Sheets/Docs/Drive 共用的凭据、传输与请求执行
+
+- 统一凭据：一个令牌同时申请 Sheets、Docs、Drive元数据权限，过期前由后台线程提前刷新
+- 本地discovery文档：服务对象从 cache/discovery 中固定版本的文档构建，不访问网络
+- 共享传输：各个服务共用一个已授权的keep-alive传输池，连接在线程和多次运行之间复用
+- 令牌桶限流：按API和读写类型匹配Google的每分钟配额，请求过快时在本地等待而不是被拒绝
+- 失败重试：429及5xx响应、网络错误时按指数退避（带随机抖动）重试
+- 调用统计：记录每个API方法的调用次数、重试次数、失败次数和耗时
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from google_auth_oauthlib.flow import InstalledAppFlow
+from google.auth.transport.requests import Request
+from google.auth.exceptions import RefreshError
+from google.oauth2.credentials import Credentials
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+from googleapiclient.errors import HttpError
+from logger import count_outbound_call
+import metrics
+from config import (
+    GOOGLE_SCOPES,
+    TOKEN_JSON_FILE,
+    CREDENTIALS_FILE,
+    GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS,
+    GOOGLE_HTTP_TIMEOUT_SECONDS,
+    GOOGLE_API_ENDPOINT,
+    DISCOVERY_CACHE_DIR,
+    GOOGLE_API_RATE_LIMITS,
+    GOOGLE_API_MAX_RETRIES,
+    GOOGLE_API_BACKOFF_BASE_SECONDS,
+    GOOGLE_API_BACKOFF_MAX_SECONDS
+)
+
+# 429表示请求被配额拒绝（未执行），任何请求都可以重试；
+# 5xx时写请求可能已经生效，只重试幂等的GET/PUT，避免重复追加行或重复插入文本
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'PUT'}
+
+
+# 凭据在进程内共享；刷新和写回令牌文件需串行化
+_credentials_lock = threading.Lock()
+_cached_creds = None
+_refresher_started = False
+
+# 已授权的keep-alive传输池：httplib2.Http 不是线程安全的，每个请求执行期间独占一个传输，
+# 执行完毕归还；传输在线程和多次运行之间复用，已建立的TLS连接不必重新握手
+_http_pool = []
+_http_pool_lock = threading.Lock()
+
+# 服务对象只负责构造请求（执行时传入池中的传输），可在线程之间共享
+_services = {}
+_services_lock = threading.Lock()
+_discovery_documents = {}
+
+# 替身传输（离线测试/基准测试用）：设置后所有服务和请求都使用该传输，不再需要OAuth凭据
+_transport_override = None
+
+# 是否允许打开浏览器授权（常驻模式下关闭）
+_interactive_auth = True
+
+
+def _run_oauth_flow():
+    """打开浏览器进行授权（一次申请全部权限）"""
+    flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, GOOGLE_SCOPES)
+    return flow.run_local_server(port=0)
+
+
+def disable_interactive_auth():
+    """禁止打开浏览器授权（常驻模式调用）：需要重新授权时抛出错误，而不是阻塞等待浏览器"""
+    global _interactive_auth
+    _interactive_auth = False
+
+
+def _reauthorize(reason):
+    """
+    重新授权：交互环境中打开浏览器；常驻模式或没有终端时抛出错误，提示操作员手动授权
+    Args:
+        reason: 需要重新授权的原因
+    Raises:
+        RuntimeError: 当前环境无法进行浏览器授权
+    """
+    if not _interactive_auth or not sys.stdin.isatty():
+        raise RuntimeError(
+            f"{reason}，需要重新授权Google账号，但当前为常驻模式或没有终端，无法打开浏览器。"
+            f"请在有浏览器的终端中运行一次 python run.py 完成授权（更新 {TOKEN_JSON_FILE}）后再重新启动"
+        )
+    print(f"{reason}，正在打开浏览器进行重新授权...")
+    return _run_oauth_flow()
+
+
+def _save_credentials(creds):
+    """写回令牌文件"""
+    with open(TOKEN_JSON_FILE, 'w', encoding='utf-8') as token:
+        token.write(creds.to_json())
+
+
+def _seconds_until_expiry(creds):
+    """距离令牌过期的秒数（没有过期时间时返回 None）"""
+    if not creds.expiry:
+        return None
+    # google-auth 的 expiry 是不带时区的UTC时间
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return (creds.expiry - now).total_seconds()
+
+
+def _needs_refresh(creds):
+    """令牌无效或即将过期时需要刷新"""
+    if not creds.valid:
+        return True
+    remaining = _seconds_until_expiry(creds)
+    return remaining is not None and remaining < GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS
+
+
+def _load_credentials():
+    """加载、刷新或重新获取凭据（调用方持有 _credentials_lock）"""
+    creds = _cached_creds
+    reason = "没有找到Google令牌"
+    if creds is None and os.path.exists(TOKEN_JSON_FILE):
+        creds = Credentials.from_authorized_user_file(TOKEN_JSON_FILE)
+        if not creds.has_scopes(GOOGLE_SCOPES):
+            # 旧令牌只授权了 Sheets 或 Docs 其中之一（或缺少Drive元数据权限），需要重新授权一次
+            reason = "令牌缺少所需权限"
+            creds = None
+
+    if creds and not _needs_refresh(creds):
+        return creds
+
+    if creds and creds.refresh_token:
+        try:
+            creds.refresh(Request())
+        except RefreshError:
+            # Token刷新失败（可能被撤销），需要重新授权
+            creds = _reauthorize("Token已失效")
+    else:
+        creds = _reauthorize(reason if creds is None else "Token已过期且没有refresh_token")
+
+    _save_credentials(creds)
+    return creds
+
+
+def get_credentials():
+    """获取共享的Google凭据（线程安全，首次调用时启动后台刷新线程）"""
+    global _cached_creds
+    with _credentials_lock:
+        _cached_creds = _load_credentials()
+        creds = _cached_creds
+    _start_refresher()
+    return creds
+
+
+def _refresh_cached_credentials():
+    """
+    后台刷新缓存的凭据：只用 refresh_token 刷新，从不打开浏览器授权
+    刷新令牌失效时丢弃缓存的凭据，由下一次前台的 get_credentials 重新授权
+    （常驻模式下后台线程若持锁等待浏览器授权，会使所有Google请求一直阻塞）
+    """
+    global _cached_creds
+    with _credentials_lock:
+        creds = _cached_creds
+        if creds is None or not _needs_refresh(creds):
+            return
+        if not creds.refresh_token:
+            _cached_creds = None
+            return
+        try:
+            creds.refresh(Request())
+        except RefreshError as e:
+            print(f"⚠ 后台刷新Google令牌失败，已丢弃缓存的凭据（下次使用时重新授权）: {e}")
+            _cached_creds = None
+            return
+        _save_credentials(creds)
+
+
+def _refresh_loop():
+    """后台线程：在令牌过期前 GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS 秒提前刷新"""
+    while True:
+        with _credentials_lock:
+            remaining = _seconds_until_expiry(_cached_creds) if _cached_creds else None
+        if remaining is None:
+            time.sleep(60)
+            continue
+        time.sleep(max(1.0, remaining - GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS))
+        try:
+            _refresh_cached_credentials()
+        except Exception as e:
+            print(f"⚠ 后台刷新Google令牌失败（将在下次使用时重试）: {e}")
+            time.sleep(60)
+
+
+def _start_refresher():
+    """启动后台刷新线程（每个进程只启动一次）"""
+    global _refresher_started
+    with _credentials_lock:
+        if _refresher_started:
+            return
+        _refresher_started = True
+    threading.Thread(target=_refresh_loop, name='google-token-refresher', daemon=True).start()
+
+
+def _new_authorized_http(creds):
+    """创建新的已授权传输（httplib2 按主机缓存连接，同一传输的后续请求复用连接）"""
+    return AuthorizedHttp(creds, http=httplib2.Http(timeout=GOOGLE_HTTP_TIMEOUT_SECONDS))
+
+
+def use_transport(transport):
+    """
+    使用替身传输执行所有Google API请求（传入 None 恢复真实的已授权传输）
+
+    Args:
+        transport: 实现 httplib2.Http.request(uri, method, body, headers, ...) 接口的对象，需线程安全
+    """
+    global _transport_override
+    with _services_lock:
+        _transport_override = transport
+        _services.clear()
+    with _http_pool_lock:
+        _http_pool.clear()
+
+
+def _checkout_http():
+    """从传输池取出一个传输（优先取最近归还的，其连接最可能仍然有效）"""
+    if _transport_override is not None:
+        return _transport_override
+    creds = get_credentials()
+    with _http_pool_lock:
+        while _http_pool:
+            http = _http_pool.pop()
+            if http.credentials is creds:
+                return http
+    return _new_authorized_http(creds)
+
+
+def _checkin_http(http):
+    """归还传输到传输池"""
+    if http is _transport_override:
+        return
+    with _http_pool_lock:
+        _http_pool.append(http)
+
+
+def load_discovery_document(api, version):
+    """
+    加载API的discovery文档（首次从 google-api-python-client 自带的文档复制到本地缓存目录并固定下来）
+
+    Returns:
+        dict: discovery文档
+    """
+    key = (api, version)
+    if key in _discovery_documents:
+        return _discovery_documents[key]
+
+    path = os.path.join(DISCOVERY_CACHE_DIR, f'{api}.{version}.json')
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    else:
+        content = discovery_cache.get_static_doc(api, version)
+        if content is None:
+            raise FileNotFoundError(f"找不到 {api} {version} 的discovery文档，请放置到 {path}")
+        os.makedirs(DISCOVERY_CACHE_DIR, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    _discovery_documents[key] = json.loads(content)
+    return _discovery_documents[key]
+
+
+def build_service(api, version):
+    """
+    获取缓存的Google API服务对象（凭据更换后自动重建）
+
+    Args:
+        api: API名称（如 'sheets', 'docs', 'drive'）
+        version: API版本（如 'v4', 'v1', 'v3'）
+    """
+    creds = get_credentials() if _transport_override is None else None
+    with _services_lock:
+        cached = _services.get((api, version))
+        if cached is None or cached[0] is not creds:
+            client_options = {'api_endpoint': GOOGLE_API_ENDPOINT} if GOOGLE_API_ENDPOINT else None
+            service = build_from_document(
+                load_discovery_document(api, version),
+                http=_transport_override or _new_authorized_http(creds),
+                client_options=client_options
+            )
+            cached = (creds, service)
+            _services[(api, version)] = cached
+        return cached[1]
+
+
+class TokenBucket:
+    """令牌桶限流器（线程安全），容量即每分钟配额，允许短时突发"""
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取得一个令牌，令牌不足时等待"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_seconds = (1 - self.tokens) / self.rate
+            time.sleep(wait_seconds)
+
+
+_buckets = {name: TokenBucket(rate) for name, rate in GOOGLE_API_RATE_LIMITS.items()}
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def _bucket_name(request):
+    """根据请求的方法ID（如 sheets.spreadsheets.values.get）和HTTP方法确定限流桶"""
+    api = request.methodId.split('.', 1)[0]
+    kind = 'read' if request.method == 'GET' else 'write'
+    return f'{api}_{kind}'
+
+
+def _record(name, seconds, retries, failed):
+    """记录一次调用的统计信息"""
+    with _metrics_lock:
+        stats = _metrics.setdefault(name, {
+            'calls': 0, 'retries': 0, 'failures': 0, 'total_seconds': 0.0, 'max_seconds': 0.0
+        })
+        stats['calls'] += 1
+        stats['retries'] += retries
+        stats['failures'] += 1 if failed else 0
+        stats['total_seconds'] += seconds
+        stats['max_seconds'] = max(stats['max_seconds'], seconds)
+    # 服务名称取方法ID的前缀（sheets, docs, drive）
+    metrics.observe_call(name.split('.', 1)[0], seconds, failed)
+
+
+def _retry_delay(attempt, error):
+    """计算第 attempt 次重试前的等待时间（优先使用服务端的 Retry-After）"""
+    retry_after = None
+    if isinstance(error, HttpError):
+        retry_after = error.resp.get('retry-after')
+    if retry_after:
+        try:
+            return min(float(retry_after), GOOGLE_API_BACKOFF_MAX_SECONDS)
+        except ValueError:
+            pass
+    # 全抖动（full jitter）：在 [0, base * 2^attempt] 内随机等待，避免并发线程同时重试
+    ceiling = min(GOOGLE_API_BACKOFF_MAX_SECONDS, GOOGLE_API_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+# 本地权限、文件类的系统错误不是网络问题，重试无意义
+NON_RETRYABLE_OS_ERRORS = (PermissionError, FileNotFoundError, IsADirectoryError, NotADirectoryError)
+
+
+def _is_retryable(request, error):
+    """判断失败的请求是否可以重试"""
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        if status == 429:
+            return True
+        return status in RETRYABLE_STATUSES and request.method in IDEMPOTENT_METHODS
+    if isinstance(error, NON_RETRYABLE_OS_ERRORS):
+        return False
+    # 网络错误（连接中断、超时、DNS解析失败、keep-alive连接被断开导致的SSL错误等）
+    return request.method in IDEMPOTENT_METHODS
+
+
+def execute_request(request):
+    """
+    执行Google API请求（限流、重试并记录耗时）
+
+    Args:
+        request: googleapiclient 的 HttpRequest（未调用 execute() 的请求对象）
+    Returns:
+        dict: 请求的响应内容
+    """
+    name = request.methodId
+    bucket = _buckets.get(_bucket_name(request))
+    started = time.monotonic()
+    retries = 0
+
+    while True:
+        if bucket:
+            bucket.acquire()
+        http = _checkout_http()
+        count_outbound_call('google')
+        try:
+            response = request.execute(http=http)
+        except (httplib2.HttpLib2Error, OSError) as e:
+            # 网络错误（含 ServerNotFoundError、ssl.SSLError），连接可能已损坏，丢弃该传输（不归还传输池）
+            error = e
+        except HttpError as e:
+            _checkin_http(http)
+            error = e
+        else:
+            _checkin_http(http)
+            _record(name, time.monotonic() - started, retries, failed=False)
+            return response
+
+        if retries >= GOOGLE_API_MAX_RETRIES or not _is_retryable(request, error):
+            _record(name, time.monotonic() - started, retries, failed=True)
+            raise error
+        delay = _retry_delay(retries, error)
+        retries += 1
+        print(f"⚠ {name} 请求失败（{error}），{delay:.1f} 秒后第 {retries} 次重试")
+        time.sleep(delay)
+
+
+def get_api_metrics():
+    """
+    获取API调用统计
+    Returns:
+        dict: 方法ID -> {calls, retries, failures, total_seconds, max_seconds, avg_seconds}
+    """
+    with _metrics_lock:
+        return {
+            name: dict(
+                stats,
+                total_seconds=round(stats['total_seconds'], 3),
+                max_seconds=round(stats['max_seconds'], 3),
+                avg_seconds=round(stats['total_seconds'] / stats['calls'], 3)
+            )
+            for name, stats in _metrics.items()
+        }
+
+
+def reset_api_metrics():
+    """清空调用统计（每次运行开始时调用）"""
+    with _metrics_lock:
+        _metrics.clear()
@@ -5,19 +5,16 @@ import os
 import re
 import pandas as pd
 from datetime import datetime
-from googleapiclient.discovery import build
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from google.auth.exceptions import RefreshError
-from google.oauth2.credentials import Credentials
-from config import SCOPES_DOCS, DOCUMENT_ID, TOKEN_JSON_FILE, CREDENTIALS_FILE, BASE_DIR
+from config import DOCUMENT_ID, BASE_DIR, DEADLINE_SOON_VALUES
 from data_processor import (
     get_job_category, 
     get_time_category, 
     get_sort_priority,
-    parse_deadline_for_sort
+    deadline_sort_keys
 )
 from utils import get_pinyin_sort_key
+from google_client import build_service, execute_request
+from logger import outbound_call, current_step, log_program_run
 
 # 周期标题的正则表达式模式
 # 匹配新格式: "海外资讯 136 | 2026.02.08 - 2026.02.21"
@@ -114,6 +111,38 @@ def get_openai_key():
         return None
 
 
+# 创建LLM客户端的函数（录制/回放时替换为替身），见 use_llm_client_factory
+_llm_client_factory = None
+
+
+def use_llm_client_factory(factory):
+    """替换LLM客户端的创建方式（录制/回放用，传入 None 恢复）"""
+    global _llm_client_factory
+    _llm_client_factory = factory
+
+
+def open_llm_client():
+    """
+    创建真实的OpenAI客户端
+    Returns:
+        openai.OpenAI: 客户端；无法获取密钥时返回 None（openai库未安装时抛出 ImportError）
+    """
+    import openai
+    from config import OPENAI_BASE_URL
+    
+    openai_key = get_openai_key()
+    if not openai_key:
+        return None
+    return openai.OpenAI(api_key=openai_key, base_url=OPENAI_BASE_URL)
+
+
+def create_llm_client():
+    """创建LLM客户端（设置了替身时使用替身）"""
+    if _llm_client_factory is not None:
+        return _llm_client_factory()
+    return open_llm_client()
+
+
 def call_llm_for_content_organization(existing_content, new_content, date_subtitle):
     """
     使用LLM决定如何组织和插入新内容到现有周期内容中
@@ -127,17 +156,14 @@ def call_llm_for_content_organization(existing_content, new_content, date_subtit
         str: LLM组织后的完整内容（包含date_subtitle）
     """
     try:
-        import openai
-        from config import OPENAI_BASE_URL, OPENAI_MODEL
+        from config import OPENAI_MODEL
         from logger import log_llm_conversation
         
-        openai_key = get_openai_key()
-        if not openai_key:
+        client = create_llm_client()
+        if client is None:
             print("⚠ 无法获取OpenAI密钥，使用默认规则")
             return None
         
-        client = openai.OpenAI(api_key=openai_key, base_url=OPENAI_BASE_URL)
-        
         system_prompt = """你是一个专业的文档编辑助手。你的任务是根据现有的文档内容和新的内容，智能地决定如何组织和插入新内容。
 
 规则：
@@ -198,18 +224,27 @@ def call_llm_for_content_organization(existing_content, new_content, date_subtit
 
 只输出组织后的完整内容，不要包含任何解释或说明。"""
         
-        response = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.1,
-            max_tokens=4000
-        )
+        with outbound_call('llm'):
+            response = client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=0.1,
+                max_tokens=4000
+            )
         
         organized_content = response.choices[0].message.content.strip()
         
+        # 记录token用量（用于运行指标）
+        usage = getattr(response, 'usage', None)
+        log_program_run(current_step(), 'LLM整理周期内容完成', 'info', {
+            'model': OPENAI_MODEL,
+            'prompt_tokens': getattr(usage, 'prompt_tokens', None),
+            'completion_tokens': getattr(usage, 'completion_tokens', None)
+        })
+        
         # 清理行末多余空格（Markdown软换行符）
         organized_content = clean_trailing_spaces(organized_content)
         
@@ -267,33 +302,13 @@ def build_initial_content_for_new_period(wechat_template_output, date_subtitle,
 
 
 def build_docs_service():
-    """构建Google Docs服务"""
-    creds = None
-    if os.path.exists(TOKEN_JSON_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_JSON_FILE, SCOPES_DOCS)
-    
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            try:
-                creds.refresh(Request())
-            except RefreshError:
-                # Token刷新失败（可能被撤销），需要重新授权
-                print("Token已失效，正在打开浏览器进行重新授权...")
-                flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES_DOCS)
-                creds = flow.run_local_server(port=0)
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES_DOCS)
-            creds = flow.run_local_server(port=0)
-        
-        with open(TOKEN_JSON_FILE, 'w', encoding='utf-8') as token:
-            token.write(creds.to_json())
-    
-    return build('docs', 'v1', credentials=creds)
+    """获取当前线程缓存的Google Docs服务（与Sheets服务共用凭据和传输）"""
+    return build_service('docs', 'v1')
 
 
 def retrieve_document_content(service, document_id):
     """获取文档内容"""
-    document = service.documents().get(documentId=document_id).execute()
+    document = execute_request(service.documents().get(documentId=document_id))
     doc_content = document.get('body').get('content')
     text = ""
     
@@ -325,7 +340,7 @@ def append_to_document(service, document_id, text, date_subtitle=""):
         date_subtitle: 日期副标题（可选）
     """
     # 获取文档当前内容以确定插入位置（文档末尾）
-    document = service.documents().get(documentId=document_id).execute()
+    document = execute_request(service.documents().get(documentId=document_id))
     doc_content = document.get('body').get('content')
     
     # Google Docs API 的 endIndex 是排他的，减1得到最后一个有效插入位置
@@ -378,10 +393,10 @@ def append_to_document(service, document_id, text, date_subtitle=""):
         }
     })
     
-    result = service.documents().batchUpdate(
+    result = execute_request(service.documents().batchUpdate(
         documentId=document_id, 
         body={'requests': requests}
-    ).execute()
+    ))
     
     return result
 
@@ -488,8 +503,9 @@ def sort_jobs(jobs):
     Returns:
         dict: 按类别和时间分组的职位字典
     """
-    # 为每个职位添加排序信息
-    for job in jobs:
+    # 为每个职位添加排序信息（截止日期整列一次解析）
+    deadline_dates = deadline_sort_keys([job.get('deadline', '') for job in jobs])
+    for job, deadline_date in zip(jobs, deadline_dates):
         # 从 job_type 推断类别
         job_type_text = job.get('job_type', '')
         
@@ -514,7 +530,7 @@ def sort_jobs(jobs):
         
         # 时间类别
         deadline = job.get('deadline', '')
-        if deadline in ['Soon', '尽快申请', 'soon', 'SOON']:
+        if deadline in DEADLINE_SOON_VALUES:
             job['time_category'] = '尽快申请'
         else:
             job['time_category'] = '本月及以后'
@@ -524,7 +540,7 @@ def sort_jobs(jobs):
         job['time_priority'] = 0 if job['time_category'] == '尽快申请' else 1
         job['country_pinyin'] = get_pinyin_sort_key(job.get('country', ''))
         job['direction_pinyin'] = get_pinyin_sort_key(job.get('direction', ''))
-        job['deadline_date'] = parse_deadline_for_sort(job.get('deadline', ''))
+        job['deadline_date'] = deadline_date
     
     # 排序
     sorted_jobs = sorted(jobs, key=lambda x: (
@@ -780,7 +796,7 @@ def replace_period_content(service, document_id, date_subtitle, new_content):
     DELETE_VERIFY_DELAY = 3  # 删除后等待3秒再验证
     
     # 获取文档内容
-    document = service.documents().get(documentId=document_id).execute()
+    document = execute_request(service.documents().get(documentId=document_id))
     doc_content = retrieve_document_content(service, document_id)
     
     # 保存原始内容用于验证删除
@@ -812,7 +828,7 @@ def replace_period_content(service, document_id, date_subtitle, new_content):
         try:
             # 重新获取文档和索引（因为可能已经有变化）
             if attempt > 1:
-                document = service.documents().get(documentId=document_id).execute()
+                document = execute_request(service.documents().get(documentId=document_id))
                 doc_content = retrieve_document_content(service, document_id)
                 start_index, end_index = find_period_content_indices(document, doc_content, date_subtitle)
                 
@@ -830,10 +846,10 @@ def replace_period_content(service, document_id, date_subtitle, new_content):
                 }
             }
             
-            service.documents().batchUpdate(
+            execute_request(service.documents().batchUpdate(
                 documentId=document_id,
                 body={'requests': [delete_request]}
-            ).execute()
+            ))
             
             # 等待3秒
             print(f"   ⏳ 等待 {DELETE_VERIFY_DELAY} 秒后验证删除结果...")
@@ -870,7 +886,7 @@ def replace_period_content(service, document_id, date_subtitle, new_content):
     print("   📝 插入新内容...")
     
     # 重新获取文档以获取正确的插入位置
-    document = service.documents().get(documentId=document_id).execute()
+    document = execute_request(service.documents().get(documentId=document_id))
     doc_content = retrieve_document_content(service, document_id)
     
     # 找到标题后的插入位置
@@ -941,10 +957,10 @@ def replace_period_content(service, document_id, date_subtitle, new_content):
             }
         }
         
-        service.documents().batchUpdate(
+        execute_request(service.documents().batchUpdate(
             documentId=document_id,
             body={'requests': [insert_request]}
-        ).execute()
+        ))
         
         print("   ✅ 新内容插入成功")
         
@@ -979,13 +995,13 @@ def append_content_to_period_end(service, document_id, doc_content, date_subtitl
     
     if next_period_start == -1:
         # 这是最后一个周期，追加到文档末尾
-        document = service.documents().get(documentId=document_id).execute()
+        document = execute_request(service.documents().get(documentId=document_id))
         doc_body_content = document.get('body').get('content')
         end_index = doc_body_content[-1].get('endIndex', 1) - 1
     else:
         # 找到下一个周期前的位置
         # 需要将纯文本位置转换为API索引
-        document = service.documents().get(documentId=document_id).execute()
+        document = execute_request(service.documents().get(documentId=document_id))
         body_content = document.get('body').get('content')
         accumulated_text = ""
         end_index = None
@@ -1025,10 +1041,10 @@ def append_content_to_period_end(service, document_id, doc_content, date_subtitl
     ]
     
     try:
-        service.documents().batchUpdate(
+        execute_request(service.documents().batchUpdate(
             documentId=document_id,
             body={'requests': requests}
-        ).execute()
+        ))
     except Exception as e:
         print(f"⚠ 追加内容失败: {e}")
 
@@ -1090,7 +1106,7 @@ def ensure_current_period_exists(date_subtitle):
     print(f"📅 创建新周期标题: {date_subtitle}")
     
     # 获取文档当前内容以确定插入位置（确保插入到文档最末尾）
-    document = service.documents().get(documentId=DOCUMENT_ID).execute()
+    document = execute_request(service.documents().get(documentId=DOCUMENT_ID))
     doc_body_content = document.get('body').get('content')
     
     # Google Docs API 的 endIndex 是排他的（exclusive），所以减1得到最后一个有效位置
@@ -1136,10 +1152,10 @@ def ensure_current_period_exists(date_subtitle):
     ]
     
     try:
-        service.documents().batchUpdate(
+        execute_request(service.documents().batchUpdate(
             documentId=DOCUMENT_ID,
             body={'requests': requests}
-        ).execute()
+        ))
         return True, f"已创建新周期标题: {date_subtitle}"
     except Exception as e:
         print(f"⚠ 创建周期标题失败: {e}")
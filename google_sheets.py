@@ -1,118 +1,266 @@
 """
 Google Sheets API 模块 - 处理Google表格的读写操作
 """
-import os
-import pickle
-from googleapiclient.discovery import build
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from google.auth.exceptions import RefreshError
-from config import (
-    SCOPES_SHEETS, 
-    SPREADSHEET_ID, 
-    TOKEN_PICKLE_FILE, 
-    CREDENTIALS_FILE
-)
-
-
-def authorize_credentials():
-    """授权Google API凭据"""
-    creds = None
-    if os.path.exists(TOKEN_PICKLE_FILE):
-        with open(TOKEN_PICKLE_FILE, 'rb') as token:
-            creds = pickle.load(token)
-    
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            try:
-                creds.refresh(Request())
-            except RefreshError:
-                # Token刷新失败（可能被撤销），需要重新授权
-                print("Token已失效，正在打开浏览器进行重新授权...")
-                flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES_SHEETS)
-                creds = flow.run_local_server(port=0)
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES_SHEETS)
-            creds = flow.run_local_server(port=0)
-        
-        with open(TOKEN_PICKLE_FILE, 'wb') as token:
-            pickle.dump(creds, token)
-    
-    return creds
+import re
+from googleapiclient.errors import HttpError
+from config import SPREADSHEET_ID, SHEETS_BATCH_MAX_REQUESTS
+from utils import column_index_to_letter
+from google_client import build_service, execute_request
+import metrics
+
+# 表格写入监听器（本地镜像据此失效，避免读取到本程序刚修改前的旧数据）
+_write_listeners = []
+
+# 各工作表的表头及列投影解析结果（列名 -> A1列范围只解析一次）
+_header_cache = {}
+_projection_cache = {}
+
+
+def get_sheets_service():
+    """获取当前线程缓存的Sheets服务（与Docs服务共用凭据和传输）"""
+    return build_service('sheets', 'v4')
+
+
+def get_drive_service():
+    """获取当前线程缓存的Drive服务（仅用于读取表格的修改时间）"""
+    return build_service('drive', 'v3')
+
+
+def get_spreadsheet_modified_time():
+    """
+    通过Drive API获取表格的最后修改时间
+    Returns:
+        str: RFC 3339 格式的修改时间；无法获取（如令牌缺少Drive元数据权限）时返回 None
+    """
+    try:
+        result = execute_request(get_drive_service().files().get(
+            fileId=SPREADSHEET_ID, 
+            fields='modifiedTime', 
+            supportsAllDrives=True
+        ))
+        return result.get('modifiedTime')
+    except HttpError as e:
+        print(f"⚠ 无法获取表格修改时间（如提示权限不足，请删除 token.json 后重新授权）: {e}")
+        return None
+
+
+def add_write_listener(callback):
+    """注册表格写入监听器，callback(target) 在每次删除/追加/更新后调用"""
+    _write_listeners.append(callback)
+
+
+def _notify_write(target):
+    """通知所有监听器表格已被写入"""
+    for callback in _write_listeners:
+        try:
+            callback(target)
+        except Exception as e:
+            print(f"⚠ 表格写入监听器执行失败: {e}")
 
 
 def fetch_data(range_name):
     """从Google表格获取数据"""
-    creds = authorize_credentials()
-    service = build('sheets', 'v4', credentials=creds)
+    service = get_sheets_service()
     sheet = service.spreadsheets()
-    result = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=range_name).execute()
+    result = execute_request(sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=range_name))
     values = result.get('values', [])
+    _observe_rows_fetched(range_name, values)
     return values
 
 
+def _observe_rows_fetched(range_name, values):
+    """按实际下载的数据行数更新指标（从第1行开始的范围不计表头行）"""
+    tab, _, cells = range_name.partition('!')
+    match = re.match(r'^[A-Za-z]*(\d+)', cells)
+    start_row = int(match.group(1)) if match else 1
+    metrics.observe_rows_fetched(tab.strip("'"), len(values) - (1 if start_row == 1 and values else 0))
+
+
+def get_sheet_headers(tab, refresh=False):
+    """获取工作表表头（第一行），进程内缓存"""
+    if refresh or tab not in _header_cache:
+        values = fetch_data(f"{tab}!1:1")
+        _header_cache[tab] = values[0] if values else []
+        for key in [key for key in _projection_cache if key[0] == tab]:
+            del _projection_cache[key]
+    return _header_cache[tab]
+
+
+def _resolve_projection(tab, columns, refresh=False):
+    """
+    将列名解析为列索引，并把相邻的列合并为连续的列范围
+    Returns:
+        tuple: (存在于表头中的列名列表, 对应的列索引列表, [(起始列索引, 结束列索引), ...])
+    """
+    headers = get_sheet_headers(tab, refresh=refresh)
+    key = (tab, tuple(columns))
+    if key not in _projection_cache:
+        header_index = {name: index for index, name in reversed(list(enumerate(headers)))}
+        found = [name for name in columns if name in header_index]
+        missing = [name for name in columns if name not in header_index]
+        if missing:
+            print(f"⚠ 工作表 {tab} 缺少列: {missing}")
+        indices = [header_index[name] for name in found]
+
+        spans = []
+        for index in sorted(set(indices)):
+            if spans and index == spans[-1][1] + 1:
+                spans[-1] = (spans[-1][0], index)
+            else:
+                spans.append((index, index))
+        _projection_cache[key] = (found, indices, spans)
+    return _projection_cache[key]
+
+
+def fetch_columns(tab, columns, start_row=2, refresh_headers=False):
+    """
+    只获取工作表中指定列的数据（通过batchGet按列拉取，减少传输量）
+
+    Args:
+        tab: 工作表名称
+        columns: 需要的列名列表（按表头名称）
+        start_row: 起始行号（1基，默认2即表头之后的第一行数据）
+        refresh_headers: 是否重新读取表头
+    Returns:
+        tuple: (headers, rows)，headers 为表头中实际存在的列名，rows 的列顺序与之相同
+    """
+    found, indices, spans = _resolve_projection(tab, columns, refresh=refresh_headers)
+    if not spans:
+        return found, []
+
+    ranges = [
+        f"{tab}!{column_index_to_letter(first)}{start_row}:{column_index_to_letter(last)}"
+        for first, last in spans
+    ]
+    service = get_sheets_service()
+    result = execute_request(service.spreadsheets().values().batchGet(
+        spreadsheetId=SPREADSHEET_ID,
+        ranges=ranges,
+        majorDimension='COLUMNS'
+    ))
+
+    # 末尾的空单元格/空列不会返回，按范围宽度补齐
+    column_values = {}
+    for (first, last), value_range in zip(spans, result.get('valueRanges', [])):
+        values = value_range.get('values', [])
+        for offset in range(last - first + 1):
+            column_values[first + offset] = values[offset] if offset < len(values) else []
+
+    row_count = max((len(column_values[index]) for index in indices), default=0)
+    rows = [
+        [column_values[index][row] if row < len(column_values[index]) else '' for index in indices]
+        for row in range(row_count)
+    ]
+    metrics.observe_rows_fetched(tab, len(rows))
+    return found, rows
+
+
+def iter_sheet_rows(tab, chunk_size, start_row=2):
+    """
+    分块读取整个工作表（每块一次请求，按表头宽度补齐末尾的空单元格）
+
+    Args:
+        tab: 工作表名称
+        chunk_size: 每块行数
+        start_row: 起始行号（1基，默认2即表头之后的第一行数据）
+    Yields:
+        tuple: (headers, rows)
+    """
+    headers = get_sheet_headers(tab)
+    if not headers:
+        return
+    last_column = column_index_to_letter(len(headers) - 1)
+    while True:
+        end_row = start_row + chunk_size - 1
+        values = fetch_data(f"{tab}!A{start_row}:{last_column}{end_row}")
+        if not values:
+            return
+        yield headers, [row + [''] * (len(headers) - len(row)) for row in values]
+        if len(values) < chunk_size:
+            return
+        start_row = end_row + 1
+
+
+def _coalesce_row_ranges(rows):
+    """
+    将行索引合并为连续区间
+    Returns:
+        list: [(startIndex, endIndex), ...]，按降序排列，endIndex 不含
+    """
+    ranges = []
+    for index in sorted(set(rows), reverse=True):
+        if ranges and index == ranges[-1][0] - 1:
+            ranges[-1] = (index, ranges[-1][1])
+        else:
+            ranges.append((index, index + 1))
+    return ranges
+
+
 def delete_rows_from_sheet(sheet_id, rows_to_delete):
-    """从Google表格中删除行"""
+    """从Google表格中删除行（连续的行合并为一个区间删除，不修改传入的列表）"""
     if not rows_to_delete:
         return
     
-    creds = authorize_credentials()
-    service = build('sheets', 'v4', credentials=creds)
+    service = get_sheets_service()
     
-    # 按降序排序，从后往前删除，避免索引变化
-    rows_to_delete.sort(reverse=True)
+    # 按降序排列区间，从后往前删除，避免索引变化
+    row_ranges = _coalesce_row_ranges(rows_to_delete)
+    deleted_count = sum(end - start for start, end in row_ranges)
     
-    batch_update_body = {
-        "requests": [
-            {
-                "deleteDimension": {
-                    "range": {
-                        "sheetId": sheet_id,
-                        "dimension": "ROWS",
-                        "startIndex": start_index,
-                        "endIndex": start_index + 1
+    # 请求过多时分批提交（各批次仍按降序执行，前一批不会影响后一批的索引）
+    for offset in range(0, len(row_ranges), SHEETS_BATCH_MAX_REQUESTS):
+        batch_update_body = {
+            "requests": [
+                {
+                    "deleteDimension": {
+                        "range": {
+                            "sheetId": sheet_id,
+                            "dimension": "ROWS",
+                            "startIndex": start_index,
+                            "endIndex": end_index
+                        }
                     }
-                }
-            } for start_index in rows_to_delete
-        ]
-    }
-    
-    request = service.spreadsheets().batchUpdate(spreadsheetId=SPREADSHEET_ID, body=batch_update_body)
-    response = request.execute()
-    print(f"{len(rows_to_delete)} rows deleted.")
+                } for start_index, end_index in row_ranges[offset:offset + SHEETS_BATCH_MAX_REQUESTS]
+            ]
+        }
+        
+        request = service.spreadsheets().batchUpdate(spreadsheetId=SPREADSHEET_ID, body=batch_update_body)
+        response = execute_request(request)
+    _notify_write(sheet_id)
+    print(f"{deleted_count} rows deleted ({len(row_ranges)} ranges).")
 
 
 def append_data_to_sheet(range_name, data):
     """向Google表格追加数据"""
-    creds = authorize_credentials()
-    service = build('sheets', 'v4', credentials=creds)
+    service = get_sheets_service()
     sheet = service.spreadsheets()
     body = {'values': data}
     
-    result = sheet.values().append(
+    result = execute_request(sheet.values().append(
         spreadsheetId=SPREADSHEET_ID,
         range=range_name,
         valueInputOption='USER_ENTERED',
         body=body,
         insertDataOption='INSERT_ROWS'
-    ).execute()
+    ))
+    _notify_write(range_name)
     
     print(f"{result.get('updates').get('updatedRows')} rows appended.")
 
 
 def update_data_in_sheet(range_name, data):
     """更新Google表格中指定范围的数据"""
-    creds = authorize_credentials()
-    service = build('sheets', 'v4', credentials=creds)
+    service = get_sheets_service()
     sheet = service.spreadsheets()
     body = {'values': data}
     
-    result = sheet.values().update(
+    result = execute_request(sheet.values().update(
         spreadsheetId=SPREADSHEET_ID,
         range=range_name,
         valueInputOption='USER_ENTERED',
         body=body
-    ).execute()
+    ))
+    _notify_write(range_name)
     
     print(f"{result.get('updatedRows')} rows updated.")
 
@@ -5,12 +5,30 @@
 import os
 import sys
 import json
+import atexit
+import gzip
+import hashlib
+import queue
+import shutil
+import time
+import functools
+import threading
+import unicodedata
+from contextlib import contextmanager
 from datetime import datetime
-from config import BASE_DIR, CHINA_TZ
+from config import (
+    BASE_DIR, CHINA_TZ, RUNS_LOG_MAX_BYTES, RUNS_LOG_BACKUPS,
+    LOG_FLUSH_INTERVAL_SECONDS, LOG_FLUSH_BUFFER_BYTES,
+    LOG_RETENTION_DAYS, LOG_COMPRESS_AFTER_DAYS, LOG_DIR_MAX_MB, LLM_LOG_DAILY_SEGMENT,
+    LLM_LOG_DRAIN_TIMEOUT_SECONDS
+)
+import metrics
 
 # 日志文件夹路径
 LLM_LOGS_DIR = os.path.join(BASE_DIR, 'llm_logs')
 LOGS_DIR = os.path.join(BASE_DIR, 'logs')
+# 机器可读的运行记录（每行一次运行），用于跨运行统计
+RUNS_LOG_FILE = os.path.join(LOGS_DIR, 'runs.jsonl')
 
 # 确保日志文件夹存在
 os.makedirs(LLM_LOGS_DIR, exist_ok=True)
@@ -19,30 +37,78 @@ os.makedirs(LOGS_DIR, exist_ok=True)
 # 会话日志缓冲区（存储结构化日志条目）
 _session_log_buffer = []
 
+# 本次运行已结束的步骤计时（见 step_span），以及各线程当前所在的步骤
+_session_spans = []
+_session_started = time.monotonic()
+_spans_lock = threading.Lock()
+_active_spans = threading.local()
+
+# 步骤在耗时表中的顺序，以及统计的对外调用类型
+STEP_ORDER = ['PRE'] + [str(i) for i in range(1, 11)]
+OUTBOUND_CALL_KINDS = ['google', 'mysql', 'smtp', 'llm']
+
 
 class TeeOutput:
     """
     同时输出到控制台和文件的类
     用于捕获所有print输出并保存到日志文件
+
+    文件写入带缓冲：缓冲超过 LOG_FLUSH_BUFFER_BYTES 或后台线程每隔
+    LOG_FLUSH_INTERVAL_SECONDS 秒时写入磁盘，步骤结束、程序退出及未捕获的异常时立即写入，
+    不再每次 print 都触发一次系统调用。
     """
-    def __init__(self, file_path):
+    def __init__(self, file_path, flush_interval=LOG_FLUSH_INTERVAL_SECONDS, buffer_bytes=LOG_FLUSH_BUFFER_BYTES):
         self.file = open(file_path, 'w', encoding='utf-8')
         self.stdout = sys.stdout
         self.stderr = sys.stderr
+        self._buffer_bytes = buffer_bytes
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_loop, args=(flush_interval,), name='log-flusher', daemon=True
+        )
+        self._flusher.start()
         
     def write(self, text):
-        # 同时写入控制台和文件
+        # 同时写入控制台和文件（文件写入缓冲区，由 _flush_file 统一写盘）
         self.stdout.write(text)
-        self.file.write(text)
-        self.file.flush()  # 确保立即写入文件
+        with self._lock:
+            if self.file.closed:
+                return
+            self.file.write(text)
+            self._pending += len(text)
+            if self._pending >= self._buffer_bytes:
+                self._flush_file()
+    
+    def write_to_file(self, text):
+        """只写入日志文件（不输出到控制台）"""
+        with self._lock:
+            if not self.file.closed:
+                self.file.write(text)
+                self._flush_file()
+    
+    def _flush_file(self):
+        """调用方需持有 _lock"""
+        if self._pending and not self.file.closed:
+            self.file.flush()
+        self._pending = 0
+    
+    def _flush_loop(self, interval):
+        while not self._stopped.wait(interval):
+            with self._lock:
+                self._flush_file()
         
     def flush(self):
         self.stdout.flush()
-        self.file.flush()
+        with self._lock:
+            self._flush_file()
         
     def close(self):
-        if self.file and not self.file.closed:
-            self.file.close()
+        self._stopped.set()
+        with self._lock:
+            if self.file and not self.file.closed:
+                self.file.close()
             
     def __enter__(self):
         return self
@@ -51,6 +117,37 @@ class TeeOutput:
         self.close()
 
 
+# 当前的终端输出日志（步骤结束、程序退出或异常时将其缓冲写盘）
+_active_tee = None
+
+
+def flush_print_log():
+    """将终端输出日志的缓冲立即写入文件"""
+    tee = _active_tee
+    if tee is not None:
+        try:
+            tee.flush()
+        except (OSError, ValueError):
+            pass
+
+
+def _flush_on_thread_exception(args):
+    flush_print_log()
+    _original_thread_excepthook(args)
+
+
+def _flush_on_exception(exc_type, exc_value, exc_tb):
+    _original_excepthook(exc_type, exc_value, exc_tb)
+    flush_print_log()
+
+
+_original_excepthook = sys.excepthook
+_original_thread_excepthook = threading.excepthook
+sys.excepthook = _flush_on_exception
+threading.excepthook = _flush_on_thread_exception
+atexit.register(flush_print_log)
+
+
 def setup_print_logging():
     """
     设置print输出同时记录到日志文件
@@ -68,7 +165,9 @@ def setup_print_logging():
     log_filepath = os.path.join(LOGS_DIR, log_filename)
     
     # 创建TeeOutput对象
+    global _active_tee
     tee = TeeOutput(log_filepath)
+    _active_tee = tee
     
     # 重定向stdout和stderr
     sys.stdout = tee
@@ -79,8 +178,12 @@ def setup_print_logging():
 
 def restore_print_logging(tee):
     """
-    恢复原始的stdout和stderr，并将结构化日志追加到txt文件
+    恢复原始的stdout和stderr，并将结构化日志追加到txt文件（同时以JSON行写入 runs.jsonl）
     """
+    # 先写完本次运行的LLM对话，写入结果仍记录在本次运行的日志中
+    flush_llm_logs()
+    _append_run_record()
+    
     if tee:
         # 先恢复stdout，这样后续的写入不会输出到控制台
         original_stdout = tee.stdout
@@ -93,11 +196,13 @@ def restore_print_logging(tee):
         
         # 将结构化日志摘要写入到同一个txt文件
         log_summary = format_log_summary()
-        if log_summary and tee.file and not tee.file.closed:
-            tee.file.write(log_summary)
-            tee.file.flush()
+        if log_summary:
+            tee.write_to_file(log_summary)
         
         tee.close()
+        global _active_tee
+        if _active_tee is tee:
+            _active_tee = None
 
 
 def get_timestamp():
@@ -111,66 +216,230 @@ def get_log_filename(prefix='run', extension='log'):
     return f"{prefix}_{timestamp}.{extension}"
 
 
+# LLM对话后台写入队列（见 log_llm_conversation），程序退出前写完
+_llm_log_queue = queue.Queue()
+_llm_writer_thread = None
+_llm_writer_lock = threading.Lock()
+
+# 参与保留策略的日志文件（当前运行的日志、runs.jsonl 等不在其中）
+RETAINED_LOG_PREFIXES = ('run_', 'llm_')
+
+
+def _retained_log_files(directory):
+    """目录中参与保留策略的日志文件，返回 [(路径, 修改时间, 大小)]，按修改时间从旧到新"""
+    files = []
+    for name in os.listdir(directory):
+        if not name.startswith(RETAINED_LOG_PREFIXES) or not name.endswith(('.txt', '.txt.gz', '.prof')):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        files.append((path, stat.st_mtime, stat.st_size))
+    return sorted(files, key=lambda item: item[1])
+
+
+def _gzip_file(path):
+    """压缩为 .gz 并删除原文件（保留修改时间，以便按时间清理），返回压缩后的大小"""
+    target = path + '.gz'
+    with open(path, 'rb') as source, gzip.open(target, 'wb') as compressed:
+        shutil.copyfileobj(source, compressed)
+    stat = os.stat(path)
+    os.utime(target, (stat.st_atime, stat.st_mtime))
+    os.remove(path)
+    return os.path.getsize(target)
+
+
+def apply_log_retention(directories=(LOGS_DIR, LLM_LOGS_DIR)):
+    """
+    对日志目录执行保留策略：
+    1. 超过 LOG_COMPRESS_AFTER_DAYS 天未修改的 .txt 日志压缩为 .txt.gz
+    2. 删除超过 LOG_RETENTION_DAYS 天的日志
+    3. 目录总大小超过 LOG_DIR_MAX_MB 时从最旧的开始删除
+
+    Returns:
+        dict: {compressed, deleted, freed_bytes}
+    """
+    now = time.time()
+    stats = {'compressed': 0, 'deleted': 0, 'freed_bytes': 0}
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        files = []
+        for path, mtime, size in _retained_log_files(directory):
+            age_days = (now - mtime) / 86400
+            try:
+                if age_days > LOG_RETENTION_DAYS:
+                    os.remove(path)
+                    stats['deleted'] += 1
+                    stats['freed_bytes'] += size
+                    continue
+                if path.endswith('.txt') and age_days > LOG_COMPRESS_AFTER_DAYS:
+                    compressed_size = _gzip_file(path)
+                    stats['compressed'] += 1
+                    stats['freed_bytes'] += size - compressed_size
+                    path, size = path + '.gz', compressed_size
+            except OSError as e:
+                print(f"⚠ 处理日志文件失败 {os.path.basename(path)}: {e}")
+            files.append((path, size))
+
+        total = sum(size for _path, size in files)
+        limit = LOG_DIR_MAX_MB * 1024 * 1024
+        for path, size in files:
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            stats['deleted'] += 1
+            stats['freed_bytes'] += size
+    return stats
+
+
 def log_llm_conversation(system_prompt, user_prompt, response, model=None, metadata=None):
     """
     记录LLM对话到llm_logs文件夹（TXT格式）
     
+    对话放入后台写入队列，不阻塞调用方；系统提示词按内容哈希只保存一次
+    （llm_logs/prompts/prompt_<哈希>.txt），对话记录中只引用该文件。
+    
     Args:
         system_prompt: 系统提示词
         user_prompt: 用户提示词
         response: LLM响应内容
         model: 使用的模型名称（可选）
         metadata: 额外的元数据（可选，字典格式）
+    Returns:
+        str: 对话记录将写入的文件路径
     """
     try:
-        timestamp = get_timestamp()
-        
-        # 构建TXT格式的日志内容
-        log_lines = [
-            "=" * 60,
-            f"时间: {timestamp}",
-            f"模型: {model or '未指定'}",
-            "=" * 60,
-            "",
-            "【系统提示词】",
-            "-" * 40,
-            system_prompt or "(无)",
-            "",
-            "【用户提示词】",
-            "-" * 40,
-            user_prompt or "(无)",
-            "",
-            "【LLM响应】",
-            "-" * 40,
-            response or "(无)",
-            "",
-        ]
-        
-        # 添加元数据（如果有）
-        if metadata:
-            log_lines.append("【元数据】")
-            log_lines.append("-" * 40)
-            for key, value in metadata.items():
-                log_lines.append(f"{key}: {value}")
-            log_lines.append("")
-        
-        log_lines.append("=" * 60)
-        
-        # 生成日志文件名
-        filename = get_log_filename('llm', 'txt')
+        if LLM_LOG_DAILY_SEGMENT:
+            # 每天一个只追加的文件，避免产生大量小文件
+            filename = f"llm_{datetime.now(CHINA_TZ).strftime('%Y%m%d')}.txt"
+        else:
+            filename = get_log_filename('llm', 'txt')
         filepath = os.path.join(LLM_LOGS_DIR, filename)
         
-        # 写入TXT文件
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(log_lines))
+        _ensure_llm_writer()
+        _llm_log_queue.put({
+            'filepath': filepath,
+            'append': LLM_LOG_DAILY_SEGMENT,
+            'timestamp': get_timestamp(),
+            'system_prompt': system_prompt,
+            'user_prompt': user_prompt,
+            'response': response,
+            'model': model,
+            'metadata': dict(metadata) if metadata else None
+        })
         
-        print(f"✓ LLM对话已记录到: {filename}")
+        print(f"✓ LLM对话将记录到: {filename}")
         return filepath
         
     except Exception as e:
         print(f"⚠ 记录LLM对话失败: {e}")
 
 
+def _save_system_prompt(system_prompt):
+    """按内容哈希保存系统提示词（已存在时跳过），返回相对于 llm_logs 的路径"""
+    digest = hashlib.sha1(system_prompt.encode('utf-8')).hexdigest()[:12]
+    relative_path = os.path.join('prompts', f"prompt_{digest}.txt")
+    path = os.path.join(LLM_LOGS_DIR, relative_path)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(system_prompt)
+    return relative_path
+
+
+def _write_llm_transcript(item):
+    """写入一条LLM对话记录（在后台写入线程中执行）"""
+    system_prompt = item['system_prompt']
+    if system_prompt:
+        system_prompt = f"(见 {_save_system_prompt(system_prompt)})"
+    
+    # 构建TXT格式的日志内容
+    log_lines = [
+        "=" * 60,
+        f"时间: {item['timestamp']}",
+        f"模型: {item['model'] or '未指定'}",
+        "=" * 60,
+        "",
+        "【系统提示词】",
+        "-" * 40,
+        system_prompt or "(无)",
+        "",
+        "【用户提示词】",
+        "-" * 40,
+        item['user_prompt'] or "(无)",
+        "",
+        "【LLM响应】",
+        "-" * 40,
+        item['response'] or "(无)",
+        "",
+    ]
+    
+    # 添加元数据（如果有）
+    if item['metadata']:
+        log_lines.append("【元数据】")
+        log_lines.append("-" * 40)
+        for key, value in item['metadata'].items():
+            log_lines.append(f"{key}: {value}")
+        log_lines.append("")
+    
+    log_lines.append("=" * 60)
+    
+    if item['append']:
+        with open(item['filepath'], 'a', encoding='utf-8') as f:
+            f.write('\n'.join(log_lines) + '\n\n')
+    else:
+        with open(item['filepath'], 'w', encoding='utf-8') as f:
+            f.write('\n'.join(log_lines))
+
+
+def _llm_writer_loop():
+    while True:
+        item = _llm_log_queue.get()
+        try:
+            _write_llm_transcript(item)
+        except Exception as e:
+            print(f"⚠ 记录LLM对话失败: {e}")
+        finally:
+            _llm_log_queue.task_done()
+
+
+def _ensure_llm_writer():
+    """按需启动后台写入线程（整个进程共用一个）"""
+    global _llm_writer_thread
+    with _llm_writer_lock:
+        if _llm_writer_thread is None or not _llm_writer_thread.is_alive():
+            _llm_writer_thread = threading.Thread(target=_llm_writer_loop, name='llm-log-writer', daemon=True)
+            _llm_writer_thread.start()
+
+
+def flush_llm_logs(timeout=LLM_LOG_DRAIN_TIMEOUT_SECONDS):
+    """
+    等待队列中的LLM对话全部写入
+    Returns:
+        bool: 是否已全部写入（超时返回 False）
+    """
+    deadline = time.monotonic() + timeout
+    with _llm_log_queue.all_tasks_done:
+        while _llm_log_queue.unfinished_tasks:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print(f"⚠ 仍有 {_llm_log_queue.unfinished_tasks} 条LLM对话未写入日志")
+                return False
+            _llm_log_queue.all_tasks_done.wait(remaining)
+    return True
+
+
+# 晚于 flush_print_log 注册，退出时先执行（atexit 按注册的相反顺序执行）
+atexit.register(flush_llm_logs)
+
+
 def log_program_run(step, message, status='info', data=None):
     """
     记录程序运行日志到内存缓冲区
@@ -201,6 +470,7 @@ def log_program_run(step, message, status='info', data=None):
         
         # 将日志条目添加到内存缓冲区
         _session_log_buffer.append(log_entry)
+        metrics.observe_log_entry(log_entry)
         
         return True
         
@@ -210,18 +480,313 @@ def log_program_run(step, message, status='info', data=None):
 
 def reset_session():
     """重置会话ID和日志缓冲区（用于新的一次程序运行）"""
-    global _session_log_buffer
+    global _session_log_buffer, _session_spans, _session_started
     _session_log_buffer = []
+    with _spans_lock:
+        _session_spans = []
+        _session_started = time.monotonic()
     if hasattr(log_program_run, '_session_id'):
         delattr(log_program_run, '_session_id')
 
 
+def _span_stack():
+    stack = getattr(_active_spans, 'stack', None)
+    if stack is None:
+        stack = _active_spans.stack = []
+    return stack
+
+
+@contextmanager
+def step_span(step):
+    """
+    记录一个步骤的耗时（单调时钟）及期间的对外调用次数
+
+    Args:
+        step: 步骤名称或编号（如 'PRE', '1'）
+
+    用法:
+        with step_span('1'):
+            ...
+    """
+    span = {
+        'step': step,
+        'started_at': get_timestamp(),
+        'start': round(time.monotonic() - _session_started, 3),
+        'calls': {}
+    }
+    stack = _span_stack()
+    stack.append(span)
+    started = time.monotonic()
+    status = 'ok'
+    try:
+        yield span
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        stack.pop()
+        duration = time.monotonic() - started
+        span['end'] = round(span['start'] + duration, 3)
+        span['duration'] = round(duration, 3)
+        span['status'] = status
+        with _spans_lock:
+            _session_spans.append(span)
+        metrics.observe_step(step, duration)
+        # 步骤边界：确保该步骤的输出已写入日志文件
+        flush_print_log()
+
+
+def timed_step(step):
+    """step_span 的装饰器形式"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with step_span(step):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count_outbound_call(kind):
+    """
+    为当前线程所在的步骤累计一次对外调用
+
+    Args:
+        kind: 调用类型（google, mysql, smtp, llm）
+    """
+    stack = getattr(_active_spans, 'stack', None)
+    if stack:
+        calls = stack[-1]['calls']
+        calls[kind] = calls.get(kind, 0) + 1
+
+
+@contextmanager
+def outbound_call(kind):
+    """
+    为当前步骤累计一次对外调用，并将耗时和结果记录到运行指标
+
+    Args:
+        kind: 调用类型（mysql, smtp, llm；Google API 在 google_client 中单独记录）
+
+    用法:
+        with outbound_call('mysql'):
+            cursor.execute(...)
+    """
+    count_outbound_call(kind)
+    started = time.monotonic()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        metrics.observe_call(kind, time.monotonic() - started, failed)
+
+
+def current_step():
+    """当前线程所在的步骤（不在任何步骤中时返回 'MAIN'）"""
+    stack = getattr(_active_spans, 'stack', None)
+    return stack[-1]['step'] if stack else 'MAIN'
+
+
+def _pad(text, width, right=True):
+    """按终端显示宽度补齐（中文字符占两列）"""
+    text = str(text)
+    display = sum(2 if unicodedata.east_asian_width(ch) in 'WF' else 1 for ch in text)
+    padding = ' ' * max(0, width - display)
+    return padding + text if right else text + padding
+
+
+def _step_sort_key(step):
+    return (STEP_ORDER.index(step) if step in STEP_ORDER else len(STEP_ORDER), str(step))
+
+
+def format_step_timings(spans):
+    """
+    将步骤计时格式化为表格
+    Returns:
+        list: 文本行列表
+    """
+    header = _pad('步骤', 8, right=False) + _pad('开始(s)', 9) + _pad('耗时(s)', 9) + \
+        ''.join(_pad(kind, 8) for kind in OUTBOUND_CALL_KINDS)
+    lines = [header, "-" * 60]
+    for span in sorted(spans, key=lambda item: item['start']):
+        calls = ''.join(f"{span['calls'].get(kind, 0):>8}" for kind in OUTBOUND_CALL_KINDS)
+        mark = '' if span['status'] == 'ok' else '  ✗'
+        lines.append(f"{str(span['step']):<8}{span['start']:>9.3f}{span['duration']:>9.3f}{calls}{mark}")
+    return lines
+
+
+def _rotate_runs_log():
+    """runs.jsonl 超过大小上限时轮转为 runs.jsonl.1、.2 ...（保留 RUNS_LOG_BACKUPS 个）"""
+    if not os.path.exists(RUNS_LOG_FILE) or os.path.getsize(RUNS_LOG_FILE) < RUNS_LOG_MAX_BYTES:
+        return
+    for index in range(RUNS_LOG_BACKUPS - 1, 0, -1):
+        source = f"{RUNS_LOG_FILE}.{index}"
+        if os.path.exists(source):
+            os.replace(source, f"{RUNS_LOG_FILE}.{index + 1}")
+    if RUNS_LOG_BACKUPS > 0:
+        os.replace(RUNS_LOG_FILE, f"{RUNS_LOG_FILE}.1")
+    else:
+        os.remove(RUNS_LOG_FILE)
+
+
+def _append_run_record():
+    """将本次运行的全部结构化日志条目、步骤计时和对外调用次数作为一行JSON追加到 runs.jsonl"""
+    if not _session_log_buffer:
+        return
+    with _spans_lock:
+        spans = sorted(_session_spans, key=lambda item: item['start'])
+        duration = time.monotonic() - _session_started
+
+    end_entries = [entry for entry in _session_log_buffer if entry['step'] == 'END']
+    calls = {}
+    for span in spans:
+        for kind, count in span['calls'].items():
+            calls[kind] = calls.get(kind, 0) + count
+
+    record = {
+        'session_id': getattr(log_program_run, '_session_id', None),
+        'started_at': _session_log_buffer[0]['timestamp'],
+        'finished_at': get_timestamp(),
+        'duration': round(duration, 3),
+        'success': bool(end_entries) and end_entries[-1]['status'] == 'success',
+        'error': end_entries[-1]['data'].get('error') if end_entries else '程序未正常结束',
+        'calls': calls,
+        'steps': spans,
+        'entries': _session_log_buffer
+    }
+    try:
+        _rotate_runs_log()
+        with open(RUNS_LOG_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+    except OSError as e:
+        print(f"⚠ 记录运行日志失败: {e}")
+    metrics.observe_run(record)
+
+
+def read_run_records(since=None, until=None):
+    """
+    读取 runs.jsonl（含轮转的旧文件）中的运行记录，按时间先后排列
+
+    Args:
+        since: 起始日期（含），格式 'YYYY-MM-DD'
+        until: 结束日期（含），格式 'YYYY-MM-DD'
+    Returns:
+        list: 运行记录列表
+    """
+    paths = [f"{RUNS_LOG_FILE}.{index}" for index in range(RUNS_LOG_BACKUPS, 0, -1)] + [RUNS_LOG_FILE]
+    records = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 进程中途退出可能留下不完整的最后一行
+                    continue
+                day = record['started_at'][:10]
+                if (since and day < since) or (until and day > until):
+                    continue
+                records.append(record)
+    return records
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize_runs(since=None, until=None, last_runs=None):
+    """
+    汇总多次运行的失败率和各步骤耗时
+
+    Args:
+        since: 起始日期（含），格式 'YYYY-MM-DD'
+        until: 结束日期（含），格式 'YYYY-MM-DD'
+        last_runs: 只统计（日期范围内）最近N次运行
+    Returns:
+        dict: {runs, failures, failure_rate, p50, p95（整次运行耗时）,
+               steps: 步骤 -> {runs, mean, p50, p95, max, errors, error_rate, calls（每次平均）}}
+    """
+    records = read_run_records(since, until)
+    if last_runs:
+        records = records[-last_runs:]
+    if not records:
+        return {'runs': 0, 'failures': 0, 'failure_rate': 0.0, 'steps': {}}
+
+    run_durations = sorted(record['duration'] for record in records)
+    failures = sum(1 for record in records if not record['success'])
+    per_step = {}
+    for record in records:
+        for span in record['steps']:
+            per_step.setdefault(span['step'], []).append(span)
+
+    steps = {}
+    for step in sorted(per_step, key=_step_sort_key):
+        spans = per_step[step]
+        durations = sorted(span['duration'] for span in spans)
+        errors = sum(1 for span in spans if span['status'] != 'ok')
+        steps[step] = {
+            'runs': len(spans),
+            'mean': round(sum(durations) / len(durations), 3),
+            'p50': _percentile(durations, 0.5),
+            'p95': _percentile(durations, 0.95),
+            'max': durations[-1],
+            'errors': errors,
+            'error_rate': round(errors / len(spans), 3),
+            'calls': {
+                kind: round(sum(span['calls'].get(kind, 0) for span in spans) / len(spans), 1)
+                for kind in OUTBOUND_CALL_KINDS
+            }
+        }
+    return {
+        'runs': len(records),
+        'failures': failures,
+        'failure_rate': round(failures / len(records), 3),
+        'first': records[0]['started_at'],
+        'last': records[-1]['started_at'],
+        'p50': _percentile(run_durations, 0.5),
+        'p95': _percentile(run_durations, 0.95),
+        'steps': steps
+    }
+
+
+def format_run_report(since=None, until=None, last_runs=None):
+    """跨运行的耗时与失败率报告（文本）"""
+    summary = summarize_runs(since, until, last_runs)
+    if not summary['runs']:
+        return "所选范围内没有运行记录"
+    lines = [
+        f"运行次数: {summary['runs']}（{summary['first']} ~ {summary['last']}）",
+        f"失败: {summary['failures']} 次，失败率 {summary['failure_rate']:.1%}",
+        f"整次运行耗时: p50 {summary['p50']:.3f} s，p95 {summary['p95']:.3f} s",
+        "",
+        _pad('步骤', 8, right=False) + _pad('次数', 6) + _pad('平均(s)', 9) + _pad('p50(s)', 9) +
+        _pad('p95(s)', 9) + _pad('最大(s)', 9) + _pad('失败率', 8) + "  平均对外调用",
+        "-" * 80
+    ]
+    for step, stats in summary['steps'].items():
+        calls = ' '.join(f"{kind}={count:g}" for kind, count in stats['calls'].items() if count)
+        lines.append(f"{str(step):<8}{stats['runs']:>6}{stats['mean']:>9.3f}{stats['p50']:>9.3f}"
+                     f"{stats['p95']:>9.3f}{stats['max']:>9.3f}{stats['error_rate']:>8.1%}  {calls}")
+    return '\n'.join(lines)
+
+
 def log_program_start():
     """记录程序开始运行"""
     reset_session()
     log_program_run('START', '程序开始运行', 'info', {
         'timezone': 'Asia/Shanghai'
     })
+    retention = apply_log_retention()
+    if retention['compressed'] or retention['deleted']:
+        log_program_run('START', '日志保留策略：压缩 {compressed} 个，删除 {deleted} 个'.format(**retention),
+                        'info', retention)
     # 设置print输出日志
     return setup_print_logging()
 
@@ -282,6 +847,13 @@ def format_log_summary():
                 else:
                     lines.append(f"     └─ {key}: {value}")
     
+    with _spans_lock:
+        spans = list(_session_spans)
+    if spans:
+        lines.append("")
+        lines.append("步骤耗时（开始时间相对于程序启动，对外调用为次数）:")
+        lines.extend(format_step_timings(spans))
+    
     lines.append("")
     lines.append("=" * 60)
     
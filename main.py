@@ -29,7 +29,9 @@ from config import (
     UNFILLED_SHEET_ID,
     GROUP_MEMBERS_FILE,
     KEYS_DIR,
-    REQUIRED_COLUMNS
+    REQUIRED_COLUMNS,
+    FILLED_COLUMNS,
+    GISOURCE_SNAPSHOT_TTL_SECONDS
 )
 from utils import (
     read_group_members, 
@@ -37,10 +39,14 @@ from utils import (
     is_date,
     calculate_week_range,
     column_index_to_letter,
-    format_period_title
+    format_period_title,
+    ISO_DATE_PATTERN,
+    add_deadline_columns,
+    drop_deadline_columns
 )
 from google_sheets import (
-    fetch_data, 
+    fetch_data,
+    fetch_columns,
     delete_rows_from_sheet,
     append_data_to_sheet,
     update_data_in_sheet
@@ -48,7 +54,8 @@ from google_sheets import (
 from database import (
     get_database_connection,
     clean_university_names,
-    get_gisource_data,
+    get_gisource_snapshot,
+    invalidate_gisource_snapshot,
     check_universities_exist,
     get_max_event_id,
     insert_event_to_database
@@ -66,11 +73,16 @@ from data_processor import (
     convert_to_wechat_format
 )
 from google_docs import add_wechat_content_to_doc, add_wechat_content_to_doc_sorted, ensure_current_period_exists
+from google_client import get_api_metrics, reset_api_metrics
+from sheets_mirror import sync_tabs, read_tab
+from pipeline import StepGraph
 from logger import (
     log_program_run,
     log_program_start,
     log_program_end,
-    restore_print_logging
+    restore_print_logging,
+    step_span,
+    timed_step
 )
 
 # 禁止显示警告
@@ -88,6 +100,7 @@ def print_banner():
     print()
 
 
+@timed_step('PRE')
 def check_and_create_current_period():
     """
     检查并创建当前周期标题
@@ -201,45 +214,92 @@ def get_operator_name(group_members):
     return operator_input
 
 
+def locate_rows_in_sheet(range_name, target_rows):
+    """
+    删除前直接读取工作表（不使用本地镜像），按行内容定位待删除的行
+    镜像可能落后于表格中的人工编辑，删除用的行号必须来自表格的当前内容
+    Args:
+        range_name: 工作表名称
+        target_rows: 待删除行的单元格值列表
+    Returns:
+        list: deleteDimension 使用的行索引（0基，表头为0）；表格中已找不到的行跳过
+    """
+    values = fetch_data(range_name)
+    headers = values[0] if values else []
+    width = len(headers)
+
+    def row_key(row):
+        cells = adjust_data_to_columns([list(row[:width])], headers)[0]
+        return tuple('' if cell is None else str(cell) for cell in cells)
+
+    positions = {}
+    for index, row in enumerate(values[1:]):
+        positions.setdefault(row_key(row), []).append(index + 1)
+
+    sheet_rows = []
+    for row in target_rows:
+        candidates = positions.get(row_key(row))
+        if candidates:
+            sheet_rows.append(candidates.pop(0))
+        else:
+            print(f"⚠ {range_name} 中已找不到待删除的行（可能已被修改或删除），跳过: {row[:2]}")
+    return sheet_rows
+
+
+@timed_step('1')
 def load_and_clean_data():
     """加载并清理Google Sheets数据"""
     print("步骤 1: 从Google Sheets获取数据...")
     log_program_run('1', '开始从Google Sheets获取数据', 'info')
     
-    # 获取Unfilled数据
     unfilled_range_name = 'Unfilled'
-    unfilled_headers = fetch_data(unfilled_range_name)[0]
-    unfilled_data_raw = fetch_data(unfilled_range_name)[1:]
+    filled_range_name = 'Filled'
+    
+    # 同步本地镜像（表格未修改时跳过下载；Filled只会追加，仅拉取新增行）
+    sync_tabs(
+        [unfilled_range_name, filled_range_name],
+        append_only=[filled_range_name],
+        columns={filled_range_name: FILLED_COLUMNS}
+    )
+    
+    # 获取Unfilled数据
+    unfilled_headers, unfilled_data_raw = read_tab(unfilled_range_name)
     unfilled_data_adjusted = adjust_data_to_columns(unfilled_data_raw, unfilled_headers)
     unfilled_data = pd.DataFrame(unfilled_data_adjusted, columns=unfilled_headers)
     
-    # 获取Filled数据（用于检查重复）
-    filled_range_name = 'Filled'
-    filled_headers = fetch_data(filled_range_name)[0]
-    filled_data_raw = fetch_data(filled_range_name)[1:]
+    # 获取Filled数据（用于检查重复，仅包含 FILLED_COLUMNS 中的列）
+    filled_headers, filled_data_raw = read_tab(filled_range_name)
     filled_data_adjusted = adjust_data_to_columns(filled_data_raw, filled_headers)
     filled_data = pd.DataFrame(filled_data_adjusted, columns=filled_headers)
     
-    # 保存原始Deadline值用于重复检查（在日期转换之前）
+    # 保存原始Deadline值用于重复检查
     unfilled_deadline_original = unfilled_data['Deadline'].astype(str).str.strip()
-    filled_deadline_original = filled_data['Deadline'].astype(str).str.strip() if 'Deadline' in filled_data.columns else pd.Series()
     
-    # ===== 条件1: 删除过期行 =====
-    # 只对非"Soon"的值进行日期转换
-    mask_not_soon = ~unfilled_data['Deadline'].astype(str).str.strip().isin(['Soon', 'soon', 'SOON', '尽快申请'])
-    unfilled_data.loc[mask_not_soon, 'Deadline'] = pd.to_datetime(
-        unfilled_data.loc[mask_not_soon, 'Deadline'], 
-        errors='coerce'
-    )
-    
-    # 获取当前日期（时区无关的date对象）
-    now = datetime.now(CHINA_TZ).date()
+    # 解析Deadline（整列一次），之后各步骤使用 Deadline_Date/Deadline_Is_Soon/Deadline_Is_Invalid 列
+    add_deadline_columns(unfilled_data)
     
-    # 找出过期的行（排除"Soon"行）
-    expired_rows = unfilled_data.index[
-        (unfilled_data['Deadline'].notna()) & 
-        (unfilled_data['Deadline'].apply(lambda x: x.date() if hasattr(x, 'date') else None) < now)
-    ].tolist()
+    # ===== 条件1: 删除过期行 =====
+    # 获取当前日期（时区无关）
+    now = pd.Timestamp(datetime.now(CHINA_TZ).date())
+    
+    # 找出过期的行（只检查解析出日期的行，"Soon"行及空或无法解析的日期不判定为过期）
+    has_deadline_date = ~(unfilled_data['Deadline_Is_Soon'] | unfilled_data['Deadline_Is_Invalid'])
+    is_past = has_deadline_date & (unfilled_data['Deadline_Date'] < now)
+    # 删除不可恢复：只删除 YYYY-MM-DD 格式的过期行，中文等其他格式的日期只提示，不自动删除
+    is_iso_deadline = unfilled_deadline_original.str.match(ISO_DATE_PATTERN)
+    expired_rows = unfilled_data.index[is_past & is_iso_deadline].tolist()
+    kept_past_count = int((is_past & ~is_iso_deadline).sum())
+    if kept_past_count:
+        print(f"⚠ {kept_past_count} 行的Deadline已过期但不是YYYY-MM-DD格式，未自动删除，请人工检查")
+        log_program_run('1', f'{kept_past_count} 行非YYYY-MM-DD格式的Deadline已过期，未自动删除', 'warning', {
+            'kept_past_count': kept_past_count
+        })
+    invalid_deadline_count = int(unfilled_data['Deadline_Is_Invalid'].sum())
+    if invalid_deadline_count:
+        print(f"⚠ {invalid_deadline_count} 行的Deadline为空或无法解析，不参与过期检查")
+        log_program_run('1', f'{invalid_deadline_count} 行的Deadline为空或无法解析', 'warning', {
+            'invalid_deadline_count': invalid_deadline_count
+        })
     
     # ===== 条件2: 删除与Filled重复的行 =====
     # 检查字段: Deadline, Direction, University_EN, Contact_Email
@@ -278,8 +338,10 @@ def load_and_clean_data():
     # ===== 合并两种删除条件 =====
     all_rows_to_delete = list(set(expired_rows + duplicate_rows))
     
-    # 转换为Google Sheets行号（索引+1是因为表头，再+1是因为索引从0开始）
-    rows_to_delete_sheet = [x + 2 for x in all_rows_to_delete]
+    # 删除前重新读取Unfilled，按行内容定位表格中的当前行号（不使用镜像中的行号）
+    rows_to_delete_sheet = locate_rows_in_sheet(
+        unfilled_range_name, [unfilled_data_adjusted[x] for x in sorted(all_rows_to_delete)]
+    ) if all_rows_to_delete else []
     
     if rows_to_delete_sheet:
         # 分别记录删除原因
@@ -297,21 +359,16 @@ def load_and_clean_data():
             'expired_count': expired_count,
             'duplicate_count': duplicate_count
         })
-        # 重新获取数据
-        unfilled_data_raw = fetch_data(unfilled_range_name)[1:]
+        # 重新获取数据（删除操作已使镜像过期，这里会重新同步Unfilled）
+        sync_tabs([unfilled_range_name])
+        unfilled_headers, unfilled_data_raw = read_tab(unfilled_range_name)
         unfilled_data_adjusted = adjust_data_to_columns(unfilled_data_raw, unfilled_headers)
         unfilled_data = pd.DataFrame(unfilled_data_adjusted, columns=unfilled_headers)
+        add_deadline_columns(unfilled_data)
     else:
         print("   没有过期或重复的行需要删除")
         log_program_run('1', '没有过期或重复的行需要删除', 'info')
     
-    # 获取Filled数据
-    filled_range_name = 'Filled'
-    filled_headers = fetch_data(filled_range_name)[0]
-    filled_data_raw = fetch_data(filled_range_name)[1:]
-    filled_data_adjusted = adjust_data_to_columns(filled_data_raw, filled_headers)
-    filled_data = pd.DataFrame(filled_data_adjusted, columns=filled_headers)
-    
     print("✓ 数据加载完成\n")
     log_program_run('1', '数据加载完成', 'success', {
         'unfilled_rows': len(unfilled_data),
@@ -320,6 +377,7 @@ def load_and_clean_data():
     return unfilled_data, filled_data, unfilled_range_name, filled_range_name
 
 
+@timed_step('2')
 def update_university_info(unfilled_data):
     """更新大学中文名称信息"""
     print("步骤 2: 更新大学中文名称...")
@@ -336,7 +394,7 @@ def update_university_info(unfilled_data):
         clean_university_names(cursor, conn)
         
         # 获取GISource数据
-        gisource_data = get_gisource_data(cursor)
+        gisource_data = get_gisource_snapshot(cursor, GISOURCE_SNAPSHOT_TTL_SECONDS)
         gisource_df = pd.DataFrame(gisource_data, columns=['University_EN', 'University_CN', 'Country_CN'])
         
         # 更新unfilled_data中的大学信息
@@ -355,9 +413,10 @@ def update_university_info(unfilled_data):
         
         # 更新修改的行到Google Sheets
         modified_rows = list(set(modified_rows))
+        sheet_data = drop_deadline_columns(unfilled_data)
         for row in modified_rows:
             range_name = f'Unfilled!A{row + 2}:Z{row + 2}'
-            update_data = [unfilled_data.iloc[row].tolist()]
+            update_data = [sheet_data.iloc[row].tolist()]
             update_data_in_sheet(range_name, update_data)
         
         print(f"✓ 更新了 {len(modified_rows)} 行大学信息\n")
@@ -372,6 +431,7 @@ def update_university_info(unfilled_data):
     return unfilled_data
 
 
+@timed_step('3')
 def check_new_universities(filled_data):
     """检查并添加新大学到Universities表"""
     print("步骤 3: 检查新大学...")
@@ -398,10 +458,10 @@ def check_new_universities(filled_data):
         
         if not new_universities.empty:
             # 获取Universities工作表数据
-            universities_data = fetch_data('Universities')
-            if universities_data:
-                universities_headers = universities_data[0]
-                universities_existing = pd.DataFrame(universities_data[1:], columns=universities_headers)
+            # 获取Universities工作表数据（只需University_EN列）
+            universities_headers, universities_rows = fetch_columns('Universities', ['University_EN'])
+            if universities_headers:
+                universities_existing = pd.DataFrame(universities_rows, columns=universities_headers)
             else:
                 universities_existing = pd.DataFrame(columns=['University_EN', 'University_CN', 'Country_CN'])
             
@@ -427,6 +487,7 @@ def check_new_universities(filled_data):
         conn.close()
 
 
+@timed_step('4')
 def select_row_to_process(unfilled_data):
     """选择要处理的行"""
     print("步骤 4: 选择要处理的数据...")
@@ -444,21 +505,17 @@ def select_row_to_process(unfilled_data):
         log_program_run('4', '没有可处理的数据', 'warning')
         return None, filtered_data
     
-    # 转换Deadline为日期
-    now = datetime.now(CHINA_TZ).date()
+    now = pd.Timestamp(datetime.now(CHINA_TZ).date())
     
-    # 识别Soon行（在转换为datetime之前）
-    deadline_str = filtered_data['Deadline'].astype(str).str.strip()
-    soon_rows = filtered_data[deadline_str.isin(['Soon', 'soon', 'SOON', '尽快申请'])]
+    # Soon行与有截止日期的行（使用步骤1解析好的截止日期列，空或无法解析的截止日期不参与选择）
+    soon_rows = filtered_data[filtered_data['Deadline_Is_Soon']]
+    deadline_data = filtered_data[~filtered_data['Deadline_Is_Soon'] & ~filtered_data['Deadline_Is_Invalid']]
     
-    # 移除Soon行进行截止日期计算
-    deadline_data = filtered_data[~filtered_data.index.isin(soon_rows.index)]
-    deadline_data['Deadline'] = pd.to_datetime(deadline_data['Deadline'], errors='coerce')
+    # 未过期的行
+    valid_rows = deadline_data[deadline_data['Deadline_Date'] >= now]
     
     # 找出最近的截止日期
-    nearest_deadline = deadline_data[
-        (deadline_data['Deadline'].dt.date >= now) & (deadline_data['Deadline'].notna())
-    ].nsmallest(1, 'Deadline')
+    nearest_deadline = valid_rows.nsmallest(1, 'Deadline_Date')
     
     index_choices = []
     weights = []
@@ -475,7 +532,6 @@ def select_row_to_process(unfilled_data):
         weights.append(0.1)
     
     # 随机有效行有10%的概率
-    valid_rows = deadline_data[deadline_data['Deadline'].dt.date >= now]
     if not valid_rows.empty:
         random_valid_index = valid_rows.sample(n=1).index[0]
         index_choices.append(random_valid_index)
@@ -506,6 +562,7 @@ def select_row_to_process(unfilled_data):
         return None, filtered_data
 
 
+@timed_step('5')
 def validate_selected_row(selected_row, group_members, unfilled_data):
     """验证选中的行是否有错误"""
     print("步骤 5: 验证数据完整性...")
@@ -537,7 +594,7 @@ def validate_selected_row(selected_row, group_members, unfilled_data):
         if matching_rows:
             row_index = matching_rows[0]
             # 获取Error列的索引（假设在表头中）
-            unfilled_headers = fetch_data('Unfilled')[0]
+            unfilled_headers = read_tab('Unfilled')[0]
             if 'Error' in unfilled_headers:
                 error_col_index = unfilled_headers.index('Error')
                 error_col_letter = column_index_to_letter(error_col_index)
@@ -582,6 +639,7 @@ def validate_selected_row(selected_row, group_members, unfilled_data):
     return True
 
 
+@timed_step('6')
 def process_and_insert_to_database(selected_row):
     """处理数据并插入到数据库"""
     print("步骤 6: 插入数据到数据库...")
@@ -606,6 +664,8 @@ def process_and_insert_to_database(selected_row):
         success = insert_event_to_database(cursor, conn, sql_table, table_name)
         
         if success:
+            # 快照中没有刚插入的资讯，常驻模式的下一次运行需重新查询
+            invalidate_gisource_snapshot()
             print(f"✓ 成功插入数据，Event_ID: {new_event_id}\n")
             log_program_run('6', f'成功插入数据，Event_ID: {new_event_id}', 'success', {
                 'event_id': new_event_id
@@ -621,6 +681,7 @@ def process_and_insert_to_database(selected_row):
         conn.close()
 
 
+@timed_step('7')
 def update_google_sheets(selected_row, unfilled_range_name, filled_range_name):
     """更新Google Sheets"""
     print("步骤 7: 更新Google Sheets...")
@@ -630,10 +691,10 @@ def update_google_sheets(selected_row, unfilled_range_name, filled_range_name):
     source_to_delete = selected_row['Source'].values[0]
     direction_to_delete = selected_row['Direction'].values[0]
     
-    # 重新获取unfilled_data以找到正确的索引
-    unfilled_headers = fetch_data(unfilled_range_name)[0]
-    unfilled_data_raw = fetch_data(unfilled_range_name)[1:]
-    unfilled_data_adjusted = adjust_data_to_columns(unfilled_data_raw, unfilled_headers)
+    # 直接从表格重新获取unfilled_data以找到正确的索引（不使用本地镜像，镜像可能落后于人工编辑）
+    unfilled_values = fetch_data(unfilled_range_name)
+    unfilled_headers = unfilled_values[0]
+    unfilled_data_adjusted = adjust_data_to_columns(unfilled_values[1:], unfilled_headers)
     unfilled_data = pd.DataFrame(unfilled_data_adjusted, columns=unfilled_headers)
     
     rows_to_delete = unfilled_data.index[
@@ -646,15 +707,8 @@ def update_google_sheets(selected_row, unfilled_range_name, filled_range_name):
     if rows_to_delete:
         delete_rows_from_sheet(UNFILLED_SHEET_ID, rows_to_delete)
     
-    # 添加到Filled
-    def convert_value(value):
-        if isinstance(value, pd.Timestamp):
-            return value.strftime('%Y-%m-%d')
-        else:
-            return value
-    
-    converted_row = selected_row.applymap(convert_value)
-    data_to_append = [converted_row.iloc[0].tolist()]
+    # 添加到Filled（Deadline保留表格中的原始值，不写入标准化的截止日期列）
+    data_to_append = [drop_deadline_columns(selected_row).iloc[0].tolist()]
     append_data_to_sheet(filled_range_name, data_to_append)
     
     print("✓ Google Sheets更新完成\n")
@@ -664,6 +718,7 @@ def update_google_sheets(selected_row, unfilled_range_name, filled_range_name):
     })
 
 
+@timed_step('8')
 def generate_and_send_wechat_message(selected_row, new_event_id, operator, group_members):
     """生成并发送微信群消息"""
     print("步骤 8: 生成微信消息...")
@@ -713,6 +768,7 @@ def generate_and_send_wechat_message(selected_row, new_event_id, operator, group
     return text_output, abbreviation
 
 
+@timed_step('9')
 def add_to_wechat_official_account(selected_row, abbreviation):
     """添加到微信公众号文档"""
     print("步骤 9: 添加到微信公众号文档...")
@@ -748,8 +804,9 @@ def add_to_wechat_official_account(selected_row, abbreviation):
     print()
 
 
+@timed_step('10')
 def send_wechat_email_notification(selected_row, new_event_id, operator, group_members, abbreviation):
-    """发送微信群消息邮件通知（在写入文档之后执行）"""
+    """发送微信群消息邮件通知（与步骤7、步骤9并发执行）"""
     print("步骤 10: 发送微信群消息邮件通知...")
     log_program_run('10', '开始发送微信群消息邮件通知', 'info')
     
@@ -787,10 +844,138 @@ def send_wechat_email_notification(selected_row, new_event_id, operator, group_m
         })
 
 
-def main():
-    """主函数"""
+def log_step_outcomes(outcomes):
+    """
+    将并发步骤的执行结果写入结构化日志
+    
+    Args:
+        outcomes: StepGraph.collect() 的返回值（步骤名称 -> (result, exception)）
+    Returns:
+        list: 失败的步骤名称列表
+    """
+    import traceback
+    
+    failed_steps = []
+    for step, (result, error) in outcomes.items():
+        if error is None:
+            continue
+        failed_steps.append(step)
+        print(f"⚠ 步骤 {step} 执行失败: {error}")
+        log_program_run(step, f'步骤执行失败: {error}', 'error', {
+            'traceback': ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+        })
+    
+    log_program_run('MAIN', '并发步骤执行完成', 'success' if not failed_steps else 'warning', {
+        'steps': list(outcomes.keys()),
+        'failed_steps': failed_steps
+    })
+    return failed_steps
+
+
+def log_api_metrics():
+    """将本次运行的Google API调用统计（次数、重试、耗时）写入结构化日志"""
+    metrics = get_api_metrics()
+    if not metrics:
+        return
+    total_calls = sum(stats['calls'] for stats in metrics.values())
+    total_retries = sum(stats['retries'] for stats in metrics.values())
+    log_program_run('MAIN', f'Google API 调用 {total_calls} 次，重试 {total_retries} 次', 'info', metrics)
+
+
+def run_publish_steps(graph, operator, group_members):
+    """
+    按依赖关系调度发布流水线的各个步骤
+
+    预检查（Docs）与步骤1（Sheets）互不依赖，并发执行；
+    步骤2、步骤3都只依赖步骤1，步骤3（数据库 + Universities表）与步骤4及之后的步骤无关，
+    因此在后台并发运行，由调用方在结束前等待其完成。
+    步骤6返回Event_ID后，步骤7（Sheets）、步骤9（Docs）、步骤10（SMTP）互不依赖，并发执行。
+
+    Args:
+        graph: StepGraph 执行器
+        operator: 操作员姓名
+        group_members: 组员信息（姓名 -> 邮箱）
+    Returns:
+        tuple: (success, error_message)
+    """
+    graph.add_step('PRE', check_and_create_current_period)
+    graph.add_step('1', load_and_clean_data)
+    graph.add_step('2', lambda loaded: update_university_info(loaded[0]), deps=['1'])
+    graph.add_step('3', lambda loaded: check_new_universities(loaded[1]), deps=['1'])
+    graph.add_step('4', select_row_to_process, deps=['2'])
+    
+    unfilled_data, filled_data, unfilled_range_name, filled_range_name = graph.result('1')
+    unfilled_data = graph.result('2')
+    
+    # 步骤4: 选择要处理的行
+    selected_row, filtered_data = graph.result('4')
+    
+    if selected_row is None:
+        print("\n没有可处理的数据，发送提醒邮件...")
+        log_program_run('MAIN', '没有可处理的数据，发送提醒邮件', 'info')
+        send_reminder_emails(group_members)
+        print("程序结束")
+        return True, None
+    
+    # 步骤5: 验证数据
+    if not validate_selected_row(selected_row, group_members, unfilled_data):
+        print("程序结束")
+        return False, '数据验证失败'
+    
+    # 步骤6: 插入到数据库
+    new_event_id = process_and_insert_to_database(selected_row)
+    
+    if new_event_id is None:
+        print("程序结束")
+        return False, '数据库插入失败'
+    
+    # 步骤7: 更新Google Sheets（与步骤8无关，先行提交；即使步骤8失败也必须把已入库的行移到Filled）
+    graph.add_step('7', lambda: update_google_sheets(selected_row, unfilled_range_name, filled_range_name))
+    
+    # 步骤8: 生成微信群消息内容和缩写（不发送邮件）
+    with step_span('8'):
+        abbreviation = generate_abbreviation(selected_row.iloc[0])
+    
+    if not abbreviation:
+        print("⚠ 无法生成职位缩写")
+        log_program_run('8', '无法生成职位缩写', 'error')
+        graph.result('7')
+        print("程序结束")
+        return False, '微信消息生成失败'
+    
+    # 步骤9: 添加到微信公众号（依赖预检查，避免重复创建周期标题）
+    graph.add_step('9', lambda _period: add_to_wechat_official_account(selected_row, abbreviation), deps=['PRE'])
+    
+    # 步骤10: 发送微信群消息邮件通知（只依赖步骤8的缩写，与Sheets、Docs写入并发）
+    graph.add_step('10', lambda: send_wechat_email_notification(
+        selected_row, new_event_id, operator, group_members, abbreviation
+    ))
+    
+    # 步骤7、9、10 分别访问 Sheets、Docs、SMTP，并发执行后统一收集结果
+    failed_steps = log_step_outcomes(graph.collect(['7', '9', '10']))
+    if failed_steps:
+        print("程序结束")
+        return False, f"步骤 {', '.join(failed_steps)} 执行失败"
+    
+    print("=" * 60)
+    print("所有步骤完成！".center(60))
+    print("=" * 60)
+    return True, None
+
+
+def main(operator=None):
+    """
+    主函数
+    
+    Args:
+        operator: 操作员姓名（可选）。常驻模式从配置传入，不再交互式输入；为空时按原流程获取
+    Returns:
+        bool: 本次运行是否成功
+    """
     # 设置print输出日志（必须在所有print之前）
     tee_output = log_program_start()
+    reset_api_metrics()
+    success = False
     
     try:
         print_banner()
@@ -798,85 +983,40 @@ def main():
         group_members = read_group_members(GROUP_MEMBERS_FILE)
         
         # 获取并验证操作员姓名（必须在组员名单中，且支持30分钟内免重复输入）
-        operator = get_operator_name(group_members)
+        if operator:
+            if operator not in group_members:
+                print(f"\n✗ 错误：姓名 '{operator}' 不在组员名单中。程序退出。")
+                operator = None
+        else:
+            operator = get_operator_name(group_members)
         if operator is None:
             log_program_end(success=False, error_message='操作员验证失败')
-            return
+            return False
         
         log_program_run('INIT', f'程序初始化完成，操作员: {operator}', 'info', {
             'operator': operator,
             'group_members_count': len(group_members)
         })
         
-        # 预检查: 确保当前周期标题存在于 Google 文档中
-        week_start, week_end, period_created, period_message = check_and_create_current_period()
-        
-        # 步骤1: 加载数据
-        unfilled_data, filled_data, unfilled_range_name, filled_range_name = load_and_clean_data()
-        
-        # 步骤2: 更新大学信息
-        unfilled_data = update_university_info(unfilled_data)
-        
-        # 步骤3: 检查新大学
-        check_new_universities(filled_data)
-        
-        # 步骤4: 选择要处理的行
-        selected_row, filtered_data = select_row_to_process(unfilled_data)
-        
-        if selected_row is None:
-            print("\n没有可处理的数据，发送提醒邮件...")
-            log_program_run('MAIN', '没有可处理的数据，发送提醒邮件', 'info')
-            send_reminder_emails(group_members)
-            print("程序结束")
-            log_program_end(success=True)
-            return
-        
-        # 步骤5: 验证数据
-        if not validate_selected_row(selected_row, group_members, unfilled_data):
-            print("程序结束")
-            log_program_end(success=False, error_message='数据验证失败')
-            return
-        
-        # 步骤6: 插入到数据库
-        new_event_id = process_and_insert_to_database(selected_row)
-        
-        if new_event_id is None:
-            print("程序结束")
-            log_program_end(success=False, error_message='数据库插入失败')
-            return
-        
-        # 步骤7: 更新Google Sheets
-        update_google_sheets(selected_row, unfilled_range_name, filled_range_name)
-        
-        # 步骤8: 生成微信群消息内容和缩写（不发送邮件）
-        abbreviation = generate_abbreviation(selected_row.iloc[0])
+        with StepGraph() as graph:
+            success, error_message = run_publish_steps(graph, operator, group_members)
+            # 等待后台步骤（如步骤3）完成，若其失败则抛出异常
+            graph.wait()
         
-        if not abbreviation:
-            print("⚠ 无法生成职位缩写")
-            log_program_run('8', '无法生成职位缩写', 'error')
-            print("程序结束")
-            log_program_end(success=False, error_message='微信消息生成失败')
-            return
-        
-        # 步骤9: 添加到微信公众号
-        add_to_wechat_official_account(selected_row, abbreviation)
-        
-        # 步骤10: 发送微信群消息邮件通知（在写入文档之后）
-        send_wechat_email_notification(selected_row, new_event_id, operator, group_members, abbreviation)
-        
-        print("=" * 60)
-        print("所有步骤完成！".center(60))
-        print("=" * 60)
-        log_program_end(success=True)
+        log_api_metrics()
+        log_program_end(success=success, error_message=error_message)
     
     except KeyboardInterrupt:
+        success = False
         print("\n\n程序被用户中断")
         log_program_end(success=False, error_message='用户中断')
     
     except Exception as e:
+        success = False
         print(f"\n⚠ 发生错误: {e}")
         import traceback
         error_trace = traceback.format_exc()
+        log_api_metrics()
         log_program_end(success=False, error_message=str(e))
         log_program_run('ERROR', f'程序异常: {str(e)}', 'error', {
             'traceback': error_trace
@@ -886,6 +1026,8 @@ def main():
     finally:
         # 确保恢复stdout和stderr（在所有情况下都会执行）
         restore_print_logging(tee_output)
+    
+    return success
 
 
 if __name__ == "__main__":
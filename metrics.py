@@ -0,0 +1,265 @@
+"""
+运行指标模块 - 以Prometheus文本格式导出调用耗时、数据量和运行结果等指标
+
+指标由 logger.log_program_run 的结构化日志条目、对外调用计时和运行结束记录驱动，
+每次运行结束时写入 node-exporter 的 textfile（METRICS_TEXTFILE），
+常驻模式下还可通过 http://127.0.0.1:<端口>/metrics 直接抓取。
+计数器的累计值保存在 METRICS_STATE_FILE 中，定时任务每次重新启动进程时仍保持单调递增。
+"""
+import json
+import os
+import threading
+import time
+
+from config import METRICS_TEXTFILE, METRICS_STATE_FILE
+
+# 调用耗时的直方图分桶（秒）
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# 步骤和整次运行耗时的直方图分桶（秒）
+DURATION_BUCKETS = (1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """指标基类：按标签值分组保存样本"""
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._samples = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for key in sorted(self._samples):
+            lines.extend(self._render_sample(key, self._samples[key]))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}']
+
+    def dump(self):
+        return [[list(key), value] for key, value in self._samples.items()]
+
+    def load(self, samples):
+        for key, value in samples:
+            if len(key) == len(self.labels):
+                self._samples[tuple(key)] = value
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            return
+        key = self._key(labels)
+        self._samples[key] = self._samples.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        self._samples[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        sample = self._samples.get(key)
+        if sample is None:
+            sample = self._samples[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                sample['buckets'][index] += 1
+        sample['sum'] += value
+        sample['count'] += 1
+
+    def _render_sample(self, key, sample):
+        lines = []
+        for bound, count in zip(self.buckets, sample['buckets']):
+            labels = _format_labels(self.labels, key, [('le', _format_value(bound))])
+            lines.append(f'{self.name}_bucket{labels} {count}')
+        labels = _format_labels(self.labels, key, [('le', '+Inf')])
+        lines.append(f'{self.name}_bucket{labels} {sample["count"]}')
+        labels = _format_labels(self.labels, key)
+        lines.append(f'{self.name}_sum{labels} {_format_value(round(sample["sum"], 6))}')
+        lines.append(f'{self.name}_count{labels} {sample["count"]}')
+        return lines
+
+    def load(self, samples):
+        for key, sample in samples:
+            if len(key) == len(self.labels) and len(sample.get('buckets', [])) == len(self.buckets):
+                self._samples[tuple(key)] = sample
+
+
+CALL_DURATION = Histogram(
+    'gisource_call_duration_seconds', '对外调用耗时（Google API含重试等待）', ['service'])
+CALLS = Counter('gisource_calls_total', '对外调用次数', ['service', 'outcome'])
+ROWS_FETCHED = Counter('gisource_sheet_rows_fetched_total', '从Google Sheets读取的数据行数', ['tab'])
+ROWS_DELETED = Counter('gisource_sheet_rows_deleted_total', '从Unfilled删除的数据行数', ['reason'])
+EVENTS_PUBLISHED = Counter('gisource_events_published_total', '插入数据库的资讯条数')
+LLM_TOKENS = Counter('gisource_llm_tokens_total', 'LLM消耗的token数', ['kind'])
+EMAIL_RETRIES = Counter('gisource_email_retries_total', '邮件发送重试次数')
+RUNS = Counter('gisource_runs_total', '程序运行次数', ['status'])
+RUN_DURATION = Histogram('gisource_run_duration_seconds', '整次运行耗时', buckets=DURATION_BUCKETS)
+STEP_DURATION = Histogram('gisource_step_duration_seconds', '各步骤耗时', ['step'], buckets=DURATION_BUCKETS)
+LAST_RUN_TIMESTAMP = Gauge('gisource_last_run_timestamp_seconds', '最近一次运行结束的Unix时间')
+LAST_RUN_SUCCESS = Gauge('gisource_last_run_success', '最近一次运行是否成功（1/0）')
+
+REGISTRY = [
+    CALL_DURATION, CALLS, ROWS_FETCHED, ROWS_DELETED, EVENTS_PUBLISHED, LLM_TOKENS,
+    EMAIL_RETRIES, RUNS, RUN_DURATION, STEP_DURATION, LAST_RUN_TIMESTAMP, LAST_RUN_SUCCESS
+]
+
+
+def _load_state():
+    """读取上次运行保存的累计值"""
+    if not METRICS_STATE_FILE or not os.path.exists(METRICS_STATE_FILE):
+        return
+    try:
+        with open(METRICS_STATE_FILE, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠ 读取指标状态失败，计数从0开始: {e}")
+        return
+    for metric in REGISTRY:
+        metric.load(state.get(metric.name, []))
+
+
+def _write_atomic(path, content):
+    """先写临时文件再替换，避免node-exporter读到写了一半的文件"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(temp_path, path)
+
+
+def observe_call(service, seconds, failed=False):
+    """
+    记录一次对外调用
+
+    Args:
+        service: 服务名称（sheets, docs, drive, mysql, smtp, llm）
+        seconds: 耗时（秒）
+        failed: 是否失败
+    """
+    with _lock:
+        CALL_DURATION.observe(seconds, service=service)
+        CALLS.inc(service=service, outcome='error' if failed else 'ok')
+
+
+def observe_rows_fetched(tab, count):
+    """记录从Google Sheets实际下载的数据行数（在 fetch_data/fetch_columns 中调用，镜像跳过下载时不计数）"""
+    if count <= 0:
+        return
+    with _lock:
+        ROWS_FETCHED.inc(count, tab=tab)
+
+
+def observe_step(step, seconds):
+    """记录一个步骤的耗时"""
+    with _lock:
+        STEP_DURATION.observe(seconds, step=step)
+
+
+def observe_log_entry(entry):
+    """
+    根据 log_program_run 的结构化日志条目更新数据量相关的指标
+
+    Args:
+        entry: 日志条目（step, message, status, data）
+    """
+    step, status, data = entry['step'], entry['status'], entry['data']
+    if not isinstance(data, dict):
+        return
+    with _lock:
+        if step == '1' and 'expired_count' in data:
+            ROWS_DELETED.inc(data['expired_count'], reason='expired')
+            ROWS_DELETED.inc(data.get('duplicate_count', 0), reason='duplicate')
+        if step == '7' and status == 'success':
+            ROWS_DELETED.inc(data.get('deleted_from_unfilled', 0), reason='published')
+        if step == '6' and status == 'success' and 'event_id' in data:
+            EVENTS_PUBLISHED.inc()
+        for kind in ('prompt_tokens', 'completion_tokens'):
+            if data.get(kind):
+                LLM_TOKENS.inc(data[kind], kind=kind.replace('_tokens', ''))
+        if 'email_retry' in data:
+            EMAIL_RETRIES.inc()
+
+
+def observe_run(record):
+    """
+    记录一次运行的结果，保存累计值并写入textfile
+
+    Args:
+        record: logger 写入 runs.jsonl 的运行记录
+    """
+    with _lock:
+        RUNS.inc(status='success' if record['success'] else 'failure')
+        RUN_DURATION.observe(record['duration'])
+        LAST_RUN_TIMESTAMP.set(round(time.time(), 3))
+        LAST_RUN_SUCCESS.set(1 if record['success'] else 0)
+    save()
+
+
+def render():
+    """
+    生成Prometheus文本格式的全部指标
+
+    Returns:
+        str: text/plain; version=0.0.4 格式的内容
+    """
+    with _lock:
+        lines = []
+        for metric in REGISTRY:
+            lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def save():
+    """保存计数器累计值，并写入 node-exporter 的 textfile"""
+    content = render()
+    with _lock:
+        state = {metric.name: metric.dump() for metric in REGISTRY}
+    try:
+        if METRICS_STATE_FILE:
+            _write_atomic(METRICS_STATE_FILE, json.dumps(state, ensure_ascii=False))
+        if METRICS_TEXTFILE:
+            _write_atomic(METRICS_TEXTFILE, content)
+    except OSError as e:
+        print(f"⚠ 写入运行指标失败: {e}")
+
+
+_load_state()
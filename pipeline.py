@@ -0,0 +1,128 @@
+"""
+流水线调度模块 - 按显式依赖关系并发执行相互独立的步骤
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from config import PIPELINE_MAX_WORKERS
+
+
+class StepGraph:
+    """
+    步骤依赖图（DAG）执行器
+
+    每个步骤在其全部依赖完成后立即提交到线程池执行，
+    相互独立的步骤并发运行，使整体耗时趋近于关键路径而非各步骤耗时之和。
+    步骤函数以依赖步骤的返回值（按 deps 顺序）作为位置参数被调用。
+    """
+    def __init__(self, max_workers=PIPELINE_MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='step')
+        self._futures = {}
+        self._collected = set()
+        self._lock = threading.Lock()
+
+    def add_step(self, name, func, deps=()):
+        """
+        添加一个步骤
+
+        Args:
+            name: 步骤名称（如 'PRE', '1'）
+            func: 步骤函数，参数为各依赖步骤的返回值
+            deps: 依赖的步骤名称列表（必须已添加，因此不会形成环）
+        Returns:
+            Future: 该步骤的结果
+        """
+        if name in self._futures:
+            raise ValueError(f"步骤 '{name}' 已存在")
+        missing = [dep for dep in deps if dep not in self._futures]
+        if missing:
+            raise ValueError(f"步骤 '{name}' 依赖未定义的步骤: {missing}")
+
+        future = Future()
+        dep_futures = [self._futures[dep] for dep in deps]
+        self._futures[name] = future
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                result = func(*[dep.result() for dep in dep_futures])
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+        if not dep_futures:
+            self._submit(future, run)
+            return future
+
+        pending = {'count': len(dep_futures)}
+
+        def on_dep_done(dep_future):
+            with self._lock:
+                pending['count'] -= 1
+                ready = pending['count'] == 0
+            if not ready:
+                return
+            # 任一依赖失败时，该步骤不再执行，直接传递依赖的异常
+            for dep in dep_futures:
+                if dep.cancelled():
+                    future.cancel()
+                    return
+                if dep.exception() is not None:
+                    if future.set_running_or_notify_cancel():
+                        future.set_exception(dep.exception())
+                    return
+            self._submit(future, run)
+
+        for dep in dep_futures:
+            dep.add_done_callback(on_dep_done)
+
+        return future
+
+    def _submit(self, future, run):
+        """提交步骤到线程池；线程池已关闭时取消该步骤"""
+        try:
+            self._executor.submit(run)
+        except RuntimeError:
+            future.cancel()
+
+    def result(self, name, timeout=None):
+        """等待并返回指定步骤的结果（步骤失败时抛出其异常）"""
+        return self._futures[name].result(timeout=timeout)
+
+    def collect(self, names):
+        """
+        等待指定步骤完成并收集各自的结果，单个步骤失败不影响其他步骤
+
+        Args:
+            names: 步骤名称列表
+        Returns:
+            dict: 步骤名称 -> (result, exception)，成功时 exception 为 None
+        """
+        outcomes = {}
+        for name in names:
+            try:
+                outcomes[name] = (self._futures[name].result(), None)
+            except BaseException as e:
+                outcomes[name] = (None, e)
+            self._collected.add(name)
+        return outcomes
+
+    def wait(self):
+        """等待所有步骤完成，若有未经 collect() 处理的步骤失败，则按添加顺序抛出第一个异常"""
+        for name, future in list(self._futures.items()):
+            if name in self._collected or future.cancelled():
+                continue
+            exc = future.exception()
+            if exc is not None:
+                raise exc
+
+    def shutdown(self):
+        """等待已提交的步骤结束并关闭线程池"""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
@@ -0,0 +1,111 @@
+"""
+性能分析模块 - 用 cProfile 运行主流程，将 .prof 文件和耗时排行写在本次运行日志旁
+
+文件名使用与运行日志相同的会话ID（log_program_run._session_id），
+例如 logs/run_20260101_093000.txt 对应 logs/run_20260101_093000.prof 和 logs/run_20260101_093000_profile.txt。
+并发步骤在线程池中运行，每个线程单独采集后合并到同一份结果中。
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+from datetime import datetime
+
+from config import CHINA_TZ, LOGS_DIR
+
+
+class ThreadedProfile:
+    """在主线程和之后启动的所有线程中采集 cProfile 数据"""
+    def __init__(self):
+        self._main = cProfile.Profile()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _start_thread_profile(self, *_):
+        # 只在线程的第一个事件时调用一次，随后换成该线程自己的 cProfile
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 新版本 Python 的 cProfile 对所有线程生效，主线程的采集已包含该线程
+            return
+        with self._lock:
+            self._threads.append(profile)
+
+    def __enter__(self):
+        threading.setprofile(self._start_thread_profile)
+        self._main.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._main.disable()
+        threading.setprofile(None)
+        return False
+
+    def stats(self, stream):
+        """合并全部线程的采集结果"""
+        stats = pstats.Stats(self._main, stream=stream)
+        with self._lock:
+            for profile in self._threads:
+                stats.add(profile)
+        return stats
+
+
+def _session_id():
+    from logger import log_program_run
+    session_id = getattr(log_program_run, '_session_id', None)
+    return session_id or datetime.now(CHINA_TZ).strftime('%Y%m%d_%H%M%S')
+
+
+def write_profile(profile, top_n=30):
+    """
+    将采集结果写入 logs/run_<会话ID>.prof，并生成按累计耗时和自身耗时排序的前N项摘要
+
+    Args:
+        profile: ThreadedProfile 对象
+        top_n: 摘要中列出的函数数量
+    Returns:
+        tuple: (.prof 文件路径, 摘要文件路径)
+    """
+    session_id = _session_id()
+    os.makedirs(LOGS_DIR, exist_ok=True)
+    prof_path = os.path.join(LOGS_DIR, f"run_{session_id}.prof")
+    summary_path = os.path.join(LOGS_DIR, f"run_{session_id}_profile.txt")
+
+    stream = io.StringIO()
+    stats = profile.stats(stream)
+    stats.dump_stats(prof_path)
+
+    stream.write(f"会话ID: {session_id}\n")
+    stream.write(f"完整结果: {os.path.basename(prof_path)}（python -m pstats 或 snakeviz 查看）\n\n")
+    stream.write(f"===== 按累计耗时排序（前{top_n}项） =====\n")
+    stats.sort_stats('cumulative').print_stats(top_n)
+    stream.write(f"===== 按自身耗时排序（前{top_n}项） =====\n")
+    stats.sort_stats('tottime').print_stats(top_n)
+
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        f.write(stream.getvalue())
+    return prof_path, summary_path
+
+
+def run_profiled(func, *args, top_n=30, **kwargs):
+    """
+    在性能分析下运行 func，结束后（包括异常时）写出结果
+
+    Args:
+        func: 要运行的函数（通常为 main.main）
+        top_n: 摘要中列出的函数数量
+    Returns:
+        func 的返回值
+    """
+    profile = ThreadedProfile()
+    try:
+        with profile:
+            return func(*args, **kwargs)
+    finally:
+        prof_path, summary_path = write_profile(profile, top_n)
+        print(f"✓ 性能分析结果: {prof_path}")
+        print(f"✓ 耗时排行: {summary_path}")
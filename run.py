@@ -21,6 +21,42 @@ if current_dir not in sys.path:
 
 # 导入并运行主程序
 if __name__ == "__main__":
-    from main import main
-    main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='GISource 自动化系统')
+    parser.add_argument('--daemon', action='store_true',
+                        help='常驻模式：按 config.py 中的计划周期性运行（操作员取自环境变量 GISOURCE_OPERATOR）')
+    parser.add_argument('--record', metavar='PATH',
+                        help='录制模式：将本次运行的所有对外交互（已去除密钥）写入录制文件，供 benchmarks/replay_cassette.py 回放')
+    parser.add_argument('--profile', nargs='?', type=int, const=30, metavar='N',
+                        help='性能分析模式：用cProfile运行，在运行日志旁写入 .prof 文件及耗时最多的前N个函数（默认30）')
+    parser.add_argument('--stats', nargs='?', type=int, const=0, metavar='N',
+                        help='统计历次运行（logs/runs.jsonl）的失败率及各步骤耗时 p50/p95，N 为只统计最近N次运行')
+    parser.add_argument('--since', metavar='YYYY-MM-DD', help='与 --stats 一起使用：起始日期（含）')
+    parser.add_argument('--until', metavar='YYYY-MM-DD', help='与 --stats 一起使用：结束日期（含）')
+    parser.add_argument('--json', action='store_true', help='与 --stats 一起使用：以JSON格式输出')
+    args = parser.parse_args()
+    
+    if args.stats is not None:
+        from logger import summarize_runs, format_run_report
+        if args.json:
+            import json
+            print(json.dumps(summarize_runs(args.since, args.until, args.stats or None), ensure_ascii=False, indent=2))
+        else:
+            print(format_run_report(args.since, args.until, args.stats or None))
+    elif args.daemon:
+        from daemon import run_daemon
+        sys.exit(0 if run_daemon() else 1)
+    else:
+        from main import main
+        run_main = main
+        if args.profile is not None:
+            from profiler import run_profiled
+            run_main = lambda: run_profiled(main, top_n=args.profile)
+        if args.record:
+            from cassette import recording
+            with recording(args.record):
+                run_main()
+        else:
+            run_main()
 
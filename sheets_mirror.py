@@ -0,0 +1,216 @@
+"""
+表格本地镜像模块 - 在本地SQLite中镜像Google表格的工作表，按需增量同步
+
+同步策略：
+- 通过Drive API读取表格的 modifiedTime，与上次同步时记录的值一致时跳过下载
+- 仅追加的工作表（如 Filled）只拉取末尾新增的行，并用上次最后一行的哈希校验锚点，
+  锚点不一致（中间行被删除或修改）时回退为全量下载
+- 其他工作表（如 Unfilled，会被人工编辑和删除行）有变化时全量下载
+- 可为工作表指定列投影（如 Filled 只镜像用到的列），只拉取这些列
+- 本程序写入表格后，镜像立即标记为过期，下一次同步必定重新检查
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from config import SHEETS_MIRROR_FILE, MIRROR_FULL_SYNC_HOURS
+from google_sheets import fetch_data, fetch_columns, get_spreadsheet_modified_time, add_write_listener
+
+_db_lock = threading.Lock()
+
+
+def _connect():
+    """打开镜像数据库（不存在时创建表结构）"""
+    os.makedirs(os.path.dirname(SHEETS_MIRROR_FILE), exist_ok=True)
+    conn = sqlite3.connect(SHEETS_MIRROR_FILE)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tabs (
+            name TEXT PRIMARY KEY,
+            headers TEXT NOT NULL,
+            modified_time TEXT,
+            full_synced_at REAL NOT NULL,
+            last_row INTEGER
+        )
+    """)
+    # 旧版镜像没有 last_row 列，补上后（值为空）下一次同步会全量下载
+    if 'last_row' not in [column[1] for column in conn.execute("PRAGMA table_info(tabs)")]:
+        conn.execute("ALTER TABLE tabs ADD COLUMN last_row INTEGER")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS rows (
+            tab TEXT NOT NULL,
+            row_index INTEGER NOT NULL,
+            row_hash TEXT NOT NULL,
+            row_values TEXT NOT NULL,
+            PRIMARY KEY (tab, row_index)
+        )
+    """)
+    return conn
+
+
+def row_hash(row):
+    """计算一行数据的哈希（用于增量同步时校验锚点行）"""
+    return hashlib.sha1(json.dumps(row, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def _get_tab_state(conn, tab):
+    """
+    读取工作表的同步状态：(headers, modified_time, full_synced_at, last_row, last_row_hash)
+    last_row 为最后一条已镜像的行在表格中的行号（1基，表头为1），
+    与镜像中的行数无关（按列投影拉取时，末尾投影列全为空的行不会返回）
+    """
+    state = conn.execute(
+        "SELECT headers, modified_time, full_synced_at, last_row FROM tabs WHERE name = ?", (tab,)
+    ).fetchone()
+    if state is None:
+        return None
+    last_row = state[3]
+    last = None
+    if last_row is not None:
+        last = conn.execute(
+            "SELECT row_hash FROM rows WHERE tab = ? AND row_index = ?", (tab, last_row - 2)
+        ).fetchone()
+    return json.loads(state[0]), state[1], state[2], last_row, last[0] if last else None
+
+
+def _store_rows(conn, tab, rows, start_index):
+    """写入数据行（start_index 为第一行的0基数据行号）"""
+    conn.executemany(
+        "INSERT OR REPLACE INTO rows (tab, row_index, row_hash, row_values) VALUES (?, ?, ?, ?)",
+        [
+            (tab, start_index + offset, row_hash(row), json.dumps(row, ensure_ascii=False))
+            for offset, row in enumerate(rows)
+        ]
+    )
+
+
+def _full_sync(conn, tab, modified_time, columns=None):
+    """全量下载工作表并替换镜像（指定 columns 时只下载这些列）"""
+    if columns:
+        headers, rows = fetch_columns(tab, columns, refresh_headers=True)
+    else:
+        values = fetch_data(tab)
+        headers = values[0] if values else []
+        rows = values[1:]
+    conn.execute("DELETE FROM rows WHERE tab = ?", (tab,))
+    _store_rows(conn, tab, rows, 0)
+    conn.execute(
+        "INSERT OR REPLACE INTO tabs (name, headers, modified_time, full_synced_at, last_row) VALUES (?, ?, ?, ?, ?)",
+        (tab, json.dumps(headers, ensure_ascii=False), modified_time, time.time(), len(rows) + 1)
+    )
+    return len(rows)
+
+
+def _tail_sync(conn, tab, last_row, last_hash, modified_time, columns=None):
+    """
+    只拉取末尾新增的行
+    Returns:
+        int: 新增行数；锚点校验失败时返回 None（需要全量同步）
+    """
+    # 数据行 i（0基）位于表格第 i+2 行，从最后一条已镜像的行（表格第 last_row 行）开始拉取作为锚点
+    if columns:
+        values = fetch_columns(tab, columns, start_row=last_row)[1]
+    else:
+        values = fetch_data(f"{tab}!A{last_row}:ZZ")
+    if not values or row_hash(values[0]) != last_hash:
+        return None
+    new_rows = values[1:]
+    _store_rows(conn, tab, new_rows, last_row - 1)
+    conn.execute(
+        "UPDATE tabs SET modified_time = ?, last_row = ? WHERE name = ?",
+        (modified_time, last_row + len(new_rows), tab)
+    )
+    return len(new_rows)
+
+
+def sync_tabs(tabs, append_only=(), columns=None):
+    """
+    同步指定工作表到本地镜像
+
+    Args:
+        tabs: 工作表名称列表
+        append_only: 其中只会在末尾追加行的工作表名称（使用增量同步）
+        columns: 工作表名称 -> 需要镜像的列名列表（未指定的工作表镜像全部列）
+    Returns:
+        dict: 工作表名称 -> 同步方式（'skipped', 'tail', 'full'）
+    """
+    modified_time = get_spreadsheet_modified_time()
+    full_sync_age = MIRROR_FULL_SYNC_HOURS * 3600
+    columns = columns or {}
+    results = {}
+
+    with _db_lock:
+        conn = _connect()
+        try:
+            for tab in tabs:
+                tab_columns = columns.get(tab)
+                state = _get_tab_state(conn, tab)
+                if state is None:
+                    count = _full_sync(conn, tab, modified_time, tab_columns)
+                    results[tab] = 'full'
+                    print(f"   镜像 {tab}: 全量下载 {count} 行")
+                    continue
+
+                headers, synced_modified_time, full_synced_at, last_row, last_hash = state
+                full_sync_due = time.time() - full_synced_at > full_sync_age or last_row is None
+                # 列投影发生变化时镜像中的列不再适用
+                if tab_columns and set(headers) != set(tab_columns):
+                    full_sync_due = True
+
+                if modified_time and modified_time == synced_modified_time and not full_sync_due:
+                    results[tab] = 'skipped'
+                    print(f"   镜像 {tab}: 表格未修改，跳过下载")
+                    continue
+
+                if tab in append_only and last_hash is not None and not full_sync_due:
+                    count = _tail_sync(conn, tab, last_row, last_hash, modified_time, tab_columns)
+                    if count is not None:
+                        results[tab] = 'tail'
+                        print(f"   镜像 {tab}: 增量拉取 {count} 行")
+                        continue
+                    print(f"   镜像 {tab}: 锚点行不一致，改为全量下载")
+
+                count = _full_sync(conn, tab, modified_time, tab_columns)
+                results[tab] = 'full'
+                print(f"   镜像 {tab}: 全量下载 {count} 行")
+            conn.commit()
+        finally:
+            conn.close()
+
+    return results
+
+
+def read_tab(tab):
+    """
+    从本地镜像读取工作表
+    Returns:
+        tuple: (headers, rows)，与 fetch_data 返回的 values[0]、values[1:] 格式相同
+    """
+    with _db_lock:
+        conn = _connect()
+        try:
+            state = conn.execute("SELECT headers FROM tabs WHERE name = ?", (tab,)).fetchone()
+            if state is None:
+                raise KeyError(f"工作表 '{tab}' 尚未同步到本地镜像")
+            rows = conn.execute(
+                "SELECT row_values FROM rows WHERE tab = ? ORDER BY row_index", (tab,)
+            ).fetchall()
+        finally:
+            conn.close()
+    return json.loads(state[0]), [json.loads(row[0]) for row in rows]
+
+
+def invalidate(_target=None):
+    """将所有镜像标记为过期（本程序写入表格后调用），下一次同步必定重新检查"""
+    with _db_lock:
+        conn = _connect()
+        try:
+            conn.execute("UPDATE tabs SET modified_time = NULL")
+            conn.commit()
+        finally:
+            conn.close()
+
+
+# 本程序对表格的任何写入都使镜像过期
+add_write_listener(invalidate)
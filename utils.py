@@ -1,15 +1,22 @@
 """
 工具模块 - 通用辅助函数
 """
+import re
 import pandas as pd
 import inflect
+from functools import lru_cache
 from datetime import datetime, date, timedelta
-from config import CHINA_TZ
+from config import (
+    CHINA_TZ, DEADLINE_SOON_VALUES, DEADLINE_COLUMNS, COUNTRY_DICTIONARY, TEXT_HELPER_CACHE_SIZE
+)
 from pypinyin import lazy_pinyin
 
 # 初始化inflect引擎
 p = inflect.engine()
 
+# 国家名称的拼音排序键（导入时预先计算，排序时直接查表）
+COUNTRY_PINYIN = {country: ''.join(lazy_pinyin(country)) for country in COUNTRY_DICTIONARY}
+
 
 def is_date(string):
     """检查字符串是否为日期格式"""
@@ -53,6 +60,8 @@ def safe_convert_to_int(value):
         return None
 
 
+# typed=True：1 和 1.0 的结果不同（"one" / "one point zero"），按类型分别缓存
+@lru_cache(maxsize=TEXT_HELPER_CACHE_SIZE, typed=True)
 def number_to_english_words(number):
     """将数字转换为英文单词"""
     return p.number_to_words(number)
@@ -69,9 +78,124 @@ def number_to_chinese_words(number):
         return chinese_digits[number // 10] + "十" + (chinese_digits[number % 10] if number % 10 != 0 else "")
 
 
+# "2025年12月15日申请截止" 格式的截止日期
+CHINESE_DATE_PATTERN = r'^(\d{4})年(\d{1,2})月(\d{1,2})日'
+
+# YYYY-MM-DD 格式的截止日期（步骤1只按这种格式判定过期并删除行）
+ISO_DATE_PATTERN = r'^\d{4}-\d{1,2}-\d{1,2}$'
+
+
+def _parse_date_text(text):
+    """解析非 YYYY-MM-DD 格式的日期字符串（去掉时区），无法解析时返回 NaT"""
+    parsed = pd.to_datetime(text, errors='coerce')
+    if pd.notna(parsed) and parsed.tzinfo is not None:
+        parsed = parsed.tz_localize(None)
+    return parsed
+
+
+def normalize_deadlines(deadlines):
+    """
+    向量化解析一列Deadline（每个数据快照只解析一次，各步骤共用结果）
+
+    支持 YYYY-MM-DD、其他常见日期格式和"2025年12月15日申请截止"格式；
+    绝大多数值为 YYYY-MM-DD，按固定格式整列解析，其余少量值逐个解析。
+    Args:
+        deadlines: Deadline 值（Series 或列表，值为字符串、日期或空值）
+    Returns:
+        DataFrame: 与输入索引相同，包含 DEADLINE_COLUMNS 三列：
+            Deadline_Date: 截止日期（datetime64，只保留日期；Soon或无法解析时为NaT）
+            Deadline_Is_Soon: 是否为 Soon/尽快申请
+            Deadline_Is_Invalid: 非Soon且为空或无法解析
+    """
+    values = pd.Series(deadlines, dtype=object)
+    text = values.where(values.notna(), '').astype(str).str.strip()
+    is_soon = text.isin(DEADLINE_SOON_VALUES)
+    
+    # 中文格式先转换为 YYYY-MM-DD
+    chinese = text.str.extract(CHINESE_DATE_PATTERN)
+    has_chinese = chinese[0].notna()
+    if has_chinese.any():
+        text = text.copy()
+        text[has_chinese] = (chinese.loc[has_chinese, 0] + '-' +
+                             chinese.loc[has_chinese, 1].str.zfill(2) + '-' +
+                             chinese.loc[has_chinese, 2].str.zfill(2))
+    
+    candidates = text.where(~is_soon & (text != ''))
+    dates = pd.to_datetime(candidates, format='%Y-%m-%d', errors='coerce')
+    leftover = candidates.notna() & dates.isna()
+    if leftover.any():
+        dates[leftover] = candidates[leftover].map(_parse_date_text)
+    dates = pd.to_datetime(dates).dt.normalize()
+    
+    return pd.DataFrame({
+        'Deadline_Date': dates,
+        'Deadline_Is_Soon': is_soon,
+        'Deadline_Is_Invalid': ~is_soon & dates.isna()
+    }, index=values.index)
+
+
+def parse_deadline(value):
+    """
+    解析单个Deadline值（与 normalize_deadlines 规则相同，用于没有标准化列的单行数据）
+    Returns:
+        Timestamp: 只保留日期；Soon、空值或无法解析时为NaT
+    """
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return pd.NaT
+    text = str(value).strip()
+    if not text or text in DEADLINE_SOON_VALUES:
+        return pd.NaT
+    match = re.match(CHINESE_DATE_PATTERN, text)
+    if match:
+        text = f"{match.group(1)}-{int(match.group(2)):02d}-{int(match.group(3)):02d}"
+    try:
+        return pd.Timestamp(datetime.strptime(text, '%Y-%m-%d'))
+    except ValueError:
+        parsed = _parse_date_text(text)
+        return parsed.normalize() if pd.notna(parsed) else pd.NaT
+
+
+def add_deadline_columns(data):
+    """
+    为表格数据添加标准化的截止日期列（原地修改）
+    Args:
+        data: 含 Deadline 列的 DataFrame
+    Returns:
+        DataFrame: 同一个 DataFrame
+    """
+    normalized = normalize_deadlines(data['Deadline'])
+    for column in DEADLINE_COLUMNS:
+        data[column] = normalized[column]
+    return data
+
+
+def drop_deadline_columns(data):
+    """去掉标准化的截止日期列（写回表格前使用）"""
+    return data.drop(columns=DEADLINE_COLUMNS, errors='ignore')
+
+
+def get_deadline(row):
+    """
+    获取一行的截止日期，优先使用 add_deadline_columns 添加的列（没有时现场解析）
+    Args:
+        row: 数据行（Series 或 dict）
+    Returns:
+        Timestamp: 可解析的日期；否则返回原始的 Deadline 值（如 Soon、空值）
+    """
+    if 'Deadline_Date' in row:
+        deadline_date = row['Deadline_Date']
+    else:
+        deadline_date = parse_deadline(row.get('Deadline'))
+    if pd.notna(deadline_date):
+        return deadline_date
+    return row.get('Deadline')
+
+
+# typed=True：字符串、datetime、Timestamp 等不同类型的参数分别缓存
+@lru_cache(maxsize=TEXT_HELPER_CACHE_SIZE, typed=True)
 def convert_date_to_chinese(date_value):
     """将日期转换为中文格式"""
-    if date_value == "Soon":
+    if date_value in DEADLINE_SOON_VALUES:
         return '尽快申请'
     elif pd.notnull(date_value) and not pd.isna(date_value):
         if isinstance(date_value, datetime):
@@ -90,7 +214,7 @@ def convert_date_to_chinese(date_value):
         return '日期信息缺失'
 
 
-def calculate_week_range():
+def calculate_week_range(current_date=None):
     """计算两周的日期范围（周日到第二周周六，共14天）
     
     基于固定的两周周期，基准日期为 2025-11-30（周日）
@@ -98,6 +222,9 @@ def calculate_week_range():
     
     如果当前日期是周期的最后一天，则返回下一个周期的日期范围。
     
+    Args:
+        current_date: 按该日期计算（date 对象，默认今天；补录历史资讯时传入发布日期）
+    
     Returns:
         tuple: (start_date, end_date) 格式为 'YYYY-MM-DD'
     
@@ -107,7 +234,8 @@ def calculate_week_range():
     """
     # 基准日期：2025-11-30（周日）- 第一个两周周期的起始日期
     base_date = date(2025, 11, 30)
-    current_date = date.today()
+    if current_date is None:
+        current_date = date.today()
     
     # 计算距离基准日期的天数
     days_diff = (current_date - base_date).days
@@ -226,5 +354,13 @@ def get_pinyin_sort_key(text):
     """
     if not text:
         return ""
-    return ''.join(lazy_pinyin(str(text)))
+    text = str(text)
+    if text in COUNTRY_PINYIN:
+        return COUNTRY_PINYIN[text]
+    return _pinyin_key(text)
+
+
+@lru_cache(maxsize=TEXT_HELPER_CACHE_SIZE)
+def _pinyin_key(text):
+    return ''.join(lazy_pinyin(text))
 